@@ -0,0 +1,74 @@
+"""Check GeminiAnalyzer.analyze_many against the offline FakeGenerativeModel.
+
+Runs analyze_many with a FakeGenerativeModel injected through
+``model=`` whose first calls fail with a 429 quota error, and checks:
+
+* results come back in input order, although retried items finish last
+* every quota error is retried: the model sees one extra call per error
+* an item that runs out of retries gets the fallback result, with the
+  error, and the other items are unaffected
+
+The script exits non-zero if any check fails.
+
+Usage:
+    python scripts/analyze_check.py [--items 20] [--concurrency 4]
+"""
+import argparse
+import sys
+
+from logger.api.fake import FakeGenerativeModel
+from logger.api.gemini import GeminiAnalyzer
+
+
+def _run(items: int, quota_errors: int, concurrency: int, max_retries: int):
+    """Analyze items texts; returns (results, model calls)."""
+    model = FakeGenerativeModel(latency=0.01, quota_errors=quota_errors)
+    analyzer = GeminiAnalyzer(api_key=None, model=model)
+    results = analyzer.analyze_many(
+        [{"text": f"item {i}"} for i in range(items)],
+        max_concurrency=concurrency,
+        requests_per_minute=60000,
+        max_retries=max_retries,
+        backoff=0.01,
+    )
+    return results, model.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check analyze_many ordering and retries.")
+    parser.add_argument("--items", type=int, default=20, help="items per run")
+    parser.add_argument("--concurrency", type=int, default=4, help="max_concurrency")
+    options = parser.parse_args()
+
+    # (case, quota errors, concurrency, max retries, items expected to fail)
+    cases = [
+        ("retried", options.concurrency + 2, options.concurrency, 3, 0),
+        # One worker: the first item alone meets every quota error
+        ("retries exhausted", 3, 1, 2, 1),
+    ]
+
+    problems = []
+    print(f"{'case':<20}{'items':>7}{'quota errors':>14}{'calls':>7}{'failed':>8}")
+    for name, quota_errors, concurrency, max_retries, expected_failed in cases:
+        results, calls = _run(options.items, quota_errors, concurrency, max_retries)
+        failed = [i for i, result in enumerate(results) if "error" in result]
+        print(f"{name:<20}{options.items:>7}{quota_errors:>14}{calls:>7}{len(failed):>8}")
+
+        if [result["summary"] for result in results] != [f"item {i}" for i in range(options.items)]:
+            problems.append(f"{name}: results not in input order")
+        # Each quota error costs a call; an item that fails never gets its successful one
+        expected_calls = options.items - expected_failed + quota_errors
+        if calls != expected_calls:
+            problems.append(f"{name}: {calls} model calls, expected {expected_calls}")
+        if failed != list(range(expected_failed)):
+            problems.append(f"{name}: fallback results for items {failed}")
+        if any("429" not in results[i]["error"] for i in failed):
+            problems.append(f"{name}: fallback result without the quota error")
+
+    for problem in problems:
+        print(f"FAIL {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
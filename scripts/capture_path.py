@@ -0,0 +1,164 @@
+"""Capture path check: latency and crash consistency of recording a log.
+
+Compares the old two-commit sequence of ``timeflow add``
+(``auto_update_previous_log_duration`` then ``create_log``) with
+``LogOperations.append_log``, which does both in one transaction:
+
+* latency: time per capture and commits per capture, against a database
+  with the configured connection profile
+* crash consistency: a child process records a log and dies (os._exit)
+  right before the INSERT of the new log, after the previous log's
+  duration was set. Afterwards the previous log must still have its
+  original duration; with the old sequence it keeps the new one, for a
+  log that was never written.
+* kill test: a child records logs in a loop and is SIGKILLed at random
+  moments; after every kill the newest log of the day must still have
+  the estimate it was recorded with.
+
+The script exits non-zero if append_log fails a crash check.
+
+Usage:
+    python scripts/capture_path.py [--captures 300] [--kills 20]
+"""
+import argparse
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from logger.config import config
+from logger.db.models import Log, get_session, init_database
+from logger.db.operations import LogOperations
+
+# duration_estimate given to every new log; a chained duration replaces it
+ESTIMATE = 999
+
+
+def _open(database_path: str) -> LogOperations:
+    engine = init_database(f"sqlite:///{database_path}", config.get_sqlite_pragmas())
+    return LogOperations(get_session(engine))
+
+
+def _capture(ops: LogOperations, path: str):
+    """Record one log the way `timeflow add` does, now."""
+    values = {"ai_summary": "capture", "category": "工作", "tags": ["bench"],
+              "duration_estimate": ESTIMATE}
+    if path == "append_log":
+        ops.append_log(**values)
+    else:
+        ops.auto_update_previous_log_duration(datetime.now())
+        ops.create_log(**values)
+
+
+def _latency(path: str, captures: int):
+    """Return (per-capture ms list, commits per capture)."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        ops = _open(os.path.join(data_dir, "latency.db"))
+        commits = 0
+
+        @event.listens_for(ops.session, "after_commit")
+        def count(session):
+            nonlocal commits
+            commits += 1
+
+        timings = []
+        for _ in range(captures):
+            started = time.perf_counter()
+            _capture(ops, path)
+            timings.append((time.perf_counter() - started) * 1000)
+        ops.session.close()
+        return timings, commits / captures
+
+
+def _child(path: str, database_path: str, mode: str):
+    """Run inside the child process: capture and die (crash) or loop (kill)."""
+    ops = _open(database_path)
+    if mode == "crash":
+        @event.listens_for(ops.session.get_bind(), "before_cursor_execute")
+        def crash(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT INTO logs"):
+                os._exit(3)
+
+        _capture(ops, path)
+        os._exit(0)
+
+    print("ready", flush=True)
+    while True:
+        _capture(ops, path)
+
+
+def _newest_keeps_estimate(database_path: str) -> bool:
+    """Whether the newest log is unchained, as after a completed capture."""
+    ops = _open(database_path)
+    newest = ops.session.query(Log).order_by(Log.created_at.desc(), Log.id.desc()).first()
+    ops.session.close()
+    return newest is None or newest.duration_estimate == ESTIMATE
+
+
+def _crash_check(path: str) -> bool:
+    with tempfile.TemporaryDirectory() as data_dir:
+        database_path = os.path.join(data_dir, "crash.db")
+        ops = _open(database_path)
+        ops.append_log(ai_summary="before", category="工作", duration_estimate=ESTIMATE,
+                       created_at=datetime.now() - timedelta(seconds=1))
+        ops.session.close()
+        child = subprocess.run([sys.executable, __file__, "--child", path, database_path, "crash"])
+        assert child.returncode == 3, f"child exited with {child.returncode}"
+        return _newest_keeps_estimate(database_path)
+
+
+def _kill_check(path: str, kills: int, rnd: random.Random) -> int:
+    """Return the number of kills that left an inconsistent database."""
+    broken = 0
+    with tempfile.TemporaryDirectory() as data_dir:
+        database_path = os.path.join(data_dir, "kill.db")
+        _open(database_path).session.close()
+        for _ in range(kills):
+            child = subprocess.Popen(
+                [sys.executable, __file__, "--child", path, database_path, "loop"],
+                stdout=subprocess.PIPE,
+            )
+            child.stdout.readline()
+            time.sleep(rnd.uniform(0.05, 0.3))
+            child.send_signal(signal.SIGKILL)
+            child.wait()
+            broken += not _newest_keeps_estimate(database_path)
+    return broken
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        _child(*sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="Check capture latency and crash consistency.")
+    parser.add_argument("--captures", type=int, default=300, help="captures timed per path")
+    parser.add_argument("--kills", type=int, default=20, help="SIGKILLs per path")
+    options = parser.parse_args()
+
+    print(f"profile: {config.get_sqlite_pragmas()}")
+    print(f"{'path':<24}{'median ms':>10}{'p95 ms':>10}{'commits':>9}{'crash ok':>10}{'kills bad':>11}")
+    rnd = random.Random(0)
+    failures = 0
+    for path in ("two commits", "append_log"):
+        timings, commits = _latency(path, options.captures)
+        crash_ok = _crash_check(path)
+        broken = _kill_check(path, options.kills, rnd)
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        print(f"{path:<24}{statistics.median(timings):>10.2f}{p95:>10.2f}{commits:>9.1f}"
+              f"{'yes' if crash_ok else 'no':>10}{f'{broken}/{options.kills}':>11}")
+        if path == "append_log":
+            failures += (not crash_ok) + broken
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Concurrency check for the SQLite connection profile.
+
+Runs one writer process adding logs (like repeated ``timeflow add``),
+several reader processes querying pages and statistics (like
+``timeflow web``) and one exporter streaming the whole history to a slow
+client (like ``/api/export``) against a throwaway database, once with
+SQLite's defaults and once with the configured DB_* PRAGMAs. Reports
+writes and reads per second and how many operations failed with
+"database is locked". The check fails if the configured profile sees
+any lock error.
+
+Usage:
+    python scripts/db_concurrency.py [--readers 8] [--seconds 10]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import OperationalError
+
+from logger.config import config
+from logger.db.models import get_session, init_database
+from logger.db.operations import LogOperations
+
+# Seconds the exporter spends per row, so one pass over the seeded
+# history takes longer than the default 5 second busy timeout
+SEED_LOGS = 2000
+EXPORT_ROW_DELAY = 0.003
+
+PROFILES = {
+    # SQLite's defaults, apart from pysqlite's own 5 second busy timeout
+    "default": {},
+    "configured": config.get_sqlite_pragmas(),
+}
+
+
+def _open(database_url: str, pragmas) -> LogOperations:
+    return LogOperations(get_session(init_database(database_url, pragmas)))
+
+
+def _run(role: str, database_url: str, pragmas, seconds: float, results):
+    ops = _open(database_url, pragmas)
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            if role == "writer":
+                ops.append_log(
+                    ai_summary=f"并发写入 {done}",
+                    category="工作",
+                    original_text="concurrency check " * 10,
+                    tags=["bench", "sqlite"],
+                )
+            elif role == "exporter":
+                # A slow consumer keeps the read transaction open throughout
+                for _ in ops.iter_logs():
+                    time.sleep(EXPORT_ROW_DELAY)
+            elif done % 2:
+                ops.get_statistics()
+            else:
+                ops.get_logs(limit=50)
+                ops.session.expire_all()
+            done += 1
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            ops.session.rollback()
+            errors += 1
+    results.put((role, done, errors))
+
+
+def run_profile(name: str, readers: int, seconds: float):
+    """Run one writer and readers against a fresh database with a profile."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        database_url = f"sqlite:///{os.path.join(data_dir, name + '.db')}"
+        pragmas = PROFILES[name]
+        # Create the schema and some history before the clock starts
+        seed = _open(database_url, pragmas)
+        start = datetime.now() - timedelta(days=30)
+        seed.bulk_import(
+            {"created_at": start + timedelta(minutes=i), "ai_summary": f"seed {i}",
+             "category": "学习", "tags": ["seed"]}
+            for i in range(SEED_LOGS)
+        )
+        seed.session.close()
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_run, args=(role, database_url, pragmas, seconds, results)
+            )
+            for role in ["writer", "exporter"] + ["reader"] * readers
+        ]
+        for process in processes:
+            process.start()
+        totals = {"writer": [0, 0], "reader": [0, 0], "exporter": [0, 0]}
+        for _ in processes:
+            role, done, errors = results.get()
+            totals[role][0] += done
+            totals[role][1] += errors
+        for process in processes:
+            process.join()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check SQLite reader/writer concurrency.")
+    parser.add_argument("--readers", type=int, default=8, help="reader processes")
+    parser.add_argument("--seconds", type=float, default=10, help="duration of each run")
+    options = parser.parse_args()
+
+    print(f"1 writer, 1 exporter, {options.readers} readers, {options.seconds:g} s per profile")
+    print(f"{'profile':<12}{'writes/s':>10}{'reads/s':>10}{'lock errors':>13}")
+    configured_errors = 0
+    for name in PROFILES:
+        totals = run_profile(name, options.readers, options.seconds)
+        errors = sum(role_errors for _, role_errors in totals.values())
+        if name == "configured":
+            configured_errors = errors
+        print(
+            f"{name:<12}{totals['writer'][0] / options.seconds:>10.0f}"
+            f"{totals['reader'][0] / options.seconds:>10.0f}{errors:>13}"
+        )
+    sys.exit(1 if configured_errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Import throughput benchmark for `timeflow import`.
+
+Writes NDJSON (or CSV) files of generated logs and imports each into a
+throwaway database the way `timeflow import` does
+(iter_import_records into LogOperations.bulk_import), for two shapes:
+
+* short: short rows spread over many days, like another tracker's dump
+* cjk: our own export format with long Chinese original_text, which the
+  search index has to segment
+
+For each it reports rows per second for parsing the file alone, for
+writing the rows into the logs table (the executemany of each batch,
+which the 50k rows/s target applies to) and end to end, which also
+includes parsing, the search index, the tag tables, rollups and duration
+chaining, with the SQL time of each of those. It checks that every row
+reached logs, the search index and the rollups. The script exits
+non-zero if a check fails or the write rate is below --target.
+
+Usage:
+    python scripts/import_bench.py [--rows 200000] [--format ndjson] [--target 50000]
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, text
+
+from logger.db.models import get_session, init_database
+from logger.db.operations import LogOperations
+from logger.db.search import FTS5_AVAILABLE
+from logger.utils.export import EXPORT_FIELDS
+from logger.utils.importer import iter_import_records
+
+CATEGORIES = ["工作", "学习", "娱乐", "运动", "社交", "生活", "其他"]
+WORDS = ["meeting", "review", "python", "email", "design", "reading", "run", "lunch"]
+CJK_TEXT = "今天上午和团队一起评审了数据库迁移方案讨论索引设计和性能优化下午继续写代码并整理文档"
+
+
+def _rows(shape: str, count: int):
+    rnd = random.Random(0)
+    start = datetime(2000, 1, 1)
+    for i in range(count):
+        if shape == "short":
+            # ~30 rows a day over decades of days
+            yield {
+                "timestamp": (start + timedelta(minutes=48 * i)).isoformat(),
+                "activity": " ".join(rnd.sample(WORDS, 3)),
+                "project": rnd.choice(CATEGORIES),
+                "labels": ",".join(rnd.sample(WORDS, 2)),
+                "minutes": rnd.randint(5, 90),
+            }
+        else:
+            offset = rnd.randrange(len(CJK_TEXT))
+            body = (CJK_TEXT * 6)[offset:offset + rnd.randint(60, 240)]
+            yield {
+                "id": i + 1,
+                "created_at": (start + timedelta(minutes=20 * i)).isoformat(),
+                "original_text": body,
+                "image_path": None,
+                "ai_summary": body[:40],
+                "category": rnd.choice(CATEGORIES),
+                "tags": rnd.sample(["数据库", "会议", "代码", "文档", "阅读", "Python"], 3),
+                "duration_estimate": rnd.randint(5, 90),
+            }
+
+
+def _write(path: str, shape: str, count: int, file_format: str):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if file_format == "ndjson":
+            for row in _rows(shape, count):
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            return
+        fields = EXPORT_FIELDS if shape == "cjk" else ["timestamp", "activity", "project", "labels", "minutes"]
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for row in _rows(shape, count):
+            if shape == "cjk":
+                row["tags"] = json.dumps(row["tags"], ensure_ascii=False)
+            writer.writerow(row)
+
+
+def _check(ops: LogOperations, count: int) -> list:
+    problems = []
+    scalar = lambda sql: ops.session.execute(text(sql)).scalar()
+    if scalar("SELECT count(*) FROM logs") != count:
+        problems.append("logs row count")
+    if FTS5_AVAILABLE and scalar("SELECT count(*) FROM logs_fts") != count:
+        problems.append("search index row count")
+    if scalar("SELECT sum(log_count) FROM daily_rollups") != count:
+        problems.append("daily_rollups log count")
+    return problems
+
+
+# Leading words of the statements bulk_import runs, as reported
+STAGES = [
+    ("logs", "INSERT INTO logs ("),
+    ("search", "INSERT INTO logs_fts"),
+    ("durations", "UPDATE logs SET duration_estimate"),
+    ("tags", "INSERT OR IGNORE INTO tags"),
+    ("tags", "INSERT OR IGNORE INTO log_tags"),
+    ("tags", "INSERT INTO tag_pairs"),
+    ("tags", "UPDATE tags"),
+    ("rollups", "INSERT INTO daily"),
+]
+
+
+def _timed_import(ops: LogOperations, path: str, batch_size: int):
+    """Run bulk_import; returns (rows, seconds, {stage: SQL seconds})."""
+    engine = ops.session.get_bind()
+    stages = {}
+    started_at = {}
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        started_at[conn] = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        statement = statement.lstrip()
+        stage = next((name for name, prefix in STAGES if statement.startswith(prefix)), "other")
+        stages[stage] = stages.get(stage, 0) + time.perf_counter() - started_at.pop(conn)
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+    try:
+        started = time.perf_counter()
+        imported = ops.bulk_import(iter_import_records(path), batch_size=batch_size)
+        return imported, time.perf_counter() - started, stages
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+        event.remove(engine, "after_cursor_execute", after)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark timeflow import throughput.")
+    parser.add_argument("--rows", type=int, default=200000, help="rows per file")
+    parser.add_argument("--format", dest="file_format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--batch-size", type=int, default=5000, help="bulk_import batch size")
+    parser.add_argument("--target", type=float, default=50000,
+                        help="required rows/s writing into the logs table")
+    options = parser.parse_args()
+
+    failures = 0
+    print(f"{options.rows} rows per file, {options.file_format}")
+    print(f"{'shape':<8}{'parse/s':>10}{'write/s':>10}{'total/s':>10}{'seconds':>9}  SQL seconds by stage")
+    with tempfile.TemporaryDirectory() as data_dir:
+        for shape in ("short", "cjk"):
+            path = os.path.join(data_dir, f"{shape}.{options.file_format}")
+            _write(path, shape, options.rows, options.file_format)
+
+            started = time.perf_counter()
+            for _ in iter_import_records(path):
+                pass
+            parse_rate = options.rows / (time.perf_counter() - started)
+
+            # As `timeflow import` runs it: a fresh process has an empty database
+            ops = LogOperations(get_session(init_database(
+                f"sqlite:///{os.path.join(data_dir, shape + '.db')}"
+            )))
+            imported, elapsed, stages = _timed_import(ops, path, options.batch_size)
+            write_rate = imported / stages["logs"]
+
+            problems = _check(ops, options.rows)
+            if write_rate < options.target:
+                problems.append(f"writes below {options.target:,.0f} rows/s")
+            ops.session.close()
+            failures += bool(problems)
+            breakdown = " ".join(f"{name} {seconds:.2f}" for name, seconds in
+                                 sorted(stages.items(), key=lambda item: -item[1]))
+            print(f"{shape:<8}{parse_rate:>10,.0f}{write_rate:>10,.0f}{imported / elapsed:>10,.0f}"
+                  f"{elapsed:>9.1f}  {breakdown}")
+            for problem in problems:
+                print(f"FAIL {shape}: {problem}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
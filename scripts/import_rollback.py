@@ -0,0 +1,113 @@
+"""Import rollback check: a failed bulk_import must leave no trace.
+
+bulk_import suspends the per-row rollup and tag triggers while it
+writes. The check imports a few good records followed by one that
+raises, then verifies that:
+
+* no log of the failed import was written
+* the rollup and tag triggers exist again, and a log recorded afterwards
+  is counted in daily_rollups and in its tag's log_count
+* another writer could not insert while the import held the database,
+  so the imported rows got the consecutive ids the search index assumes
+
+The script exits non-zero if any check fails.
+
+Usage:
+    python scripts/import_rollback.py
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from logger.db.models import ROLLUP_TRIGGERS, get_session, init_database
+from logger.db.operations import LogOperations
+from logger.db.tags import TAG_TRIGGERS
+
+NOW = datetime.now()
+
+
+def _records(count: int, fail: bool = False):
+    for i in range(count):
+        yield {"created_at": NOW - timedelta(minutes=10 * (i + 1)), "ai_summary": f"import {i}",
+               "category": "工作", "tags": ["import"], "duration_estimate": 5}
+    if fail:
+        raise ValueError("broken record")
+
+
+def _triggers(ops: LogOperations) -> set:
+    return set(ops.session.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    ).scalars())
+
+
+def main():
+    problems = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        database_path = os.path.join(data_dir, "import.db")
+        ops = LogOperations(get_session(init_database(f"sqlite:///{database_path}")))
+        ops.append_log(ai_summary="before", category="工作", created_at=NOW - timedelta(hours=6))
+
+        try:
+            ops.bulk_import(_records(3, fail=True), batch_size=2)
+            problems.append("the failing import did not raise")
+        except ValueError:
+            pass
+
+        if ops.session.execute(text("SELECT count(*) FROM logs")).scalar() != 1:
+            problems.append("rows of the failed import were written")
+        missing = (set(ROLLUP_TRIGGERS) | set(TAG_TRIGGERS)) - _triggers(ops)
+        if missing:
+            problems.append(f"triggers missing after the failed import: {sorted(missing)}")
+
+        ops.append_log(ai_summary="after", category="学习", tags=["after"], created_at=NOW)
+        counted = ops.session.execute(
+            text("SELECT coalesce(sum(log_count), 0) FROM daily_rollups")
+        ).scalar()
+        if counted != 2:
+            problems.append(f"daily_rollups counts {counted} logs, expected 2")
+        tagged = ops.session.execute(
+            text("SELECT log_count FROM tags WHERE name = 'after'")
+        ).scalar()
+        if tagged != 1:
+            problems.append(f"tag 'after' has log_count {tagged}, expected 1")
+
+        # A second writer with no busy timeout, tried while the import runs
+        blocked = []
+
+        def contended(count: int):
+            for record in _records(count):
+                try:
+                    other = sqlite3.connect(database_path, timeout=0)
+                    other.execute("INSERT INTO logs (created_at, ai_summary, category) "
+                                  "VALUES (?, 'other writer', '其他')", (NOW.isoformat(" "),))
+                    other.commit()
+                    other.close()
+                    blocked.append(False)
+                except sqlite3.OperationalError:
+                    blocked.append(True)
+                yield record
+
+        first_id = ops.session.execute(text("SELECT max(id) FROM logs")).scalar() + 1
+        ops.bulk_import(contended(4), batch_size=2)
+        if not all(blocked):
+            problems.append("another writer inserted while the import was running")
+        imported_ids = ops.session.execute(
+            text("SELECT id FROM logs WHERE ai_summary LIKE 'import %' ORDER BY id")
+        ).scalars().all()
+        if imported_ids != list(range(first_id, first_id + 4)):
+            problems.append(f"imported rows got ids {imported_ids}")
+        ops.session.close()
+
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if not problems:
+        print("ok   failed import rolled back completely; import held the write lock")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
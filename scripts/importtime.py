@@ -0,0 +1,142 @@
+"""Import-time regression check for the timeflow CLI.
+
+Runs each subcommand under ``python -X importtime`` against a throwaway
+database and reports how long the imports it triggers take, keeping the
+fastest of a few runs to filter out noise. A command
+fails the check if it imports a module it must not need (the Gemini SDK,
+PIL or the clipboard stack for anything but ``add``) or if its import
+time, excluding SQLAlchemy, exceeds its budget.
+
+SQLAlchemy is reported separately rather than budgeted: commands that
+touch the database cannot avoid it, and its import cost varies a lot
+between machines.
+
+The package is byte-compiled first: where bytecode is not written
+(PYTHONDONTWRITEBYTECODE, a read-only checkout), every run would
+otherwise recompile each module changed since the last compile and
+count that as import time.
+
+Usage:
+    python scripts/importtime.py [--runs 5] [--budget-scale 1.5]
+"""
+import argparse
+import compileall
+import os
+import subprocess
+import sys
+import tempfile
+
+# Modules only `add` (and `web`, or `report` for numpy) may import
+HEAVY_MODULES = ("google.generativeai", "PIL", "pyperclip", "numpy")
+
+# (arguments, import budget in ms excluding SQLAlchemy)
+CASES = [
+    (["--help"], 150),
+    (["list", "--limit", "1"], 150),
+    (["search", "test"], 150),
+    (["stats"], 150),
+    (["export"], 150),
+    (["add", "--help"], 150),
+]
+
+
+def parse_importtime(stderr: str):
+    """Parse -X importtime output from the point logger.cli is imported.
+
+    Returns:
+        (total us, SQLAlchemy us, set of imported module names)
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, int(cumulative), name.strip()))
+
+    # Skip interpreter startup: keep what logger.cli and the command import
+    names = [name for _, _, name in entries]
+    if "logger.cli" not in names:
+        return None
+    start = names.index("logger.cli")
+    while start > 0 and entries[start - 1][0] > 0:
+        start -= 1
+    entries = entries[start:]
+
+    total = sum(cumulative for depth, cumulative, _ in entries if depth == 0)
+
+    # Children are printed before their parent, so walk backwards to know
+    # each module's importer and count only the outermost SQLAlchemy imports
+    sqlalchemy = 0
+    ancestors = []
+    for depth, cumulative, name in reversed(entries):
+        del ancestors[depth:]
+        is_sqlalchemy = name.split(".")[0] == "sqlalchemy"
+        if is_sqlalchemy and not any(ancestors):
+            sqlalchemy += cumulative
+        ancestors.append(is_sqlalchemy)
+
+    return total, sqlalchemy, set(names[start:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check timeflow CLI import times.")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="runs per command; the fastest one counts")
+    parser.add_argument("--budget-scale", type=float, default=1.0,
+                        help="multiply every budget, for slow machines")
+    options = parser.parse_args()
+
+    import logger
+    compileall.compile_dir(os.path.dirname(logger.__file__), quiet=1)
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(os.environ)
+        env["DATABASE_PATH"] = os.path.join(data_dir, "logger.db")
+        env["IMAGE_STORAGE_PATH"] = os.path.join(data_dir, "images")
+        env["ANALYSIS_CACHE_PATH"] = os.path.join(data_dir, "analysis_cache.db")
+
+        print(f"{'command':<22}{'total':>9}{'sqlalchemy':>12}{'own':>9}{'budget':>9}")
+        for args, budget in CASES:
+            code = f"from logger.cli import cli; cli({args!r}, prog_name='timeflow', standalone_mode=False)"
+            command = " ".join(args)
+            runs = []
+            for _ in range(max(1, options.runs)):
+                result = subprocess.run(
+                    [sys.executable, "-X", "importtime", "-c", code],
+                    env=env, capture_output=True, text=True,
+                )
+                parsed = parse_importtime(result.stderr)
+                if parsed is None:
+                    break
+                runs.append(parsed)
+            if not runs:
+                print(f"{command:<22} FAIL could not run:\n{result.stderr[-2000:]}")
+                failures += 1
+                continue
+
+            total, sqlalchemy, modules = min(runs, key=lambda run: run[0] - run[1])
+            own = (total - sqlalchemy) / 1000
+            limit = budget * options.budget_scale
+
+            problems = []
+            if own > limit:
+                problems.append(f"over budget by {own - limit:.0f} ms")
+            heavy = [name for name in HEAVY_MODULES if name in modules]
+            if heavy and args[0] != "add":
+                problems.append("imports " + ", ".join(heavy))
+            failures += bool(problems)
+
+            print(
+                f"{command:<22}{total / 1000:>7.0f}ms{sqlalchemy / 1000:>10.0f}ms"
+                f"{own:>7.0f}ms{limit:>7.0f}ms  {'FAIL ' + '; '.join(problems) if problems else 'ok'}"
+            )
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Index page benchmark: category filter from get_categories() vs 1000 logs.
+
+Seeds a throwaway database with --logs logs, one category of which only
+appears in the oldest logs, and requests the timeline page ``/`` through
+Starlette's TestClient in two modes:
+
+* before: the category filter built from the categories of the latest
+  1000 logs, as the page used to (``get_logs(limit=1000)``)
+* after: ``get_categories()``, a skip scan over the category index
+
+Reports the category lookup on its own and the page's median and p95
+latency for both. The check fails if the page built with
+get_categories() is missing a category, or is not faster.
+
+Usage:
+    python scripts/index_page.py [--logs 100000] [--runs 50]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from logger.db.models import get_session, init_database
+from logger.db.operations import AsyncLogOperations, LogOperations
+
+CATEGORIES = ["工作", "学习", "娱乐", "运动", "社交", "生活", "其他"]
+# Only used by the oldest logs, beyond the latest 1000
+OLD_CATEGORY = "旧项目"
+
+
+def _seed(database_path: str, count: int):
+    rnd = random.Random(0)
+    ops = LogOperations(get_session(init_database(f"sqlite:///{database_path}")))
+    start = datetime.now() - timedelta(minutes=20 * count)
+    ops.bulk_import(
+        {"created_at": start + timedelta(minutes=20 * i),
+         "ai_summary": f"log {i}",
+         "category": OLD_CATEGORY if i < 100 else rnd.choice(CATEGORIES),
+         "tags": [f"tag{rnd.randrange(50)}"]}
+        for i in range(count)
+    )
+    ops.session.close()
+
+
+async def _categories_from_latest_logs(self) -> list:
+    # The index page before get_categories()
+    logs = await self.get_logs(limit=1000)
+    return sorted(set(log.category for log in logs))
+
+
+def _timings(call, runs: int) -> list:
+    """Milliseconds of each of runs calls, after one warm-up call."""
+    call()
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the index page's category filter.")
+    parser.add_argument("--logs", type=int, default=100000, help="logs to seed")
+    parser.add_argument("--runs", type=int, default=50, help="requests per mode")
+    options = parser.parse_args()
+
+    problems = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        database_path = os.path.join(data_dir, "index.db")
+        _seed(database_path, options.logs)
+        os.environ.update(DATABASE_PATH=database_path, ANALYSIS_WORKER_IN_WEB="false")
+
+        # The app reads its configuration on import
+        from fastapi.testclient import TestClient
+        from logger.web.app import app, engine
+
+        ops = LogOperations(get_session(engine))
+        expected = sorted(category for (category,) in ops.session.execute(
+            text("SELECT DISTINCT category FROM logs")
+        ))
+
+        def fresh(call):
+            # A new session per run, as each request has
+            def run():
+                ops.session.close()
+                return call()
+            return run
+
+        lookups = {
+            "before": lambda: sorted(set(log.category for log in ops.get_logs(limit=1000))),
+            "after": ops.get_categories,
+        }
+        if ops.get_categories() != expected:
+            problems.append("get_categories() differs from SELECT DISTINCT")
+
+        print(f"{options.logs} logs, {len(expected)} categories, {options.runs} requests per mode")
+        print(f"{'mode':<8}{'lookup ms':>11}{'page p50 ms':>13}{'page p95 ms':>13}")
+        medians = {}
+        get_categories = AsyncLogOperations.get_categories
+        try:
+            with TestClient(app) as client:
+                for mode in ("before", "after"):
+                    AsyncLogOperations.get_categories = (
+                        _categories_from_latest_logs if mode == "before" else get_categories
+                    )
+                    lookup = statistics.median(_timings(fresh(lookups[mode]), options.runs))
+                    page = _timings(lambda: client.get("/").raise_for_status(), options.runs)
+                    cuts = statistics.quantiles(page, n=20, method="inclusive")
+                    medians[mode] = cuts[9]
+                    print(f"{mode:<8}{lookup:>11.2f}{cuts[9]:>13.1f}{cuts[18]:>13.1f}")
+                if OLD_CATEGORY not in client.get("/").text:
+                    problems.append(f"index page does not offer {OLD_CATEGORY}")
+        finally:
+            AsyncLogOperations.get_categories = get_categories
+            ops.session.close()
+            engine.dispose()
+
+    if medians["after"] >= medians["before"]:
+        problems.append("index page is not faster with get_categories()")
+    for problem in problems:
+        print(f"FAIL {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
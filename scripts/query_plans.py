@@ -0,0 +1,133 @@
+"""Query plan regression check for the logs database.
+
+Runs the main read paths of LogOperations (and the analysis queue)
+against a throwaway database, captures the SQL they execute and prints
+``EXPLAIN QUERY PLAN`` for it. A case fails if its query does not use the
+index the migrations in ``logger/db/migrations.py`` added for it, or if
+it sorts in a temporary B-tree where the index should provide the order.
+
+Usage:
+    python scripts/query_plans.py [-v]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from logger.db.models import Log, get_session, init_database, rebuild_rollups
+from logger.db.operations import LogOperations, encode_cursor
+from logger.db.queue import AnalysisQueue
+
+NOW = datetime.now()
+
+# (name, call, SQL fragment identifying the statement, expected index,
+#  whether a temporary B-tree is acceptable)
+CASES = [
+    ("timeline", lambda ops: ops.get_logs(limit=50),
+     "FROM logs", "ix_logs_created_at", False),
+    ("timeline by category", lambda ops: ops.get_logs(limit=50, category="工作"),
+     "FROM logs", "ix_logs_category_created_at", False),
+    ("cursor page by category",
+     lambda ops: ops.get_logs_page(limit=50, category="工作", cursor=encode_cursor(
+         ops.session.query(Log).order_by(Log.created_at.desc()).offset(100).first()
+     )),
+     "FROM logs", "ix_logs_category_created_at", False),
+    ("last log of day", lambda ops: ops.get_last_log_of_day(NOW),
+     "FROM logs", "ix_logs_created_at", False),
+    ("previous log of day", lambda ops: ops.auto_update_previous_log_duration(NOW),
+     "ORDER BY logs.created_at DESC", "ix_logs_created_at", False),
+    ("categories", lambda ops: ops.get_categories(),
+     "WITH RECURSIVE", "ix_logs_category_created_at", True),
+    ("rollups for a day range",
+     lambda ops: rebuild_rollups(
+         ops.session.connection(),
+         (NOW - timedelta(days=7)).date().isoformat(),
+         NOW.date().isoformat(),
+     ),
+     "INSERT INTO daily_rollups", "ix_logs_day_category", False),
+    ("timeline by tag", lambda ops: ops.get_logs(limit=50, tag="a"),
+     "FROM logs", "ix_log_tags_tag_id_created_at", False),
+    ("cursor page by tag",
+     lambda ops: ops.get_logs_page(limit=50, tag="a", cursor=encode_cursor(
+         ops.session.query(Log).order_by(Log.created_at.desc()).offset(100).first()
+     )),
+     "FROM logs", "ix_log_tags_tag_id_created_at", False),
+    # Only ties on log_count are sorted, by name
+    ("top tags", lambda ops: ops.get_top_tags(),
+     "FROM tags", "ix_tags_log_count", True),
+    ("co-occurring tags", lambda ops: ops.get_tag_cooccurrence("a"),
+     "FROM tag_pairs", "PRIMARY KEY", True),
+    # The outer regrouping of the per-cell counts sorts at most 7 x 24 x
+    # categories rows; the logs themselves are read in index order
+    ("hour of day", lambda ops: ops.get_time_buckets("hour"),
+     "FROM logs", "ix_logs_weekday_hour", True),
+    ("weekday x hour heatmap", lambda ops: ops.get_heatmap(NOW - timedelta(days=30), NOW),
+     "FROM logs", "ix_logs_created_at", True),
+    # The day partition sorts only the few logs around the moment
+    ("re-chain neighbours", lambda ops: ops._recompute_neighbours([NOW - timedelta(hours=3)]),
+     "SELECT max(created_at) FROM logs", "ix_logs_created_at", True),
+    ("recompute durations", lambda ops: ops.recompute_durations(),
+     "OVER (ORDER BY created_at, id)", "ix_logs_created_at", False),
+    ("claim analysis job", lambda ops: AnalysisQueue(ops.session).claim(),
+     "FROM analysis_jobs", "ix_analysis_jobs_status_available_at", True),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check query plans of the main read paths.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    options = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as data_dir:
+        engine = init_database(f"sqlite:///{os.path.join(data_dir, 'plans.db')}")
+        ops = LogOperations(get_session(engine))
+        ops.bulk_import(
+            {"created_at": NOW - timedelta(minutes=30 * i), "ai_summary": f"log {i}",
+             "category": ("工作", "学习", "娱乐")[i % 3], "tags": ["a", ("b", "c")[i % 2]]}
+            for i in range(2000)
+        )
+
+        captured = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        for name, call, fragment, index, allow_temp_btree in CASES:
+            captured.clear()
+            call(ops)
+            ops.session.rollback()
+            # The last matching statement: earlier ones may set up the case
+            matching = [(sql, params) for sql, params in captured if fragment in sql]
+            if not matching:
+                print(f"FAIL {name}: no statement containing {fragment!r}")
+                failures += 1
+                continue
+            statement, parameters = matching[-1]
+            plan = [
+                row[3] for row in ops.session.connection().exec_driver_sql(
+                    "EXPLAIN QUERY PLAN " + statement, parameters
+                )
+            ]
+            ops.session.rollback()
+
+            problems = []
+            if not any(index in step for step in plan):
+                problems.append(f"does not use {index}")
+            if not allow_temp_btree and any("TEMP B-TREE" in step for step in plan):
+                problems.append("sorts in a temporary B-tree")
+            failures += bool(problems)
+            print(f"{'FAIL' if problems else 'ok  '} {name}{': ' + '; '.join(problems) if problems else ''}")
+            if problems or options.verbose:
+                for step in plan:
+                    print(f"       {step}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Statistics benchmark: rollups vs SQL over logs vs ORM objects.
+
+For each size, seeds a throwaway database with tagged logs spread over
+several years and times all-time statistics three ways:
+
+* ``get_statistics``, answered from the daily rollup tables
+* ``_statistics_from_logs``, grouping the logs table in SQL (what
+  ``get_statistics`` falls back to for ranges that are not whole days)
+* the original implementation, which loaded every ``Log`` object and
+  counted in Python
+
+All three must return the same figures; the script exits non-zero if
+they do not.
+
+Usage:
+    python scripts/stats_bench.py [--sizes 10000,100000,1000000] [--years 5] [--runs 3]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+from logger.db.models import Log, get_session, init_database
+from logger.db.operations import LogOperations
+
+CATEGORIES = ["工作", "学习", "娱乐", "运动", "社交", "生活", "其他"]
+TAGS = [f"tag{i}" for i in range(200)]
+
+
+def _seed(ops: LogOperations, count: int, years: int):
+    rnd = random.Random(0)
+    end = datetime(datetime.now().year, 1, 1)
+    start = end.replace(year=end.year - years)
+    step = (end - start) / count
+    ops.bulk_import(
+        {"created_at": start + step * i,
+         "ai_summary": f"log {i}",
+         "category": rnd.choice(CATEGORIES),
+         "tags": rnd.sample(TAGS, rnd.randint(0, 3)),
+         "duration_estimate": rnd.choice([None, 0, rnd.randint(1, 600)])}
+        for i in range(count)
+    )
+
+
+def _orm_statistics(ops: LogOperations) -> dict:
+    """All-time statistics the way get_statistics computed them before SQL aggregation."""
+    logs = ops.session.query(Log).all()
+    duration_by_category, tags, daily_counts = Counter(), Counter(), Counter()
+    for log in logs:
+        if log.duration_estimate:
+            duration_by_category[log.category] += log.duration_estimate
+        tags.update(log.tags or [])
+        daily_counts[log.created_at.date().isoformat()] += 1
+    return {
+        "total_logs": len(logs),
+        "category_counts": dict(Counter(log.category for log in logs)),
+        "total_duration_minutes": sum(duration_by_category.values()),
+        "duration_by_category": dict(duration_by_category),
+        "top_tags": dict(tags.most_common(10)),
+        "daily_counts": dict(daily_counts),
+        "tag_counts": tags,
+    }
+
+
+def _best(call, runs: int):
+    """Return (fastest ms, last result) over runs calls."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), result
+
+
+def _compare(name: str, stats: dict, orm: dict) -> list:
+    problems = []
+    for key in ("total_logs", "category_counts", "total_duration_minutes",
+                "duration_by_category", "daily_counts"):
+        if stats[key] != orm[key]:
+            problems.append(f"{name}: {key} differs from the ORM objects")
+    # Tags tied on count may be listed in a different order
+    if stats["top_tags"] != {tag: orm["tag_counts"][tag] for tag in stats["top_tags"]} \
+            or sorted(stats["top_tags"].values()) != sorted(orm["top_tags"].values()):
+        problems.append(f"{name}: top_tags differ from the ORM objects")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark get_statistics against the ORM path.")
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="comma-separated numbers of logs to seed")
+    parser.add_argument("--years", type=int, default=5, help="years the logs span")
+    parser.add_argument("--runs", type=int, default=3, help="runs per measurement (fastest kept)")
+    options = parser.parse_args()
+
+    problems = []
+    print(f"all-time statistics, logs over {options.years} years (ms, fastest of {options.runs})")
+    print(f"{'logs':>10}{'rollups':>12}{'SQL logs':>12}{'ORM objects':>14}")
+    for size in (int(value) for value in options.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as data_dir:
+            engine = init_database(f"sqlite:///{os.path.join(data_dir, 'stats.db')}")
+            ops = LogOperations(get_session(engine))
+            _seed(ops, size, options.years)
+
+            def fresh(call):
+                # A new session per run, as each CLI invocation or request has
+                def run():
+                    ops.session.close()
+                    return call()
+                return run
+
+            rollup_ms, rollups = _best(fresh(ops.get_statistics), options.runs)
+            sql_ms, from_logs = _best(fresh(ops._statistics_from_logs), options.runs)
+            orm_ms, orm = _best(fresh(lambda: _orm_statistics(ops)), options.runs)
+            ops.session.close()
+            engine.dispose()
+
+        print(f"{size:>10}{rollup_ms:>12.1f}{sql_ms:>12.1f}{orm_ms:>14.1f}")
+        problems += [f"{size} logs, {problem}" for problem in
+                     _compare("get_statistics", rollups, orm) + _compare("_statistics_from_logs", from_logs, orm)]
+
+    for problem in problems:
+        print(f"FAIL {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Timeline rendering benchmark for the web interface.
+
+Seeds a throwaway database, starts ``timeflow web``'s app under uvicorn
+and loads the timeline the way the index page does: the first page from
+``/``, then further pages from ``/fragments/logs`` until 50, 500 and 5000
+entries are shown. Reports time to first byte of the page, time and
+bytes until each entry count is reached, first with an empty fragment
+cache and then again with the cards cached.
+
+Usage:
+    python scripts/timeline_render.py [--logs 6000] [--page-size 50]
+"""
+import argparse
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from logger.db.models import get_session, init_database
+from logger.db.operations import LogOperations
+
+ENTRY_COUNTS = (50, 500, 5000)
+WORDS = "今天 学习 Python 编程 会议 代码 评审 阅读 文档 调试 数据库 性能 优化 写作 运动 设计 测试".split()
+
+
+def _seed(database_path: str, count: int):
+    rnd = random.Random(0)
+    ops = LogOperations(get_session(init_database(f"sqlite:///{database_path}")))
+    start = datetime.now() - timedelta(minutes=20 * count)
+    ops.bulk_import(
+        {"created_at": start + timedelta(minutes=20 * i),
+         "ai_summary": "".join(rnd.choices(WORDS, k=8)),
+         "category": rnd.choice(["工作", "学习", "娱乐", "生活"]),
+         "original_text": " ".join(rnd.choices(WORDS, k=rnd.randint(10, 120))),
+         "image_path": f"/nonexistent/{i}.webp" if i % 5 == 0 else None,
+         "tags": rnd.sample(WORDS, 3)}
+        for i in range(count)
+    )
+    ops.session.close()
+
+
+def _fetch(port: int, path: str):
+    """GET path; returns (ms to first byte, body, headers)."""
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    started = time.perf_counter()
+    connection.request("GET", path)
+    response = connection.getresponse()
+    first = response.read(1)
+    first_byte = (time.perf_counter() - started) * 1000
+    body = first + response.read()
+    headers = dict(response.getheaders())
+    connection.close()
+    if response.status != 200:
+        raise RuntimeError(f"GET {path}: HTTP {response.status}")
+    return first_byte, body, headers
+
+
+def _load_timeline(port: int, page_size: int):
+    """Scroll through the timeline; returns first-byte ms and per-count (ms, bytes)."""
+    started = time.perf_counter()
+    first_byte, body, _ = _fetch(port, f"/?limit={page_size}")
+    total_bytes = len(body)
+    shown = page_size
+    # The index page links the fragment URL of its next page
+    next_path = f"/fragments/logs?limit={page_size}&cursor=" + body.decode().split(
+        "cursor=", 1)[1].split('"', 1)[0]
+    reached = {}
+    for count in ENTRY_COUNTS:
+        while shown < count and next_path:
+            _, body, headers = _fetch(port, next_path.replace("&amp;", "&"))
+            total_bytes += len(body)
+            shown += page_size
+            next_path = headers.get("x-next-page")
+        reached[count] = ((time.perf_counter() - started) * 1000, total_bytes)
+    return first_byte, reached
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure timeline page and fragment rendering.")
+    parser.add_argument("--logs", type=int, default=6000, help="logs to seed")
+    parser.add_argument("--page-size", type=int, default=50, help="entries per page")
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        database_path = os.path.join(data_dir, "timeline.db")
+        _seed(database_path, options.logs)
+
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        env = dict(os.environ, DATABASE_PATH=database_path, ANALYSIS_WORKER_IN_WEB="false")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "logger.web.app:app",
+             "--port", str(port), "--log-level", "warning"],
+            env=env,
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    _fetch(port, "/health")
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.2)
+
+            print(f"{options.logs} logs, {options.page_size} entries per page")
+            print(f"{'pass':<8}{'entries':>8}{'TTFB ms':>10}{'total ms':>10}{'KB':>10}")
+            for name in ("cold", "cached"):
+                first_byte, reached = _load_timeline(port, options.page_size)
+                for count, (elapsed, total_bytes) in reached.items():
+                    print(f"{name:<8}{count:>8}{first_byte:>10.1f}{elapsed:>10.1f}{total_bytes / 1024:>10.0f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""/api/logs latency while slow /api/stats requests run concurrently.
+
+Seeds a throwaway database and drives ``timeflow web``'s app in-process
+with Starlette's TestClient, whose requests from several threads share
+one event loop like a uvicorn worker. Some clients loop on /api/stats,
+with the statistics query slowed down by --stats-delay to stand in for a
+large history, while one client times sequential /api/logs requests.
+Query parameters vary per request so the response cache never answers.
+
+Runs twice: with database calls made directly on the event loop (how the
+handlers used to call LogOperations) and in worker threads through
+AsyncLogOperations (how they do now). Reports /api/logs p50 and p99; the
+check fails if the threadpool p99 is not below the stats delay.
+
+Usage:
+    python scripts/web_latency.py [--logs 20000] [--stats-clients 4] [--requests 200] [--stats-delay 0.3]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from logger.db.models import get_session, init_database
+from logger.db.operations import AsyncLogOperations, LogOperations
+
+CATEGORIES = ["工作", "学习", "娱乐", "生活"]
+
+
+def _seed(database_path: str, count: int):
+    rnd = random.Random(0)
+    ops = LogOperations(get_session(init_database(f"sqlite:///{database_path}")))
+    start = datetime.now() - timedelta(minutes=20 * count)
+    ops.bulk_import(
+        {"created_at": start + timedelta(minutes=20 * i),
+         "ai_summary": f"log {i}",
+         "category": rnd.choice(CATEGORIES),
+         "tags": [f"tag{rnd.randrange(50)}"]}
+        for i in range(count)
+    )
+    ops.session.close()
+    return start
+
+
+async def _run_inline(self, method, *args, **kwargs):
+    # The query blocks the event loop, as before AsyncLogOperations
+    return method(*args, **kwargs)
+
+
+def _measure(client, first_day: datetime, options) -> list:
+    """Time /api/logs requests while stats clients run; returns latencies in ms."""
+    stop = threading.Event()
+
+    def stats_client(seed: int):
+        rnd = random.Random(seed)
+        while not stop.is_set():
+            # 72 logs a day; every day is a separate cache entry
+            day = first_day + timedelta(days=rnd.randrange(options.logs // 72))
+            client.get("/api/stats", params={"start_date": day.strftime("%Y-%m-%d")})
+
+    threads = [threading.Thread(target=stats_client, args=(i,)) for i in range(options.stats_clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(options.stats_delay)
+
+    latencies = []
+    try:
+        for i in range(options.requests):
+            started = time.perf_counter()
+            response = client.get("/api/logs", params={"limit": 20, "offset": i + 1})
+            latencies.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /api/logs latency under slow /api/stats load.")
+    parser.add_argument("--logs", type=int, default=20000, help="logs to seed")
+    parser.add_argument("--stats-clients", type=int, default=4, help="threads looping on /api/stats")
+    parser.add_argument("--requests", type=int, default=200, help="/api/logs requests timed per mode")
+    parser.add_argument("--stats-delay", type=float, default=0.3,
+                        help="seconds added to every statistics query")
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        database_path = os.path.join(data_dir, "web.db")
+        first_day = _seed(database_path, options.logs)
+        os.environ.update(DATABASE_PATH=database_path, ANALYSIS_WORKER_IN_WEB="false")
+
+        # The app reads its configuration on import
+        from fastapi.testclient import TestClient
+        from logger.web.app import app, engine
+
+        get_statistics = LogOperations.get_statistics
+
+        def slow_statistics(self, *args, **kwargs):
+            time.sleep(options.stats_delay)
+            return get_statistics(self, *args, **kwargs)
+
+        LogOperations.get_statistics = slow_statistics
+        threadpool_run = AsyncLogOperations._run
+
+        print(f"{options.logs} logs, {options.stats_clients} clients on /api/stats "
+              f"slowed by {options.stats_delay * 1000:.0f} ms, {options.requests} /api/logs requests")
+        print(f"{'database calls':<16}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        p99 = {}
+        try:
+            for mode, run in (("on event loop", _run_inline), ("threadpool", threadpool_run)):
+                AsyncLogOperations._run = run
+                with TestClient(app) as client:
+                    latencies = _measure(client, first_day, options)
+                cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+                p99[mode] = cuts[98]
+                print(f"{mode:<16}{cuts[49]:>10.1f}{cuts[98]:>10.1f}{max(latencies):>10.1f}")
+        finally:
+            AsyncLogOperations._run = threadpool_run
+            LogOperations.get_statistics = get_statistics
+            engine.dispose()
+
+    failed = p99["threadpool"] >= options.stats_delay * 1000
+    if failed:
+        print("FAIL /api/logs p99 with the threadpool is not below the stats delay")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Load test: memory, file descriptors and pooled connections stay flat.
+
+Seeds a throwaway database and sends --requests requests to
+``timeflow web``'s app in-process through Starlette's TestClient, cycling
+through the timeline page, its fragments, /api/logs (including a bad
+cursor, which fails with 400), /api/stats and /api/tags. The response
+and fragment caches are disabled so every request opens a session and
+queries the database.
+
+Every --every requests it reports the process RSS, open file
+descriptors, connections checked out of the pool and the total number
+of checkouts so far. After the first report (warm-up), the check fails
+if RSS grows by more than --rss-slack MB, the number of open file
+descriptors changes, or a connection is still checked out between
+requests.
+
+Usage:
+    python scripts/web_resources.py [--logs 5000] [--requests 10000] [--every 1000] [--rss-slack 8]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from logger.db.models import get_session, init_database
+from logger.db.operations import LogOperations
+
+CATEGORIES = ["工作", "学习", "娱乐", "生活"]
+WORDS = "今天 学习 Python 编程 会议 代码 评审 阅读 文档 调试 数据库 性能".split()
+
+
+def _seed(database_path: str, count: int):
+    rnd = random.Random(0)
+    ops = LogOperations(get_session(init_database(f"sqlite:///{database_path}")))
+    start = datetime.now() - timedelta(minutes=20 * count)
+    ops.bulk_import(
+        {"created_at": start + timedelta(minutes=20 * i),
+         "ai_summary": "".join(rnd.choices(WORDS, k=8)),
+         "category": rnd.choice(CATEGORIES),
+         "original_text": " ".join(rnd.choices(WORDS, k=rnd.randint(10, 60))),
+         "tags": rnd.sample(WORDS, 3)}
+        for i in range(count)
+    )
+    ops.session.close()
+    return start
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmRSS not found in /proc/self/status")
+
+
+def _open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+def _requests(first_day: datetime, days: int):
+    """Endless request mix, as (path, params, expected status)."""
+    rnd = random.Random(0)
+    while True:
+        day = (first_day + timedelta(days=rnd.randrange(days))).strftime("%Y-%m-%d")
+        yield "/", {"category": rnd.choice(CATEGORIES + [None])}, 200
+        yield "/fragments/logs", {"start_date": day}, 200
+        yield "/api/logs", {"limit": rnd.randint(1, 100), "offset": rnd.randrange(500)}, 200
+        yield "/api/logs", {"cursor": "not-a-cursor"}, 400
+        yield "/api/stats", {"start_date": day}, 200
+        yield "/api/tags", {"tag": rnd.choice(WORDS)}, 200
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that web requests do not leak memory, fds or connections.")
+    parser.add_argument("--logs", type=int, default=5000, help="logs to seed")
+    parser.add_argument("--requests", type=int, default=10000, help="requests to send")
+    parser.add_argument("--every", type=int, default=1000, help="requests between reports")
+    parser.add_argument("--rss-slack", type=float, default=8, help="allowed RSS growth after warm-up, MB")
+    options = parser.parse_args()
+
+    problems = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        database_path = os.path.join(data_dir, "web.db")
+        first_day = _seed(database_path, options.logs)
+        os.environ.update(
+            DATABASE_PATH=database_path,
+            ANALYSIS_WORKER_IN_WEB="false",
+            RESPONSE_CACHE_MAX_MB="0",
+            FRAGMENT_CACHE_MAX_MB="0",
+        )
+
+        # The app reads its configuration on import
+        from fastapi.testclient import TestClient
+        from logger.web.app import app, engine
+
+        checkouts = [0]
+
+        @event.listens_for(engine, "checkout")
+        def count_checkout(*args):
+            checkouts[0] += 1
+
+        print(f"{options.logs} logs, {options.requests} requests, caches disabled")
+        print(f"{'requests':>10}{'RSS MB':>10}{'open fds':>10}{'checked out':>13}{'checkouts':>11}")
+        baseline = None
+        requests = _requests(first_day, options.logs // 72)
+        with TestClient(app) as client:
+            for sent in range(1, options.requests + 1):
+                path, params, status = next(requests)
+                response = client.get(path, params=params)
+                if response.status_code != status:
+                    problems.append(f"GET {path} {params}: HTTP {response.status_code}")
+                    break
+                if sent % options.every:
+                    continue
+                sample = (_rss_mb(), _open_fds(), engine.pool.checkedout())
+                print(f"{sent:>10}{sample[0]:>10.1f}{sample[1]:>10}{sample[2]:>13}{checkouts[0]:>11}")
+                if sample[2]:
+                    problems.append(f"{sample[2]} connections checked out after {sent} requests")
+                if baseline is None:
+                    baseline = sample
+                    continue
+                if sample[0] - baseline[0] > options.rss_slack:
+                    problems.append(f"RSS grew {sample[0] - baseline[0]:.1f} MB after {sent} requests")
+                if sample[1] != baseline[1]:
+                    problems.append(f"open fds went from {baseline[1]} to {sample[1]} after {sent} requests")
+        engine.dispose()
+
+    for problem in problems:
+        print(f"FAIL {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Year report benchmark: columnar NumPy snapshot vs ORM objects vs rollups.
+
+Seeds a throwaway database with several years of tagged logs and times,
+for one year:
+
+* ``get_statistics`` on the daily rollups (the existing, smaller report)
+* the year report built by iterating ORM ``Log`` objects
+* ``get_year_report`` with an empty columnar cache (bulk load + report)
+* ``get_year_report`` with the columns cached
+
+The figures the reports share (log and category counts, durations, tag
+counts) must agree; the script exits non-zero if they do not.
+
+Usage:
+    python scripts/year_report.py [--logs 200000] [--years 5] [--runs 3]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from logger.db import columnar
+from logger.db.models import get_session, init_database
+from logger.db.operations import LogOperations
+
+CATEGORIES = ["工作", "学习", "娱乐", "运动", "社交", "生活", "其他"]
+TAGS = [f"tag{i}" for i in range(200)]
+
+
+def _seed(ops: LogOperations, count: int, years: int) -> int:
+    """Seed count logs spread over years; returns the middle year."""
+    rnd = random.Random(0)
+    end = datetime(datetime.now().year, 1, 1)
+    start = end.replace(year=end.year - years)
+    step = (end - start) / count
+    ops.bulk_import(
+        {"created_at": start + step * i,
+         "ai_summary": f"log {i}",
+         "category": rnd.choice(CATEGORIES),
+         "tags": rnd.sample(TAGS, rnd.randint(0, 3)),
+         "duration_estimate": rnd.choice([None, 0, rnd.randint(1, 600)])}
+        for i in range(count)
+    )
+    return start.year + years // 2
+
+
+def _orm_report(ops: LogOperations, year: int) -> dict:
+    """The year report's core figures, computed one Log object at a time."""
+    counts, minutes, durations, tags = Counter(), Counter(), defaultdict(list), Counter()
+    months = defaultdict(lambda: [0] * 12)
+    for log in ops.iter_logs(start_date=datetime(year, 1, 1), end_date=datetime(year, 12, 31)):
+        counts[log.category] += 1
+        if log.duration_estimate:
+            minutes[log.category] += log.duration_estimate
+            durations[log.category].append(log.duration_estimate)
+            months[log.category][log.created_at.month - 1] += log.duration_estimate
+        tags.update(log.tags or [])
+    medians = {category: statistics.median(values) for category, values in durations.items()}
+    return {"counts": counts, "minutes": minutes, "medians": medians, "months": months, "tags": tags}
+
+
+def _best(call, runs: int, reset=None):
+    """Return (fastest ms, last result) over runs calls."""
+    timings = []
+    for _ in range(runs):
+        if reset:
+            reset()
+        started = time.perf_counter()
+        result = call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the columnar year report.")
+    parser.add_argument("--logs", type=int, default=200000, help="logs to seed")
+    parser.add_argument("--years", type=int, default=5, help="years the logs span")
+    parser.add_argument("--runs", type=int, default=3, help="runs per measurement (fastest kept)")
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        engine = init_database(f"sqlite:///{os.path.join(data_dir, 'report.db')}")
+        ops = LogOperations(get_session(engine))
+        year = _seed(ops, options.logs, options.years)
+        first, last = datetime(year, 1, 1), datetime(year, 12, 31)
+
+        def fresh(call):
+            # A new session per run, as each CLI invocation or request has
+            def run():
+                ops.session.close()
+                return call()
+            return run
+
+        rollup_ms, stats = _best(fresh(lambda: ops.get_statistics(first, last)), options.runs)
+        orm_ms, orm = _best(fresh(lambda: _orm_report(ops, year)), options.runs)
+        cold_ms, report = _best(
+            fresh(lambda: ops.get_year_report(year)), options.runs, reset=columnar.clear_cache
+        )
+        cached_ms, _ = _best(fresh(lambda: ops.get_year_report(year)), options.runs)
+        columns = columnar.load_columns(ops.session.connection())
+
+        print(f"{options.logs} logs over {options.years} years, report for {year} "
+              f"({report['total_logs']} logs); columns hold {columns.nbytes / 1024 / 1024:.1f} MB")
+        print(f"{'method':<34}{'ms':>10}")
+        for name, elapsed in (
+            ("get_statistics (rollups)", rollup_ms),
+            ("ORM Log objects", orm_ms),
+            ("get_year_report, cold cache", cold_ms),
+            ("get_year_report, cached columns", cached_ms),
+        ):
+            print(f"{name:<34}{elapsed:>10.1f}")
+
+        categories = {row["name"]: row for row in report["categories"]}
+        problems = []
+        if report["total_logs"] != stats["total_logs"]:
+            problems.append("total_logs differs from get_statistics")
+        if {name: row["count"] for name, row in categories.items()} != stats["category_counts"]:
+            problems.append("category counts differ from get_statistics")
+        if {name: row["duration_minutes"] for name, row in categories.items() if row["duration_minutes"]} \
+                != stats["duration_by_category"]:
+            problems.append("durations differ from get_statistics")
+        if sorted(stats["top_tags"].values(), reverse=True) != [count for _, count in report["top_tags"]]:
+            problems.append("top tag counts differ from get_statistics")
+        if {name: row["median_minutes"] for name, row in categories.items()} != orm["medians"]:
+            problems.append("medians differ from the ORM report")
+        if report["monthly_durations"] != dict(orm["months"]):
+            problems.append("monthly durations differ from the ORM report")
+        if dict(report["top_tags"]) != {tag: orm["tags"][tag] for tag, _ in report["top_tags"]}:
+            problems.append("tag counts differ from the ORM report")
+        for problem in problems:
+            print(f"FAIL {problem}")
+
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
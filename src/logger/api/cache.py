@@ -0,0 +1,170 @@
+"""Persistent, content-addressed cache for AI analysis results."""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_cache (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_analysis_cache_accessed_at ON analysis_cache (accessed_at);
+CREATE TABLE IF NOT EXISTS analysis_cache_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Drop the least recently used entries beyond the size budget
+_EVICT_BY_SIZE_SQL = """
+DELETE FROM analysis_cache WHERE key IN (
+    SELECT key FROM (
+        SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS running
+        FROM analysis_cache
+    ) WHERE running > ?
+)
+"""
+
+
+def cache_key(
+    prompt: str,
+    model_name: str,
+    text: Optional[str] = None,
+    image_bytes: Optional[bytes] = None,
+    image_max_dimension: int = 0,
+) -> str:
+    """Hash everything that determines an analysis result.
+
+    Each part is length-prefixed so that different splits of the same
+    bytes never collide. Changing the prompt or the model changes every
+    key, which invalidates earlier entries. The image is sent downscaled
+    to image_max_dimension, so that is part of the key of image inputs;
+    text-only keys do not depend on it.
+    """
+    parts = [prompt.encode("utf-8"), model_name.encode("utf-8"),
+             (text or "").encode("utf-8"), image_bytes or b""]
+    if image_bytes:
+        parts.append(str(image_max_dimension).encode("ascii"))
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """SQLite-backed cache of analysis results, keyed by cache_key().
+
+    Entries older than ``max_age`` seconds are ignored and purged; when the
+    stored results exceed ``max_bytes``, least recently used entries are
+    evicted. Hit and miss counts are kept in the same file so they add up
+    across runs.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, max_age: float = 90 * 86400):
+        """Open (or create) the cache file.
+
+        Args:
+            path: SQLite file to store the cache in
+            max_bytes: Size budget for stored results
+            max_age: Maximum entry age in seconds
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+
+    @classmethod
+    def from_config(cls, config) -> "AnalysisCache":
+        """Open the cache configured by ANALYSIS_CACHE_* settings."""
+        return cls(
+            config.ANALYSIS_CACHE_PATH,
+            max_bytes=int(config.ANALYSIS_CACHE_MAX_MB * 1024 * 1024),
+            max_age=config.ANALYSIS_CACHE_MAX_AGE_DAYS * 86400,
+        )
+
+    def _count(self, name: str):
+        self._connection.execute(
+            "INSERT INTO analysis_cache_stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT result FROM analysis_cache WHERE key = ? AND created_at >= ?",
+                (key, now - self.max_age),
+            ).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            self._connection.execute(
+                "UPDATE analysis_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._count("hits")
+        return json.loads(row[0])
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a result and evict entries past the age or size limits."""
+        payload = json.dumps(result, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, result, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload.encode("utf-8")), now, now),
+                )
+                self._connection.execute(
+                    "DELETE FROM analysis_cache WHERE created_at < ?", (now - self.max_age,)
+                )
+                self._connection.execute(_EVICT_BY_SIZE_SQL, (self.max_bytes,))
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count, stored bytes, hits, misses and hit ratio."""
+        with self._lock:
+            entries, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache"
+            ).fetchone()
+            counters = dict(self._connection.execute(
+                "SELECT name, value FROM analysis_cache_stats"
+            ).fetchall())
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._connection.execute("DELETE FROM analysis_cache")
+            self._connection.execute("DELETE FROM analysis_cache_stats")
+
+    def close(self):
+        """Close the underlying connection."""
+        self._connection.close()
@@ -0,0 +1,63 @@
+"""Local stand-in for the Gemini model, for testing without the API."""
+import json
+import threading
+import time
+from typing import Any, List
+
+
+class FakeQuotaError(Exception):
+    """Raised by FakeGenerativeModel to simulate a 429 quota error."""
+
+    code = 429
+
+
+class FakeResponse:
+    """Minimal response object exposing ``text`` like the Gemini SDK."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Offline model with the same generate_content interface as Gemini.
+
+    Returns a deterministic analysis derived from the text parts, after an
+    optional simulated latency. The first ``quota_errors`` calls raise
+    FakeQuotaError, to exercise retry handling.
+
+    Pass an instance to GeminiAnalyzer as ``model``.
+    """
+
+    def __init__(self, latency: float = 0.0, quota_errors: int = 0):
+        """Initialize the fake model.
+
+        Args:
+            latency: Seconds to sleep per call, to mimic a network round-trip
+            quota_errors: Number of initial calls that fail with a quota error
+        """
+        self.latency = latency
+        self.quota_errors = quota_errors
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, content_parts: List[Any]) -> FakeResponse:
+        """Return a canned JSON analysis for the given content parts."""
+        with self._lock:
+            self.calls += 1
+            fail = self.calls <= self.quota_errors
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise FakeQuotaError("429 Resource has been exhausted (fake)")
+
+        # The first part is always the prompt
+        texts = [part for part in content_parts[1:] if isinstance(part, str)]
+        text = "".join(texts).replace("文字内容：", "").strip()
+        has_image = len(texts) < len(content_parts) - 1
+
+        return FakeResponse(json.dumps({
+            "summary": text[:100] if text else "图片内容",
+            "category": "其他",
+            "tags": ["图片"] if has_image else [],
+            "duration_estimate": 5,
+        }, ensure_ascii=False))
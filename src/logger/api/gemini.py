@@ -1,24 +1,68 @@
 """Gemini API integration for content analysis."""
 import json
-from typing import Optional, Dict, Any
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
 
-import google.generativeai as genai
-from PIL import Image
+from .cache import AnalysisCache, cache_key
+from ..utils.rate_limit import TokenBucket
+
+
+def _is_quota_error(error: Exception) -> bool:
+    """Whether an API error is a rate-limit/quota error worth retrying."""
+    # google.api_core exceptions carry the HTTP status as ``code``
+    return getattr(error, "code", None) == 429 or type(error).__name__ in (
+        "ResourceExhausted",
+        "TooManyRequests",
+    )
 
 
 class GeminiAnalyzer:
     """Analyzer using Google's Gemini API."""
     
-    def __init__(self, api_key: str, model_name: str = "gemini-1.5-flash"):
+    def __init__(
+        self,
+        api_key: Optional[str],
+        model_name: str = "gemini-1.5-flash",
+        model: Optional[Any] = None,
+        cache: Optional[AnalysisCache] = None,
+        image_max_dimension: int = 0,
+    ):
         """Initialize the Gemini analyzer.
         
         Args:
             api_key: Google API key for Gemini
             model_name: Model name to use (default: gemini-1.5-flash)
+            model: Object with a generate_content() method to use instead of
+                a Gemini model, e.g. a FakeGenerativeModel in tests
+            cache: Optional cache of earlier results for identical inputs
+            image_max_dimension: Downscale images to this longest side before
+                sending them, 0 to send them as stored
         """
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name)
+        self.model_name = model_name
+        self.cache = cache
+        self.image_max_dimension = image_max_dimension
+        if model is not None:
+            self.model = model
+        else:
+            # Imported here: the SDK is slow to import and not needed offline
+            import google.generativeai as genai
+            
+            genai.configure(api_key=api_key)
+            self.model = genai.GenerativeModel(model_name)
+    
+    @classmethod
+    def from_config(cls, config) -> "GeminiAnalyzer":
+        """Create an analyzer from config, with the analysis cache unless disabled."""
+        cache = AnalysisCache.from_config(config) if config.ANALYSIS_CACHE_ENABLED else None
+        return cls(
+            config.GEMINI_API_KEY,
+            config.GEMINI_MODEL,
+            cache=cache,
+            image_max_dimension=config.IMAGE_ANALYSIS_MAX_DIMENSION,
+        )
     
     def analyze_content(
         self,
@@ -38,9 +82,88 @@ class GeminiAnalyzer:
                 - tags: List of relevant tags
                 - duration_estimate: Estimated duration in minutes
         """
+        self._check_input(text, image_path)
+        key, cached = self._cache_lookup(text, image_path)
+        if cached is not None:
+            return cached
+        
+        content_parts = self._build_content_parts(text, image_path)
+        
+        # Generate response
+        try:
+            response = self.model.generate_content(content_parts)
+            result = self._parse_response(response.text)
+            self._cache_store(key, result)
+            return result
+        except Exception as e:
+            return self._fallback_result(text, e)
+    
+    def analyze_many(
+        self,
+        items: List[Dict[str, Optional[str]]],
+        max_concurrency: int = 4,
+        requests_per_minute: float = 60,
+        max_retries: int = 3,
+        backoff: float = 2.0,
+    ) -> List[Dict[str, Any]]:
+        """Analyze many inputs concurrently.
+        
+        Requests run on a thread pool, paced by a token bucket shared by all
+        workers. Quota errors (HTTP 429) are retried with exponential backoff
+        and jitter; any other error, or running out of retries, yields the
+        same fallback result as analyze_content. Inputs found in the cache
+        are answered without a request.
+        
+        Args:
+            items: Dicts with "text" and/or "image_path" keys
+            max_concurrency: Maximum number of requests in flight
+            requests_per_minute: Request rate limit
+            max_retries: Retries per item after a quota error
+            backoff: Base delay in seconds, doubled on each retry
+            
+        Returns:
+            One analysis result per item, in input order
+            
+        Raises:
+            ValueError: If an item has neither text nor image_path
+        """
+        limiter = TokenBucket.per_minute(requests_per_minute, burst=max_concurrency)
+        
+        def analyze(item: Dict[str, Optional[str]]) -> Dict[str, Any]:
+            text = item.get("text")
+            self._check_input(text, item.get("image_path"))
+            key, cached = self._cache_lookup(text, item.get("image_path"))
+            if cached is not None:
+                return cached
+            content_parts = self._build_content_parts(text, item.get("image_path"))
+            attempt = 0
+            while True:
+                limiter.acquire()
+                try:
+                    response = self.model.generate_content(content_parts)
+                    result = self._parse_response(response.text)
+                    self._cache_store(key, result)
+                    return result
+                except Exception as e:
+                    if not _is_quota_error(e) or attempt >= max_retries:
+                        return self._fallback_result(text, e)
+                time.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+                attempt += 1
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            # map() yields results in input order
+            return list(executor.map(analyze, items))
+    
+    def _check_input(self, text: Optional[str], image_path: Optional[str]):
+        """Reject an input with nothing to analyze."""
         if not text and not image_path:
             raise ValueError("Either text or image_path must be provided")
+    
+    def _build_content_parts(self, text: Optional[str], image_path: Optional[str]) -> List[Any]:
+        """Assemble the prompt, text and image into model content parts.
         
+        Opens and downscales the image, so call it only after a cache miss.
+        """
         # Prepare the prompt
         prompt = self._create_analysis_prompt()
         
@@ -52,25 +175,51 @@ class GeminiAnalyzer:
         
         if image_path and Path(image_path).exists():
             try:
+                from PIL import Image
+                from ..utils.images import downscale
+                
                 image = Image.open(image_path)
-                content_parts.append(image)
+                # A smaller copy is enough for analysis and much cheaper to upload
+                content_parts.append(downscale(image, self.image_max_dimension))
             except Exception as e:
                 print(f"Warning: Failed to load image: {e}")
         
-        # Generate response
-        try:
-            response = self.model.generate_content(content_parts)
-            result = self._parse_response(response.text)
-            return result
-        except Exception as e:
-            # Fallback response if API fails
-            return {
-                "summary": text[:100] if text else "图片内容",
-                "category": "其他",
-                "tags": [],
-                "duration_estimate": 5,
-                "error": str(e)
-            }
+        return content_parts
+    
+    def _cache_lookup(
+        self, text: Optional[str], image_path: Optional[str]
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Return the cache key for an input and the cached result, if any.
+        
+        Cached results are marked with "cached": True.
+        """
+        if self.cache is None:
+            return None, None
+        image_bytes = None
+        if image_path and Path(image_path).exists():
+            image_bytes = Path(image_path).read_bytes()
+        key = cache_key(
+            self._create_analysis_prompt(), self.model_name, text, image_bytes, self.image_max_dimension
+        )
+        result = self.cache.get(key)
+        if result is not None:
+            result["cached"] = True
+        return key, result
+    
+    def _cache_store(self, key: Optional[str], result: Dict[str, Any]):
+        """Cache a successfully parsed result."""
+        if key is not None and "parse_error" not in result:
+            self.cache.put(key, result)
+    
+    def _fallback_result(self, text: Optional[str], error: Exception) -> Dict[str, Any]:
+        """Fallback response used when the API call fails."""
+        return {
+            "summary": text[:100] if text else "图片内容",
+            "category": "其他",
+            "tags": [],
+            "duration_estimate": 5,
+            "error": str(error)
+        }
     
     def _create_analysis_prompt(self) -> str:
         """Create the analysis prompt for Gemini."""
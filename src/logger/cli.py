@@ -1,21 +1,26 @@
 """Command-line interface for the logger application."""
 import sys
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 import click
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich import box
-from rich.progress import Progress, SpinnerColumn, TextColumn
 
 from .config import config
-from .db.models import init_database, get_session
-from .db.operations import LogOperations
-from .api.gemini import GeminiAnalyzer
-from .utils.clipboard import ClipboardHandler
+
+# SQLAlchemy, the Gemini SDK, PIL, the clipboard stack and the export and
+# import readers are imported inside the commands that use them, so that
+# read-only commands and --help start without loading the AI stack
+# (check with `make importtime`).
+if TYPE_CHECKING:
+    from .api.cache import AnalysisCache
+    from .api.gemini import GeminiAnalyzer
+    from .db.operations import LogOperations
 
 console = Console()
 
@@ -85,6 +90,156 @@ def _interactive_edit_mode(clipboard_handler):
     return final_text, final_image
 
 
+def _render_log_panel(log) -> Panel:
+    """Render a log entry as a Rich panel."""
+    content_lines = []
+    
+    # Time
+    time_str = log.created_at.strftime("%Y-%m-%d %H:%M:%S")
+    content_lines.append(f"[dim]时间：{time_str}[/dim]")
+    
+    # Summary
+    content_lines.append(f"\n[bold]{log.ai_summary}[/bold]")
+    
+    # Original text (preview)
+    if log.original_text:
+        preview = log.original_text[:150] + "..." if len(log.original_text) > 150 else log.original_text
+        content_lines.append(f"\n[dim]原文：{preview}[/dim]")
+    
+    # Image
+    if log.image_path:
+        content_lines.append(f"\n[dim]🖼️  {log.image_path}[/dim]")
+    
+    # Metadata
+    meta = []
+    meta.append(f"[cyan]#{log.id}[/cyan]")
+    meta.append(f"[magenta]{log.category}[/magenta]")
+    if log.tags:
+        meta.append(f"[blue]{', '.join(log.tags)}[/blue]")
+    if log.duration_estimate:
+        meta.append(f"[yellow]⏱ {log.duration_estimate}分钟[/yellow]")
+    
+    content_lines.append("\n" + " | ".join(meta))
+    
+    return Panel(
+        "\n".join(content_lines),
+        border_style="cyan",
+        box=box.ROUNDED,
+    )
+
+
+def _open_log_operations() -> "LogOperations":
+    """Open a database session and wrap it in LogOperations."""
+    from .db.models import init_database, get_session
+    from .db.operations import LogOperations
+    
+    engine = init_database(config.get_database_url(), config.get_sqlite_pragmas())
+    return LogOperations(get_session(engine))
+
+
+def _open_analysis_cache() -> "AnalysisCache":
+    """Open the analysis cache configured in .env."""
+    from .api.cache import AnalysisCache
+    
+    return AnalysisCache.from_config(config)
+
+
+def _create_analyzer() -> "GeminiAnalyzer":
+    """Create a GeminiAnalyzer, with the analysis cache unless disabled."""
+    from .api.gemini import GeminiAnalyzer
+    
+    return GeminiAnalyzer.from_config(config)
+
+
+BATCH_IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+BATCH_TEXT_SUFFIXES = {".txt", ".md"}
+
+
+def _add_batch(directory: str, concurrency: int):
+    """Analyze every image and text file in a directory and save them as logs."""
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    
+    files = sorted(
+        (
+            path for path in Path(directory).iterdir()
+            if path.is_file() and path.suffix.lower() in BATCH_IMAGE_SUFFIXES | BATCH_TEXT_SUFFIXES
+        ),
+        key=lambda path: path.stat().st_mtime,
+    )
+    if not files:
+        console.print(f"[yellow]⚠️  {directory} 中没有找到图片或文本文件[/yellow]")
+        return
+    
+    items = []
+    for path in files:
+        if path.suffix.lower() in BATCH_TEXT_SUFFIXES:
+            items.append({"text": path.read_text(encoding="utf-8").strip() or path.name, "image_path": None})
+        else:
+            items.append({"text": None, "image_path": str(path.resolve())})
+    
+    console.print(f"[yellow]🤖 正在使用 Gemini AI 分析 {len(items)} 个文件（并发 {concurrency}）...[/yellow]")
+    
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=console,
+    ) as progress:
+        task = progress.add_task("分析中...", total=None)
+        
+        started = time.perf_counter()
+        analyzer = _create_analyzer()
+        results = analyzer.analyze_many(
+            items,
+            max_concurrency=concurrency,
+            requests_per_minute=config.GEMINI_REQUESTS_PER_MINUTE,
+            max_retries=config.GEMINI_MAX_RETRIES,
+        )
+        elapsed = time.perf_counter() - started
+        
+        progress.update(task, completed=True)
+    
+    # Save with the files' modification times; bulk_import also chains the durations
+    ops = _open_log_operations()
+    imported = ops.bulk_import(
+        {
+            "created_at": datetime.fromtimestamp(path.stat().st_mtime),
+            "original_text": item["text"],
+            "image_path": item["image_path"],
+            "ai_summary": result["summary"],
+            "category": result["category"],
+            "tags": result["tags"],
+            "duration_estimate": result["duration_estimate"],
+        }
+        for path, item, result in zip(files, items, results)
+    )
+    
+    console.print(f"[green]✅ 已保存 {imported} 条日志，分析用时 {elapsed:.1f} 秒[/green]")
+    
+    cached = sum(1 for result in results if result.get("cached"))
+    if cached:
+        console.print(f"[cyan]⚡ 其中 {cached} 个文件命中分析缓存[/cyan]")
+    
+    failed = sum(1 for result in results if "error" in result or "parse_error" in result)
+    if failed:
+        console.print(f"[yellow]⚠️  注意：{failed} 个文件的 AI 分析出现问题，已保存基本信息。[/yellow]")
+
+
+def _add_to_queue(text: Optional[str], image: Optional[str]):
+    """Save a log right away and queue its analysis for the worker."""
+    from .db.queue import AnalysisQueue
+    
+    ops = _open_log_operations()
+    
+    # Saves the log, queues it and updates the previous log's duration in one commit
+    log, update_result = AnalysisQueue(ops.session).add_pending_log(original_text=text, image_path=image)
+    if update_result:
+        prev_log, calculated_duration = update_result
+        console.print(f"[cyan]⏱  已自动更新上一条日志 (ID: {prev_log.id}) 的时长：{calculated_duration} 分钟[/cyan]")
+    
+    console.print(f"[green]✅ 日志已保存！ (ID: {log.id})，已加入 AI 分析队列[/green]")
+    console.print("[dim]运行 timeflow worker 或 timeflow web 完成分析[/dim]")
+
+
 @click.group()
 def cli():
     """生活日志追踪工具 - 用AI分析你的日常活动"""
@@ -96,14 +251,18 @@ def cli():
 @click.option("--image", "-i", type=click.Path(exists=True), help="指定图片路径")
 @click.option("--edit", "-e", is_flag=True, default=True, help="进入交互编辑模式（默认）")
 @click.option("--no-edit", is_flag=True, help="直接从剪贴板读取，不进入编辑模式")
-def add(text: Optional[str], image: Optional[str], edit: bool, no_edit: bool):
+@click.option("--batch", "-b", "batch_dir", type=click.Path(exists=True, file_okay=False), help="批量分析文件夹中的图片和文本文件")
+@click.option("--concurrency", default=config.GEMINI_MAX_CONCURRENCY, show_default=True, help="批量分析时的并发请求数")
+@click.option("--queue", "-q", is_flag=True, help="立即保存，稍后由后台任务完成 AI 分析")
+def add(text: Optional[str], image: Optional[str], edit: bool, no_edit: bool, batch_dir: Optional[str], concurrency: int, queue: bool):
     """添加新的日志记录"""
     try:
         # Validate configuration
         config.validate()
         
-        # Initialize components
-        clipboard_handler = ClipboardHandler(config.IMAGE_STORAGE_PATH)
+        if batch_dir:
+            _add_batch(batch_dir, concurrency)
+            return
         
         # Determine mode
         use_edit_mode = edit and not no_edit and not text and not image
@@ -112,13 +271,26 @@ def add(text: Optional[str], image: Optional[str], edit: bool, no_edit: bool):
         if text or image:
             # Direct mode with parameters
             pass
-        elif use_edit_mode:
-            # Interactive edit mode
-            text, image = _interactive_edit_mode(clipboard_handler)
         else:
-            # Quick mode: read from clipboard once
-            console.print("[yellow]从剪贴板读取内容...[/yellow]")
-            text, image = clipboard_handler.get_content()
+            from .utils.clipboard import ClipboardHandler
+            from .utils.images import ImagePipeline
+            
+            clipboard_handler = ClipboardHandler(
+                config.IMAGE_STORAGE_PATH,
+                pipeline=ImagePipeline.from_config(config),
+            )
+            if use_edit_mode:
+                # Interactive edit mode
+                text, image = _interactive_edit_mode(clipboard_handler)
+            else:
+                # Quick mode: read from clipboard once
+                console.print("[yellow]从剪贴板读取内容...[/yellow]")
+                text, image = clipboard_handler.get_content()
+            
+            stored = clipboard_handler.last_stored
+            if stored:
+                note = "，与已有图片相同，未重复保存" if stored.deduplicated else ""
+                console.print(f"[dim]图片已压缩保存（{stored.size / 1024:.0f} KB{note}）[/dim]")
         
         if not text and not image:
             console.print("[red]❌ 错误：没有找到任何内容！[/red]")
@@ -132,6 +304,12 @@ def add(text: Optional[str], image: Optional[str], edit: bool, no_edit: bool):
         if image:
             console.print(f"[green]🖼️  图片：[/green]{image}")
         
+        if queue:
+            _add_to_queue(text, image)
+            return
+        
+        from rich.progress import Progress, SpinnerColumn, TextColumn
+        
         # Analyze content with Gemini
         console.print("\n[yellow]🤖 正在使用 Gemini AI 分析内容...[/yellow]")
         
@@ -142,11 +320,14 @@ def add(text: Optional[str], image: Optional[str], edit: bool, no_edit: bool):
         ) as progress:
             task = progress.add_task("分析中...", total=None)
             
-            analyzer = GeminiAnalyzer(config.GEMINI_API_KEY, config.GEMINI_MODEL)
+            analyzer = _create_analyzer()
             result = analyzer.analyze_content(text=text, image_path=image)
             
             progress.update(task, completed=True)
         
+        if result.get("cached"):
+            console.print("[cyan]⚡ 命中分析缓存，未调用 API[/cyan]")
+        
         # Display analysis results
         console.print("\n[bold cyan]📊 分析结果：[/bold cyan]")
         result_table = Table(show_header=False, box=box.ROUNDED, show_edge=False)
@@ -162,19 +343,10 @@ def add(text: Optional[str], image: Optional[str], edit: bool, no_edit: bool):
         
         # Save to database
         console.print("\n[yellow]💾 保存到数据库...[/yellow]")
-        engine = init_database(config.get_database_url())
-        session = get_session(engine)
-        ops = LogOperations(session)
+        ops = _open_log_operations()
         
-        # Auto-update previous log's duration before creating new log
-        new_log_time = datetime.now()
-        update_result = ops.auto_update_previous_log_duration(new_log_time)
-        
-        if update_result:
-            prev_log, calculated_duration = update_result
-            console.print(f"[cyan]⏱  已自动更新上一条日志 (ID: {prev_log.id}) 的时长：{calculated_duration} 分钟[/cyan]")
-        
-        log = ops.create_log(
+        # Save the new log and update the previous log's duration in one commit
+        log, update_result = ops.append_log(
             original_text=text,
             image_path=image,
             ai_summary=result["summary"],
@@ -183,6 +355,10 @@ def add(text: Optional[str], image: Optional[str], edit: bool, no_edit: bool):
             duration_estimate=result["duration_estimate"],
         )
         
+        if update_result:
+            prev_log, calculated_duration = update_result
+            console.print(f"[cyan]⏱  已自动更新上一条日志 (ID: {prev_log.id}) 的时长：{calculated_duration} 分钟[/cyan]")
+        
         console.print(f"[green]✅ 日志已保存！ (ID: {log.id})[/green]")
         
         if "error" in result or "parse_error" in result:
@@ -203,17 +379,18 @@ def add(text: Optional[str], image: Optional[str], edit: bool, no_edit: bool):
 @click.option("--date", "-d", help="显示指定日期的日志 (格式: YYYY-MM-DD)")
 @click.option("--range", "-r", "date_range", nargs=2, help="显示日期范围内的日志")
 @click.option("--category", "-c", help="按分类筛选")
-def list(limit: int, today: bool, date: Optional[str], date_range: Optional[tuple], category: Optional[str]):
+@click.option("--tag", help="按标签筛选")
+@click.option("--cursor", help="从上一页输出的游标处继续浏览")
+def list(limit: int, today: bool, date: Optional[str], date_range: Optional[tuple], category: Optional[str], tag: Optional[str], cursor: Optional[str]):
     """查询日志记录"""
     try:
         # Initialize database
-        engine = init_database(config.get_database_url())
-        session = get_session(engine)
-        ops = LogOperations(session)
+        ops = _open_log_operations()
         
         # Determine query parameters
         start_date = None
         end_date = None
+        next_cursor = None
         
         if today:
             logs = ops.get_logs_today()
@@ -225,11 +402,11 @@ def list(limit: int, today: bool, date: Optional[str], date_range: Optional[tupl
         elif date_range:
             start_date = datetime.strptime(date_range[0], "%Y-%m-%d")
             end_date = datetime.strptime(date_range[1], "%Y-%m-%d")
-            logs = ops.get_logs(limit=1000, category=category, start_date=start_date, end_date=end_date)
+            logs = ops.get_logs(limit=1000, category=category, start_date=start_date, end_date=end_date, tag=tag)
             title = f"📅 {date_range[0]} 至 {date_range[1]} 的日志"
         else:
-            logs = ops.get_logs(limit=limit, category=category)
-            title = f"📋 最近 {limit} 条日志" + (f" (分类: {category})" if category else "")
+            logs, next_cursor = ops.get_logs_page(limit=limit, cursor=cursor, category=category, tag=tag)
+            title = f"📋 最近 {limit} 条日志" + (f" (分类: {category})" if category else "") + (f" (标签: {tag})" if tag else "")
         
         if not logs:
             console.print("[yellow]没有找到符合条件的日志记录。[/yellow]")
@@ -239,42 +416,47 @@ def list(limit: int, today: bool, date: Optional[str], date_range: Optional[tupl
         console.print(f"\n[bold cyan]{title}[/bold cyan]\n")
         
         for log in logs:
-            # Create a panel for each log
-            content_lines = []
-            
-            # Time
-            time_str = log.created_at.strftime("%Y-%m-%d %H:%M:%S")
-            content_lines.append(f"[dim]时间：{time_str}[/dim]")
-            
-            # Summary
-            content_lines.append(f"\n[bold]{log.ai_summary}[/bold]")
-            
-            # Original text (preview)
-            if log.original_text:
-                preview = log.original_text[:150] + "..." if len(log.original_text) > 150 else log.original_text
-                content_lines.append(f"\n[dim]原文：{preview}[/dim]")
-            
-            # Image
-            if log.image_path:
-                content_lines.append(f"\n[dim]🖼️  {log.image_path}[/dim]")
-            
-            # Metadata
-            meta = []
-            meta.append(f"[cyan]#{log.id}[/cyan]")
-            meta.append(f"[magenta]{log.category}[/magenta]")
-            if log.tags:
-                meta.append(f"[blue]{', '.join(log.tags)}[/blue]")
-            if log.duration_estimate:
-                meta.append(f"[yellow]⏱ {log.duration_estimate}分钟[/yellow]")
-            
-            content_lines.append("\n" + " | ".join(meta))
-            
-            panel = Panel(
-                "\n".join(content_lines),
-                border_style="cyan",
-                box=box.ROUNDED,
-            )
-            console.print(panel)
+            console.print(_render_log_panel(log))
+        
+        console.print(f"\n[green]共 {len(logs)} 条记录[/green]")
+        
+        if next_cursor:
+            next_command = f"timeflow list --limit {limit} --cursor {next_cursor}"
+            if category:
+                next_command += f" --category {category}"
+            if tag:
+                next_command += f" --tag {tag}"
+            console.print(f"[dim]下一页：{next_command}[/dim]")
+    
+    except Exception as e:
+        console.print(f"[red]❌ 发生错误：{e}[/red]")
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument("keyword")
+@click.option("--limit", "-l", default=20, help="显示的结果数量")
+@click.option("--reindex", is_flag=True, help="搜索前重建全文索引")
+def search(keyword: str, limit: int, reindex: bool):
+    """全文搜索日志（按相关度排序）"""
+    try:
+        # Initialize database
+        ops = _open_log_operations()
+        
+        if reindex:
+            indexed = ops.rebuild_search_index()
+            console.print(f"[cyan]🔄 已重建全文索引，共 {indexed} 条日志[/cyan]")
+        
+        logs = ops.search_logs(keyword, limit=limit)
+        
+        if not logs:
+            console.print(f"[yellow]没有找到包含 \"{keyword}\" 的日志记录。[/yellow]")
+            return
+        
+        console.print(f"\n[bold cyan]🔍 搜索 \"{keyword}\" 的结果[/bold cyan]\n")
+        
+        for log in logs:
+            console.print(_render_log_panel(log))
         
         console.print(f"\n[green]共 {len(logs)} 条记录[/green]")
     
@@ -283,40 +465,154 @@ def list(limit: int, today: bool, date: Optional[str], date_range: Optional[tupl
         sys.exit(1)
 
 
+@cli.command()
+@click.option("--format", "-f", "export_format", type=click.Choice(["ndjson", "csv", "parquet"]), default="ndjson", help="导出格式")
+@click.option("--output", "-o", type=click.Path(dir_okay=False), help="输出文件（默认输出到标准输出，parquet 必须指定）")
+@click.option("--start", "start", help="开始日期 (格式: YYYY-MM-DD)")
+@click.option("--end", "end", help="结束日期 (格式: YYYY-MM-DD)")
+@click.option("--category", "-c", help="按分类筛选")
+def export(export_format: str, output: Optional[str], start: Optional[str], end: Optional[str], category: Optional[str]):
+    """导出全部日志（流式输出，适合大量数据）"""
+    try:
+        from .utils.export import iter_csv, iter_ndjson, write_parquet
+        
+        if export_format == "parquet" and not output:
+            console.print("[red]❌ 错误：parquet 格式需要使用 --output 指定输出文件[/red]")
+            sys.exit(1)
+        
+        # Initialize database
+        ops = _open_log_operations()
+        
+        logs = ops.iter_logs(
+            category=category,
+            start_date=datetime.strptime(start, "%Y-%m-%d") if start else None,
+            end_date=datetime.strptime(end, "%Y-%m-%d") if end else None,
+        )
+        
+        if export_format == "parquet":
+            written = write_parquet(logs, output)
+        else:
+            chunks = iter_csv(logs) if export_format == "csv" else iter_ndjson(logs)
+            with click.open_file(output or "-", "w", encoding="utf-8") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            written = None
+        
+        if output:
+            count_text = f"，共 {written} 条" if written is not None else ""
+            console.print(f"[green]✅ 已导出到 {output}{count_text}[/green]")
+    
+    except ImportError as e:
+        console.print(f"[red]❌ 错误：{e}[/red]")
+        sys.exit(1)
+    except Exception as e:
+        console.print(f"[red]❌ 发生错误：{e}[/red]")
+        sys.exit(1)
+
+
+@cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "-f", "import_format", type=click.Choice(["ndjson", "csv"]), help="文件格式（默认根据扩展名判断）")
+@click.option("--batch-size", default=5000, show_default=True, help="每批写入的行数")
+def import_logs(path: str, import_format: Optional[str], batch_size: int):
+    """从 NDJSON 或 CSV 文件批量导入日志"""
+    try:
+        from .utils.importer import iter_import_records
+        
+        # Initialize database
+        ops = _open_log_operations()
+        
+        console.print(f"[yellow]📥 正在导入 {path}...[/yellow]")
+        
+        started = time.perf_counter()
+        records = iter_import_records(path, import_format)
+        imported = ops.bulk_import(records, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        
+        rate = imported / elapsed if elapsed > 0 else 0
+        console.print(f"[green]✅ 已导入 {imported} 条日志，用时 {elapsed:.1f} 秒（{rate:,.0f} 条/秒）[/green]")
+    
+    except Exception as e:
+        console.print(f"[red]❌ 发生错误：{e}[/red]")
+        console.print("[dim]导入已回滚，数据库没有任何改动。[/dim]")
+        sys.exit(1)
+
+
+WEEKDAY_NAMES = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+
+def _print_time_buckets(data: dict, title: str):
+    """Print get_time_buckets() output as a table with a bar per bucket."""
+    labels = {
+        "hour": lambda bucket: f"{bucket:02d}:00",
+        "weekday": lambda bucket: WEEKDAY_NAMES[bucket],
+        "week": lambda bucket: f"{bucket} 起",
+    }[data["by"]]
+    heading = {"hour": "按小时", "weekday": "按星期", "week": "按周"}[data["by"]]
+    
+    totals = [sum(values) for values in zip(*data["counts"].values())] or [0] * len(data["buckets"])
+    durations = [sum(values) for values in zip(*data["durations"].values())] or [0] * len(data["buckets"])
+    if not any(totals):
+        console.print("[yellow]没有找到符合条件的日志记录。[/yellow]")
+        return
+    
+    console.print(f"\n[bold cyan]{title}（{heading}）[/bold cyan]\n")
+    
+    table = Table(box=box.ROUNDED)
+    table.add_column("时段", style="magenta")
+    table.add_column("日志数", justify="right", style="cyan")
+    table.add_column("耗时", justify="right", style="yellow")
+    for category in data["categories"]:
+        table.add_column(category, justify="right")
+    table.add_column("分布", style="green")
+    
+    peak = max(totals)
+    for index, bucket in enumerate(data["buckets"]):
+        table.add_row(
+            labels(bucket),
+            str(totals[index]),
+            f"{durations[index] / 60:.1f} 小时",
+            *(str(data["counts"][category][index]) for category in data["categories"]),
+            "█" * round(totals[index] / peak * 20),
+        )
+    
+    console.print(table)
+
+
 @cli.command()
 @click.option("--today", is_flag=True, help="今日统计")
 @click.option("--week", is_flag=True, help="本周统计")
 @click.option("--month", is_flag=True, help="本月统计")
-def stats(today: bool, week: bool, month: bool):
+@click.option("--by", type=click.Choice(["hour", "weekday", "week"]), help="按一天中的小时、星期几或周分组统计")
+def stats(today: bool, week: bool, month: bool, by: Optional[str]):
     """查看统计信息"""
     try:
         # Initialize database
-        engine = init_database(config.get_database_url())
-        session = get_session(engine)
-        ops = LogOperations(session)
+        ops = _open_log_operations()
         
         # Determine time range
         if today:
-            logs = ops.get_logs_today()
             title = "📊 今日统计"
-            start_date = datetime.now().replace(hour=0, minute=0, second=0)
+            start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
             end_date = None
         elif week:
-            logs = ops.get_logs_this_week()
             title = "📊 本周统计"
             start_date = datetime.now() - timedelta(days=datetime.now().weekday())
-            start_date = start_date.replace(hour=0, minute=0, second=0)
+            start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
             end_date = None
         elif month:
-            logs = ops.get_logs_this_month()
             title = "📊 本月统计"
-            start_date = datetime.now().replace(day=1, hour=0, minute=0, second=0)
+            start_date = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
             end_date = None
         else:
             start_date = None
             end_date = None
             title = "📊 总体统计"
         
+        if by:
+            _print_time_buckets(ops.get_time_buckets(by, start_date=start_date, end_date=end_date), title)
+            return
+        
         stats_data = ops.get_statistics(start_date=start_date, end_date=end_date)
         
         console.print(f"\n[bold cyan]{title}[/bold cyan]\n")
@@ -375,6 +671,345 @@ def stats(today: bool, week: bool, month: bool):
         sys.exit(1)
 
 
+@cli.command()
+@click.argument("tag", required=False)
+@click.option("--limit", "-l", default=20, help="显示的标签数量")
+def tags(tag: Optional[str], limit: int):
+    """查看热门标签，或与指定标签同时出现的标签"""
+    try:
+        ops = _open_log_operations()
+        
+        if tag:
+            rows = ops.get_tag_cooccurrence(tag, limit=limit)
+            title = f"🏷️  与 \"{tag}\" 同时出现的标签"
+            count_header = "共同日志数"
+        else:
+            rows = ops.get_top_tags(limit=limit)
+            title = "🏷️  热门标签"
+            count_header = "日志数"
+        
+        if not rows:
+            console.print("[yellow]没有找到标签。[/yellow]")
+            return
+        
+        console.print(f"\n[bold cyan]{title}[/bold cyan]\n")
+        
+        tags_table = Table(box=box.ROUNDED)
+        tags_table.add_column("标签", style="blue")
+        tags_table.add_column(count_header, justify="right", style="cyan")
+        for name, count in rows:
+            tags_table.add_row(name, str(count))
+        
+        console.print(tags_table)
+    
+    except Exception as e:
+        console.print(f"[red]❌ 发生错误：{e}[/red]")
+        sys.exit(1)
+
+
+def _bar(value: float, peak: float, width: int = 20) -> str:
+    return "█" * round(value / peak * width) if peak else ""
+
+
+@cli.command()
+@click.option("--year", "-y", type=int, is_flag=False, flag_value=datetime.now().year, default=datetime.now().year, show_default="今年", help="年度报告的年份")
+def report(year: int):
+    """查看年度报告（需要安装 numpy）"""
+    try:
+        ops = _open_log_operations()
+        
+        data = ops.get_year_report(year)
+        if not data["total_logs"]:
+            console.print(f"[yellow]{year} 年没有日志记录。[/yellow]")
+            return
+        
+        console.print(f"\n[bold cyan]📅 {year} 年度报告[/bold cyan]\n")
+        
+        overview = Table(show_header=False, box=box.SIMPLE)
+        overview.add_column("项目", style="bold")
+        overview.add_column("值", style="cyan")
+        overview.add_row("日志数", str(data["total_logs"]))
+        overview.add_row("总耗时", f"{data['total_duration_minutes'] / 60:.1f} 小时")
+        overview.add_row("记录天数", f"{data['active_days']} 天")
+        overview.add_row("最长连续记录", f"{data['longest_streak']} 天")
+        busiest_day, busiest_count = data["busiest_day"]
+        overview.add_row("记录最多的一天", f"{busiest_day}（{busiest_count} 条）")
+        console.print(overview)
+        
+        category_table = Table(title="分类", box=box.ROUNDED)
+        category_table.add_column("分类", style="magenta")
+        category_table.add_column("日志数", justify="right", style="cyan")
+        category_table.add_column("耗时", justify="right", style="yellow")
+        category_table.add_column("占比", justify="right", style="green")
+        category_table.add_column("中位耗时", justify="right")
+        category_table.add_column("P90 耗时", justify="right")
+        for row in data["categories"]:
+            median, p90 = row["median_minutes"], row["p90_minutes"]
+            category_table.add_row(
+                row["name"],
+                str(row["count"]),
+                f"{row['duration_minutes'] / 60:.1f} 小时",
+                f"{row['count'] / data['total_logs'] * 100:.1f}%",
+                f"{median:.0f} 分钟" if median is not None else "-",
+                f"{p90:.0f} 分钟" if p90 is not None else "-",
+            )
+        console.print(category_table)
+        
+        monthly = data["monthly_durations"]
+        month_totals = [sum(values) for values in zip(*monthly.values())]
+        month_table = Table(title="每月耗时（小时）", box=box.ROUNDED)
+        month_table.add_column("月份", style="magenta")
+        for category in monthly:
+            month_table.add_column(category, justify="right")
+        month_table.add_column("合计", justify="right", style="yellow")
+        month_table.add_column("", style="green")
+        for month, total in enumerate(month_totals):
+            month_table.add_row(
+                f"{month + 1} 月",
+                *(f"{values[month] / 60:.1f}" for values in monthly.values()),
+                f"{total / 60:.1f}",
+                _bar(total, max(month_totals)),
+            )
+        console.print(month_table)
+        
+        histogram = data["duration_histogram"]
+        peak = max(count for _, count in histogram)
+        histogram_table = Table(title="单条耗时分布", box=box.ROUNDED)
+        histogram_table.add_column("耗时", style="magenta")
+        histogram_table.add_column("日志数", justify="right", style="cyan")
+        histogram_table.add_column("", style="green")
+        lower = 0
+        for bound, count in histogram:
+            label = f"{lower + 1}-{bound} 分钟" if bound is not None else f"> {lower} 分钟"
+            histogram_table.add_row(label, str(count), _bar(count, peak))
+            lower = bound
+        console.print(histogram_table)
+        
+        if data["top_tags"]:
+            tags_text = "  ".join(f"{tag} ({count})" for tag, count in data["top_tags"])
+            console.print(f"\n[bold]🏷️  热门标签：[/bold][blue]{tags_text}[/blue]")
+    
+    except ImportError as e:
+        console.print(f"[red]❌ 错误：{e}[/red]")
+        sys.exit(1)
+    except Exception as e:
+        console.print(f"[red]❌ 发生错误：{e}[/red]")
+        sys.exit(1)
+
+
+@cli.command("rebuild-rollups")
+def rebuild_rollups():
+    """重建每日统计汇总表"""
+    try:
+        ops = _open_log_operations()
+        
+        days = ops.rebuild_rollups()
+        
+        console.print(f"[green]✅ 统计汇总已重建，共 {days} 天[/green]")
+    
+    except Exception as e:
+        console.print(f"[red]❌ 发生错误：{e}[/red]")
+        sys.exit(1)
+
+
+@cli.command("recompute-durations")
+@click.option("--since", help="只重新计算此日期及之后的日志 (格式: YYYY-MM-DD)")
+def recompute_durations(since: Optional[str]):
+    """按相邻日志重新计算全部时长，修复删除、导入或改时间后的错误"""
+    try:
+        ops = _open_log_operations()
+        
+        started = time.perf_counter()
+        updated = ops.recompute_durations(datetime.strptime(since, "%Y-%m-%d").date() if since else None)
+        elapsed = time.perf_counter() - started
+        
+        console.print(f"[green]✅ 已重新计算时长，更新了 {updated} 条日志，用时 {elapsed:.1f} 秒[/green]")
+    
+    except Exception as e:
+        console.print(f"[red]❌ 发生错误：{e}[/red]")
+        sys.exit(1)
+
+
+@cli.command()
+@click.option("--once", is_flag=True, help="处理完当前队列后退出")
+def worker(once: bool):
+    """运行后台 AI 分析任务，处理 add --queue 保存的日志"""
+    try:
+        from .db.models import init_database
+        from .worker import AnalysisWorker
+        
+        config.validate()
+        engine = init_database(config.get_database_url(), config.get_sqlite_pragmas())
+        analysis_worker = AnalysisWorker.from_config(engine, config)
+        
+        if once:
+            count = analysis_worker.drain()
+            console.print(f"[green]✅ 已处理 {count} 个分析任务（成功 {analysis_worker.processed}，失败待重试 {analysis_worker.failed}）[/green]")
+            return
+        
+        console.print("[bold cyan]🤖 分析任务已启动，按 Ctrl+C 停止[/bold cyan]")
+        try:
+            analysis_worker.run()
+        except KeyboardInterrupt:
+            console.print(f"\n[yellow]已停止（成功 {analysis_worker.processed}，失败待重试 {analysis_worker.failed}）[/yellow]")
+    
+    except ValueError as e:
+        console.print(f"[red]❌ 配置错误：{e}[/red]")
+        sys.exit(1)
+    except Exception as e:
+        console.print(f"[red]❌ 发生错误：{e}[/red]")
+        sys.exit(1)
+
+
+@cli.command()
+@click.option("--retry-failed", is_flag=True, help="将失败的任务重新加入队列")
+def queue(retry_failed: bool):
+    """查看 AI 分析队列的状态"""
+    try:
+        from .db.queue import AnalysisQueue
+        
+        ops = _open_log_operations()
+        analysis_queue = AnalysisQueue(ops.session)
+        
+        if retry_failed:
+            count = analysis_queue.retry_failed()
+            console.print(f"[green]✅ 已重新排队 {count} 个失败任务[/green]")
+        
+        metrics = analysis_queue.metrics()
+        table = Table(show_header=False, box=box.ROUNDED)
+        table.add_column("Field", style="cyan")
+        table.add_column("Value", style="white")
+        table.add_row("等待中", str(metrics["pending"]))
+        table.add_row("处理中", str(metrics["running"]))
+        table.add_row("已失败", str(metrics["failed"]))
+        table.add_row("最早任务已等待", f"{metrics['lag_seconds']:.0f} 秒")
+        if metrics["next_retry_at"]:
+            table.add_row("下次重试", metrics["next_retry_at"])
+        console.print(table)
+    
+    except Exception as e:
+        console.print(f"[red]❌ 发生错误：{e}[/red]")
+        sys.exit(1)
+
+
+@cli.group()
+def images():
+    """管理已保存的图片"""
+    pass
+
+
+@images.command("compact")
+@click.option("--yes", "-y", is_flag=True, help="不询问确认")
+def images_compact(yes: bool):
+    """按当前图片设置压缩、去重已保存的图片"""
+    try:
+        from .utils.images import ImagePipeline
+        
+        pipeline = ImagePipeline.from_config(config)
+        ops = _open_log_operations()
+        
+        # Only files in the image storage directory are rewritten; images
+        # referenced from elsewhere (e.g. add --image) are left alone
+        paths = [path for path in ops.get_image_paths() if pipeline.is_stored(path)]
+        if not paths:
+            console.print("[yellow]没有需要处理的图片[/yellow]")
+            return
+        
+        if not yes:
+            click.confirm(
+                f"将把 {len(paths)} 张图片重新编码为 {config.IMAGE_FORMAT}"
+                f"（最长边 {config.IMAGE_MAX_DIMENSION}px）并删除原文件，是否继续？",
+                abort=True,
+            )
+        
+        bytes_before = bytes_after = 0
+        compacted = deduplicated = missing = 0
+        stored_paths = set()
+        for path in paths:
+            if not Path(path).exists():
+                missing += 1
+                continue
+            
+            size = Path(path).stat().st_size
+            bytes_before += size
+            if pipeline.is_pipeline_file(path):
+                # Already compacted; decoding and re-encoding would only lose quality
+                if path not in stored_paths:
+                    stored_paths.add(path)
+                    bytes_after += size
+                continue
+            
+            stored = pipeline.store_file(path)
+            # Point the logs at the new file before removing the old one
+            ops.replace_image_path(path, stored.path)
+            Path(path).unlink()
+            compacted += 1
+            if stored.deduplicated:
+                deduplicated += 1
+            if stored.path not in stored_paths:
+                stored_paths.add(stored.path)
+                bytes_after += stored.size
+        
+        saved = bytes_before - bytes_after
+        console.print(f"[green]✅ 已处理 {compacted} 张图片，其中 {deduplicated} 张与已有图片重复[/green]")
+        console.print(
+            f"[green]   {bytes_before / 1024 / 1024:.1f} MB → {bytes_after / 1024 / 1024:.1f} MB，"
+            f"节省 {saved / 1024 / 1024:.1f} MB[/green]"
+        )
+        if missing:
+            console.print(f"[yellow]⚠️  {missing} 张图片文件不存在，已跳过[/yellow]")
+    
+    except click.Abort:
+        raise
+    except Exception as e:
+        console.print(f"[red]❌ 发生错误：{e}[/red]")
+        sys.exit(1)
+
+
+@cli.group()
+def cache():
+    """管理 AI 分析结果缓存"""
+    pass
+
+
+@cache.command("stats")
+def cache_stats():
+    """显示分析缓存的命中统计"""
+    try:
+        analysis_cache = _open_analysis_cache()
+        cache_info = analysis_cache.stats()
+        analysis_cache.close()
+        
+        table = Table(show_header=False, box=box.ROUNDED)
+        table.add_column("Field", style="cyan")
+        table.add_column("Value", style="white")
+        table.add_row("缓存文件", config.ANALYSIS_CACHE_PATH)
+        table.add_row("条目数", str(cache_info["entries"]))
+        table.add_row("占用空间", f"{cache_info['bytes'] / 1024:.1f} KB / {config.ANALYSIS_CACHE_MAX_MB:g} MB")
+        table.add_row("命中 / 未命中", f"{cache_info['hits']} / {cache_info['misses']}")
+        table.add_row("命中率", f"{cache_info['hit_ratio']:.1%}")
+        console.print(table)
+    
+    except Exception as e:
+        console.print(f"[red]❌ 发生错误：{e}[/red]")
+        sys.exit(1)
+
+
+@cache.command("clear")
+def cache_clear():
+    """清空分析缓存"""
+    try:
+        analysis_cache = _open_analysis_cache()
+        analysis_cache.clear()
+        analysis_cache.close()
+        
+        console.print("[green]✅ 分析缓存已清空[/green]")
+    
+    except Exception as e:
+        console.print(f"[red]❌ 发生错误：{e}[/red]")
+        sys.exit(1)
+
+
 @cli.command()
 @click.option("--port", "-p", default=8000, help="Web服务器端口")
 @click.option("--host", "-h", default="127.0.0.1", help="Web服务器主机")
@@ -27,6 +27,20 @@ class Config:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
     
+    # Image pipeline: stored clipboard images are downscaled to
+    # IMAGE_MAX_DIMENSION, re-encoded as IMAGE_FORMAT (webp, jpeg or png)
+    # and deduplicated; Gemini gets a copy no larger than
+    # IMAGE_ANALYSIS_MAX_DIMENSION. 0 disables resizing.
+    IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "2560"))
+    IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "webp").lower()
+    IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+    IMAGE_ANALYSIS_MAX_DIMENSION = int(os.getenv("IMAGE_ANALYSIS_MAX_DIMENSION", "1024"))
+    
+    # Batch analysis limits (timeflow add --batch)
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+    GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+    GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+    
     # Database Configuration
     # If DATABASE_PATH is set and is absolute, use it
     # If it's relative, resolve it relative to ROOT_DIR
@@ -56,6 +70,63 @@ class Config:
         # Default: use home directory
         IMAGE_STORAGE_PATH = str(DEFAULT_DATA_DIR / "images")
     
+    # Thumbnails served by the web timeline (/images/{log_id}?size=thumb),
+    # generated on first request and cached on disk
+    THUMBNAIL_MAX_DIMENSION = int(os.getenv("THUMBNAIL_MAX_DIMENSION", "320"))
+    THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "70"))
+    _thumb_path = os.getenv("THUMBNAIL_CACHE_PATH")
+    if _thumb_path and not Path(_thumb_path).is_absolute():
+        _thumb_path = str(ROOT_DIR / _thumb_path)
+    THUMBNAIL_CACHE_PATH = _thumb_path or str(Path(IMAGE_STORAGE_PATH) / "thumbs")
+    
+    # Analysis cache configuration
+    # Results are keyed by prompt, model, text and image bytes, so repeated
+    # content is answered locally instead of by another API call.
+    ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    _cache_path = os.getenv("ANALYSIS_CACHE_PATH")
+    if _cache_path and not Path(_cache_path).is_absolute():
+        _cache_path = str(ROOT_DIR / _cache_path)
+    ANALYSIS_CACHE_PATH = _cache_path or str(Path(DATABASE_PATH).parent / "analysis_cache.db")
+    ANALYSIS_CACHE_MAX_MB = float(os.getenv("ANALYSIS_CACHE_MAX_MB", "50"))
+    ANALYSIS_CACHE_MAX_AGE_DAYS = float(os.getenv("ANALYSIS_CACHE_MAX_AGE_DAYS", "90"))
+    
+    # Background analysis queue (timeflow add --queue)
+    ANALYSIS_QUEUE_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_QUEUE_MAX_ATTEMPTS", "5"))
+    ANALYSIS_QUEUE_RETRY_DELAY = float(os.getenv("ANALYSIS_QUEUE_RETRY_DELAY", "30"))  # seconds, doubled per retry
+    ANALYSIS_QUEUE_POLL_INTERVAL = float(os.getenv("ANALYSIS_QUEUE_POLL_INTERVAL", "2"))  # seconds
+    # Run a queue worker inside `timeflow web`
+    ANALYSIS_WORKER_IN_WEB = os.getenv("ANALYSIS_WORKER_IN_WEB", "true").lower() in ("1", "true", "yes")
+    
+    # Web API response cache (/api/stats, /api/logs, /api/tags), invalidated
+    # by any write to the database. 0 disables it.
+    RESPONSE_CACHE_MAX_MB = float(os.getenv("RESPONSE_CACHE_MAX_MB", "16"))
+    
+    # Rendered timeline cards, each reused until its log changes. 0 disables it.
+    FRAGMENT_CACHE_MAX_MB = float(os.getenv("FRAGMENT_CACHE_MAX_MB", "8"))
+    
+    # Live updates (/api/stream): how often the database files are checked
+    # for writes by other processes, and the idle keep-alive period
+    STREAM_WATCH_INTERVAL = float(os.getenv("STREAM_WATCH_INTERVAL", "1"))  # seconds
+    STREAM_KEEPALIVE = float(os.getenv("STREAM_KEEPALIVE", "15"))  # seconds
+    
+    # Database connection pool configuration
+    # SQLite allows one writer at a time, so a small pool is enough; extra
+    # connections mostly help concurrent readers in the web app.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))  # seconds, -1 disables
+    
+    # SQLite connection profile, applied to every new connection. WAL lets
+    # readers (e.g. `timeflow web`) keep going while the CLI writes, and
+    # synchronous=NORMAL is still crash-safe in WAL mode.
+    DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL").upper()
+    DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL").upper()
+    DB_BUSY_TIMEOUT = int(os.getenv("DB_BUSY_TIMEOUT", "5000"))  # milliseconds to wait for a lock
+    DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes, 0 disables
+    DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", "-16000"))  # pages, or KiB if negative
+    DB_TEMP_STORE = os.getenv("DB_TEMP_STORE", "MEMORY").upper()
+    
     @classmethod
     def validate(cls):
         """Validate required configuration."""
@@ -72,6 +143,29 @@ class Config:
     def get_database_url(cls):
         """Get SQLAlchemy database URL."""
         return f"sqlite:///{cls.DATABASE_PATH}"
+    
+    @classmethod
+    def get_sqlite_pragmas(cls):
+        """Get the PRAGMAs to run on every new SQLite connection, in order."""
+        return {
+            # First, so that switching the journal mode waits for locks
+            "busy_timeout": cls.DB_BUSY_TIMEOUT,
+            "journal_mode": cls.DB_JOURNAL_MODE,
+            "synchronous": cls.DB_SYNCHRONOUS,
+            "mmap_size": cls.DB_MMAP_SIZE,
+            "cache_size": cls.DB_CACHE_SIZE,
+            "temp_store": cls.DB_TEMP_STORE,
+        }
+    
+    @classmethod
+    def get_engine_options(cls):
+        """Get SQLAlchemy engine keyword arguments for the connection pool."""
+        return {
+            "pool_size": cls.DB_POOL_SIZE,
+            "max_overflow": cls.DB_MAX_OVERFLOW,
+            "pool_timeout": cls.DB_POOL_TIMEOUT,
+            "pool_recycle": cls.DB_POOL_RECYCLE,
+        }
 
 
 # Create a singleton instance
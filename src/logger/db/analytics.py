@@ -0,0 +1,267 @@
+"""Time-bucketed analytics: hour-of-day, weekday, week and day series.
+
+Everything is aggregated in SQLite. Hour-of-day figures group the
+generated weekday/hour columns in the order of the ix_logs_weekday_hour
+index, which holds their values. Weekday, week and day figures group the
+daily_rollups table, whose size grows with days rather than logs.
+Rolling averages come from window functions over a calendar generated
+in SQL, so days without logs still count towards every window.
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+BUCKETS = ("hour", "weekday", "week", "day")
+ROLLING_WINDOWS = (7, 30)
+
+# Days in a day series without a start date; the window functions cost
+# the most of any bucket, and years of daily points are rarely wanted
+DEFAULT_DAY_SERIES_DAYS = 365
+
+# Below this many days, walking the created_at index for the range reads
+# fewer rows than scanning the whole time-of-day index
+_INDEXED_RANGE_MAX_DAYS = 180
+
+# Logs per (weekday, hour, category) cell; weekday is 0 = Monday
+_TIME_OF_DAY_CELLS_SQL = """
+    SELECT (weekday + 6) % 7 AS weekday, hour, category,
+           count(*) AS log_count, coalesce(sum(duration_estimate), 0) AS duration
+    FROM logs
+    WHERE {where}
+    GROUP BY weekday, hour, category
+"""
+
+_HOUR_SQL = f"""
+    WITH cells AS ({_TIME_OF_DAY_CELLS_SQL})
+    SELECT hour, category, sum(log_count), sum(duration)
+    FROM cells GROUP BY hour, category
+"""
+
+_HEATMAP_SQL = f"""
+    WITH cells AS ({_TIME_OF_DAY_CELLS_SQL})
+    SELECT weekday, hour, sum(log_count), sum(duration)
+    FROM cells GROUP BY weekday, hour
+"""
+
+_WEEKDAY_SQL = """
+    SELECT (CAST(strftime('%w', day) AS INTEGER) + 6) % 7 AS weekday, category,
+           sum(log_count), sum(duration_total)
+    FROM daily_rollups
+    WHERE day >= :first AND day <= :last
+    GROUP BY weekday, category
+"""
+
+# Monday of each day's week: 'weekday 0' moves forward to Sunday
+_WEEK_SQL = """
+    SELECT date(day, 'weekday 0', '-6 days') AS week, category,
+           sum(log_count), sum(duration_total)
+    FROM daily_rollups
+    WHERE day >= :first AND day <= :last
+    GROUP BY week, category
+"""
+
+_ROLLING_COLUMNS_SQL = ",\n".join(
+    f"round(sum(duration) OVER (PARTITION BY category ORDER BY day "
+    f"ROWS {window - 1} PRECEDING) / {window}.0, 1) AS rolling_{window}"
+    for window in ROLLING_WINDOWS
+)
+
+# Every (day, category) from the longest window before :first to :last,
+# so each rolling window has all its days even where nothing was logged
+_DAY_SQL = f"""
+    WITH RECURSIVE calendar(day) AS (
+        SELECT date(:first, '-{max(ROLLING_WINDOWS) - 1} days')
+        UNION ALL
+        SELECT date(day, '+1 day') FROM calendar WHERE day < :last
+    ),
+    categories AS (
+        SELECT DISTINCT category FROM daily_rollups
+        WHERE day >= date(:first, '-{max(ROLLING_WINDOWS) - 1} days') AND day <= :last
+    ),
+    series AS (
+        SELECT calendar.day, categories.category,
+               coalesce(rollup.log_count, 0) AS log_count,
+               coalesce(rollup.duration_total, 0) AS duration
+        FROM calendar CROSS JOIN categories
+        LEFT JOIN daily_rollups AS rollup
+          ON rollup.day = calendar.day AND rollup.category = categories.category
+    ),
+    rolling AS (
+        SELECT day, category, log_count, duration,
+               {_ROLLING_COLUMNS_SQL}
+        FROM series
+    )
+    SELECT * FROM rolling WHERE day >= :first
+"""
+
+
+def _day_range(
+    connection,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+) -> Optional[Tuple[str, str]]:
+    """Return the first and last day to report, or None if nothing was logged.
+
+    Open ends are narrowed to the first and last day with logs.
+    """
+    first, last = connection.execute(text(
+        "SELECT min(day), max(day) FROM daily_rollups"
+    )).one()
+    if first is None:
+        return None
+    if start_date:
+        first = start_date.date().isoformat()
+    if end_date:
+        last = end_date.date().isoformat()
+    return (first, last) if first <= last else None
+
+
+def _time_of_day_where(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    category: Optional[str],
+) -> Tuple[str, Dict[str, Any]]:
+    """Build the WHERE clause and parameters for the time-of-day cells."""
+    conditions = ["1"]
+    params: Dict[str, Any] = {}
+    # A unary + keeps the planner off ix_logs_created_at, which would
+    # visit every log of a long range in the table instead of the index
+    column = "created_at"
+    if not (start_date and end_date and (end_date - start_date).days <= _INDEXED_RANGE_MAX_DAYS):
+        column = "+created_at"
+    if start_date:
+        conditions.append(f"{column} >= :start")
+        params["start"] = datetime.combine(start_date.date(), datetime.min.time())
+    if end_date:
+        conditions.append(f"{column} < :end")
+        params["end"] = datetime.combine(end_date.date() + timedelta(days=1), datetime.min.time())
+    if category:
+        conditions.append("category = :category")
+        params["category"] = category
+    return " AND ".join(conditions), params
+
+
+def _matrix(rows, buckets: List[Any]) -> Tuple[List[str], List[Dict[str, List[Any]]]]:
+    """Arrange (bucket, category, value, ...) rows into per-category lists.
+
+    Returns:
+        Tuple of (sorted categories, one {category: [value per bucket]}
+        dict per value column); buckets without a row get 0
+    """
+    position = {bucket: index for index, bucket in enumerate(buckets)}
+    series: Dict[str, List[List[Any]]] = {}
+    for bucket, category, *values in rows:
+        if category not in series:
+            series[category] = [[0] * len(buckets) for _ in values]
+        for column, value in zip(series[category], values):
+            column[position[bucket]] = value
+    categories = sorted(series)
+    value_count = len(next(iter(series.values()))) if series else 0
+    return categories, [
+        {category: series[category][column] for category in categories}
+        for column in range(value_count)
+    ]
+
+
+def time_buckets(
+    connection,
+    by: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Log counts and durations per category, bucketed by time.
+
+    Args:
+        connection: Database connection
+        by: "hour" (of day, 0-23), "weekday" (0 = Monday), "week" (the
+            Monday starting it) or "day"
+        start_date: First day to include, or None for the first log
+            (for by="day", the last DEFAULT_DAY_SERIES_DAYS days)
+        end_date: Last day to include, or None for the last log
+
+    Returns:
+        Dict with by, buckets, categories, and counts and durations
+        (minutes) as {category: [value per bucket]}. For by="day" also
+        rolling_7 and rolling_30: {category: [average minutes per day
+        over the 7 or 30 days ending at each bucket]}
+
+    Raises:
+        ValueError: If by is not one of BUCKETS
+    """
+    if by not in BUCKETS:
+        raise ValueError(f"Unknown bucket {by!r}; expected one of {', '.join(BUCKETS)}")
+
+    if by == "hour":
+        buckets: List[Any] = list(range(24))
+        where, params = _time_of_day_where(start_date, end_date, None)
+        rows = connection.execute(text(_HOUR_SQL.format(where=where)), params).all()
+    elif by == "weekday":
+        buckets = list(range(7))
+        day_range = _day_range(connection, start_date, end_date)
+        rows = connection.execute(text(_WEEKDAY_SQL), {
+            "first": day_range[0], "last": day_range[1],
+        }).all() if day_range else []
+    else:
+        day_range = _day_range(connection, start_date, end_date)
+        rows = []
+        buckets = []
+        if day_range:
+            first, last = (date.fromisoformat(day) for day in day_range)
+            step = timedelta(days=7 if by == "week" else 1)
+            if by == "week":
+                first -= timedelta(days=first.weekday())
+            elif start_date is None:
+                first = max(first, last - timedelta(days=DEFAULT_DAY_SERIES_DAYS - 1))
+                day_range = (first.isoformat(), day_range[1])
+            buckets = [
+                (first + step * index).isoformat()
+                for index in range((last - first) // step + 1)
+            ]
+            params = {"first": day_range[0], "last": day_range[1]}
+            if by == "week":
+                rows = connection.execute(text(_WEEK_SQL), params).all()
+            else:
+                rows = connection.execute(text(_DAY_SQL), params).all()
+
+    categories, series = _matrix(rows, buckets)
+    result = {
+        "by": by,
+        "buckets": buckets,
+        "categories": categories,
+        "counts": series[0] if series else {},
+        "durations": series[1] if series else {},
+    }
+    if by == "day":
+        for offset, window in enumerate(ROLLING_WINDOWS):
+            result[f"rolling_{window}"] = series[2 + offset] if series else {}
+    return result
+
+
+def time_of_day_heatmap(
+    connection,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Log counts and durations as a weekday x hour matrix.
+
+    Returns:
+        Dict with weekdays (0 = Monday), hours, and counts and durations
+        (minutes) as 7 lists of 24 values
+    """
+    where, params = _time_of_day_where(start_date, end_date, category)
+    counts = [[0] * 24 for _ in range(7)]
+    durations = [[0] * 24 for _ in range(7)]
+    for weekday, hour, log_count, duration in connection.execute(
+        text(_HEATMAP_SQL.format(where=where)), params
+    ):
+        counts[weekday][hour] = log_count
+        durations[weekday][hour] = duration
+    return {
+        "category": category,
+        "weekdays": list(range(7)),
+        "hours": list(range(24)),
+        "counts": counts,
+        "durations": durations,
+    }
@@ -0,0 +1,291 @@
+"""Columnar snapshot of the logs table for whole-history reports.
+
+Year-in-review style reports touch every log, and building an ORM object
+per row costs far more than the arithmetic. LogColumns holds created_at,
+category, duration_estimate and the tags of every log as NumPy arrays,
+loaded with one bulk SELECT per table: timestamps as int64 seconds,
+categories and tags dictionary-encoded as small integer codes. Reports
+are then vectorized group-bys (bincount) over those arrays.
+
+Loaded columns are cached per database and reused until max(id) or the
+database generation changes, so repeated reports skip the load.
+
+Requires the optional numpy package.
+"""
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from .generation import database_generation, write_generation
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, checked in load_columns
+    np = None
+
+# duration_estimate of logs without one
+NO_DURATION = -1
+
+# Upper bounds (minutes) of the duration histogram bins; the last bin is open
+DURATION_BINS = (15, 30, 60, 120, 240, 480)
+
+SECONDS_PER_DAY = 86400
+
+# Each column comes back as one comma-separated string, parsed by NumPy
+# in C: fetching a Python tuple per row costs more than the whole query.
+# One aggregate pass visits the rows in the same order for every column.
+_LOGS_SQL = """
+    SELECT group_concat(id), group_concat(strftime('%s', created_at)),
+           group_concat(category, char(31)),
+           group_concat(coalesce(duration_estimate, -1))
+    FROM logs
+"""
+
+_LOG_TAGS_SQL = "SELECT group_concat(log_id), group_concat(tag_id) FROM log_tags"
+
+_SEPARATOR = "\x1f"
+
+
+@dataclass
+class LogColumns:
+    """Every log as parallel arrays, ordered by id.
+
+    Timestamps are the logs' local wall-clock time as seconds since
+    1970-01-01, so calendar fields come out unshifted. Tags are stored
+    as (row, tag code) pairs, one per tag of a log.
+    """
+
+    ids: "np.ndarray"            # int64
+    created_at: "np.ndarray"     # int64 seconds
+    category_codes: "np.ndarray"  # int32 index into categories
+    durations: "np.ndarray"      # int32 minutes, NO_DURATION if unknown
+    tag_rows: "np.ndarray"       # int32 index into the arrays above
+    tag_codes: "np.ndarray"      # int32 index into tag_names
+    categories: List[str]
+    tag_names: List[str]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the arrays."""
+        return sum(array.nbytes for array in (
+            self.ids, self.created_at, self.category_codes,
+            self.durations, self.tag_rows, self.tag_codes,
+        ))
+
+
+_cache: Dict[str, Tuple[Tuple, LogColumns]] = {}
+_cache_lock = threading.Lock()
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError(
+            "Columnar reports require numpy. Install it with: pip install numpy"
+        )
+
+
+def _integers(joined: Optional[str], dtype) -> "np.ndarray":
+    """Parse a group_concat of integers (NULL for no rows)."""
+    return np.fromstring(joined or "", dtype=dtype, sep=",")
+
+
+def _encode(values: List[str]) -> Tuple["np.ndarray", List[str]]:
+    """Dictionary-encode strings as codes into their sorted distinct values."""
+    names = sorted(set(values))
+    index = {name: code for code, name in enumerate(names)}
+    codes = np.fromiter(map(index.__getitem__, values), dtype=np.int32, count=len(values))
+    return codes, names
+
+
+def read_columns(connection) -> LogColumns:
+    """Load every log into a LogColumns with one aggregate SELECT per table."""
+    _require_numpy()
+    ids, created_at, categories, durations = connection.exec_driver_sql(_LOGS_SQL).one()
+    ids = _integers(ids, np.int64)
+    category_codes, category_names = _encode(categories.split(_SEPARATOR) if categories else [])
+    # The planner may read a covering index rather than the table
+    order = np.argsort(ids, kind="stable")
+    ids = ids[order]
+
+    log_ids, tag_ids = connection.exec_driver_sql(_LOG_TAGS_SQL).one()
+    tag_ids = _integers(tag_ids, np.int64)
+    # Tag ids are already a dictionary encoding; compact them into codes
+    # of the tags in use, in name order
+    names = dict(connection.exec_driver_sql("SELECT id, name FROM tags").fetchall())
+    used = sorted(set(tag_ids.tolist()), key=names.__getitem__)
+    lookup = np.zeros(max(used, default=0) + 1, dtype=np.int32)
+    lookup[used] = np.arange(len(used), dtype=np.int32)
+
+    return LogColumns(
+        ids=ids,
+        created_at=_integers(created_at, np.int64)[order],
+        category_codes=category_codes[order],
+        durations=_integers(durations, np.int32)[order],
+        tag_rows=np.searchsorted(ids, _integers(log_ids, np.int64)).astype(np.int32),
+        tag_codes=lookup[tag_ids],
+        categories=category_names,
+        tag_names=[names[tag_id] for tag_id in used],
+    )
+
+
+def _signature(connection) -> Tuple:
+    """Identify the data a LogColumns was loaded from.
+
+    max(id) is a single seek of the primary key and catches new logs from
+    any process; the database generation catches edits and deletes.
+    """
+    max_id = connection.execute(text("SELECT max(id) FROM logs")).scalar()
+    database = connection.engine.url.database
+    if database and database != ":memory:":
+        return (max_id,) + database_generation(database)
+    return max_id, write_generation.value
+
+
+def load_columns(connection) -> LogColumns:
+    """Return the columns of every log, from the cache while unchanged.
+
+    Raises:
+        ImportError: If numpy is not installed
+    """
+    _require_numpy()
+    key = str(connection.engine.url)
+    signature = _signature(connection)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    columns = read_columns(connection)
+    with _cache_lock:
+        _cache[key] = (signature, columns)
+    return columns
+
+
+def clear_cache():
+    """Drop every cached LogColumns."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _epoch_seconds(day: date) -> int:
+    return (day - date(1970, 1, 1)).days * SECONDS_PER_DAY
+
+
+def _percentiles(durations: "np.ndarray", codes: "np.ndarray", count: int, q: float) -> List[Optional[float]]:
+    """q-th percentile of durations per code, None where a code has none."""
+    result: List[Optional[float]] = []
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(count + 1))
+    for code in range(count):
+        values = durations[order[bounds[code]:bounds[code + 1]]]
+        result.append(float(np.percentile(values, q)) if len(values) else None)
+    return result
+
+
+def year_report(columns: LogColumns, year: int, top_tags: int = 10) -> Dict[str, Any]:
+    """Year-in-review figures, computed with vectorized group-bys.
+
+    Durations count the logs with a positive duration_estimate, as
+    get_statistics does.
+
+    Args:
+        columns: Columns from load_columns
+        year: Calendar year to report
+        top_tags: Number of most used tags to return
+
+    Returns:
+        Dict with year, total_logs, total_duration_minutes, active_days,
+        longest_streak, busiest_day, categories (name, count, duration,
+        median and p90 duration per category), monthly_durations
+        ({category: [minutes per month]}), hour_counts (24 values),
+        duration_histogram ([(upper bound or None, count)]) and
+        top_tags ([(tag, count)])
+    """
+    first = _epoch_seconds(date(year, 1, 1))
+    last = _epoch_seconds(date(year + 1, 1, 1))
+    # ids and created_at rise together for logs written in order, but
+    # imports and edits can break that, so select with a mask
+    in_year = (columns.created_at >= first) & (columns.created_at < last)
+    rows = np.flatnonzero(in_year)
+
+    seconds = columns.created_at[rows]
+    codes = columns.category_codes[rows]
+    durations = columns.durations[rows]
+    timed = durations > 0
+    category_count = len(columns.categories)
+
+    counts = np.bincount(codes, minlength=category_count)
+    minutes = np.bincount(codes[timed], weights=durations[timed], minlength=category_count)
+    medians = _percentiles(durations[timed], codes[timed], category_count, 50)
+    p90s = _percentiles(durations[timed], codes[timed], category_count, 90)
+    categories = [
+        {
+            "name": name,
+            "count": int(counts[code]),
+            "duration_minutes": int(minutes[code]),
+            "median_minutes": medians[code],
+            "p90_minutes": p90s[code],
+        }
+        for code, name in enumerate(columns.categories) if counts[code]
+    ]
+    categories.sort(key=lambda row: row["count"], reverse=True)
+
+    # Month of each log, 0-11, from its day number
+    days = seconds // SECONDS_PER_DAY
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) % 12
+    monthly = np.bincount(
+        codes[timed] * 12 + months[timed], weights=durations[timed],
+        minlength=category_count * 12,
+    ).reshape(category_count, 12)
+
+    day_counts = np.bincount(days - first // SECONDS_PER_DAY) if len(days) else np.zeros(0, dtype=np.int64)
+    active = day_counts > 0
+    # Longest run of consecutive active days: lengths between inactive days
+    breaks = np.flatnonzero(np.concatenate(([True], ~active, [True])))
+    longest_streak = int((np.diff(breaks) - 1).max()) if len(breaks) > 1 else 0
+    busiest_day = None
+    if len(day_counts):
+        busiest = int(day_counts.argmax())
+        busiest_day = (
+            date.fromordinal(date(year, 1, 1).toordinal() + busiest).isoformat(),
+            int(day_counts[busiest]),
+        )
+
+    hours = np.bincount((seconds % SECONDS_PER_DAY) // 3600, minlength=24)
+    histogram = np.bincount(
+        np.searchsorted(DURATION_BINS, durations[timed], side="left"),
+        minlength=len(DURATION_BINS) + 1,
+    )
+
+    tag_codes = columns.tag_codes[in_year[columns.tag_rows]]
+    tag_counts = np.bincount(tag_codes, minlength=len(columns.tag_names))
+    # Most used first, ties by name (codes are in name order)
+    top = np.lexsort((np.arange(len(tag_counts)), -tag_counts))[:top_tags]
+
+    return {
+        "year": year,
+        "total_logs": int(len(rows)),
+        "total_duration_minutes": int(minutes.sum()),
+        "active_days": int(active.sum()),
+        "longest_streak": longest_streak,
+        "busiest_day": busiest_day,
+        "categories": categories,
+        "monthly_durations": {
+            name: [int(value) for value in monthly[code]]
+            for code, name in enumerate(columns.categories) if counts[code]
+        },
+        "hour_counts": [int(value) for value in hours],
+        "duration_histogram": [
+            (bound, int(count))
+            for bound, count in zip(DURATION_BINS + (None,), histogram)
+        ],
+        "top_tags": [
+            (columns.tag_names[code], int(tag_counts[code]))
+            for code in top if tag_counts[code]
+        ],
+    }
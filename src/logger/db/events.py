@@ -0,0 +1,81 @@
+"""In-process fan-out of log change events to streaming subscribers."""
+import asyncio
+import itertools
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# (event id, event name, data)
+LogEvent = Tuple[int, str, Dict[str, Any]]
+
+
+class LogEventBroker:
+    """Deliver log events to every subscribed asyncio queue.
+
+    publish() may be called from any thread (LogOperations runs in worker
+    threads under the web app); each event is handed to the subscriber's
+    event loop with call_soon_threadsafe. Events are full snapshots keyed
+    by log id, so a client may safely receive the same one twice.
+    """
+
+    def __init__(self, max_queue_size: int = 100):
+        """Initialize the broker.
+
+        Args:
+            max_queue_size: Events buffered per subscriber; when a slow
+                subscriber falls this far behind, its oldest events are
+                dropped
+        """
+        self.max_queue_size = max_queue_size
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # Highest log id published so far, so the database watcher can
+        # skip logs this process already announced
+        self.last_log_id = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        """Number of connected subscribers."""
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a queue on the running event loop and return it."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue_size)
+        with self._lock:
+            self._subscribers.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Stop delivering events to queue."""
+        with self._lock:
+            self._subscribers = [entry for entry in self._subscribers if entry[1] is not queue]
+
+    def publish(self, event: str, data: Dict[str, Any], log_id: Optional[int] = None) -> int:
+        """Send an event to all subscribers. Returns its event id.
+
+        Args:
+            event: Event name, e.g. "log" or "duration"
+            data: JSON-serializable payload
+            log_id: Id of a newly created log, to advance last_log_id
+        """
+        with self._lock:
+            event_id = next(self._ids)
+            if log_id is not None:
+                self.last_log_id = max(self.last_log_id, log_id)
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_deliver, queue, (event_id, event, data))
+            except RuntimeError:
+                # The subscriber's loop is closed
+                self.unsubscribe(queue)
+        return event_id
+
+
+def _deliver(queue: asyncio.Queue, item: LogEvent):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
+
+
+log_events = LogEventBroker()
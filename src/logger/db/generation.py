@@ -0,0 +1,57 @@
+"""Write generation of the logs database, for cheap change detection."""
+import os
+import threading
+from typing import Optional, Tuple
+
+
+class WriteGeneration:
+    """Counter bumped after every committed write in this process."""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        """The current generation."""
+        return self._value
+
+    def bump(self) -> int:
+        """Record a committed write. Returns the new generation."""
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+write_generation = WriteGeneration()
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def database_file_signature(database_path: str) -> Tuple:
+    """Modification time and size of the database file and its WAL.
+
+    Changes when any process commits to the database; reading it costs
+    two stat calls and no query.
+    """
+    return _file_signature(database_path), _file_signature(database_path + "-wal")
+
+
+def database_generation(database_path: str) -> Tuple:
+    """Identify the current state of the logs database without querying it.
+
+    Combines this process's write counter with the modification time and
+    size of the database file and its WAL, which change when another
+    process (e.g. the CLI) commits. The counter catches writes made here
+    even when they land within the file system's timestamp resolution.
+
+    Returns:
+        An opaque tuple that changes whenever the data may have changed
+    """
+    return (write_generation.value,) + database_file_signature(database_path)
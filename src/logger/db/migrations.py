@@ -0,0 +1,179 @@
+"""Versioned schema migrations, tracked in SQLite's PRAGMA user_version.
+
+Each migration runs once per database, in order, and records its version
+in the file header, so startup only has to read one integer when the
+schema is current. Databases created before migrations existed have
+user_version 0; every step is therefore written to be a no-op for schema
+objects that already exist.
+"""
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text
+
+from .models import (
+    AnalysisJob,
+    DailyRollup,
+    DailyTagRollup,
+    Log,
+    LogTag,
+    Tag,
+    TagPair,
+    _ensure_rollup_triggers,
+)
+from .search import ensure_search_index
+from .tags import create_tag_tables
+
+# (version, description, step)
+MIGRATIONS: List[Tuple[int, str, Callable]] = []
+
+
+def migration(version: int, description: str):
+    """Register a migration step; versions must be consecutive."""
+    def register(step: Callable) -> Callable:
+        assert version == len(MIGRATIONS) + 1, f"migration {version} out of order"
+        MIGRATIONS.append((version, description, step))
+        return step
+    return register
+
+
+def _columns(connection, table: str) -> set:
+    # table_xinfo, unlike table_info, also lists generated columns
+    return {row[1] for row in connection.execute(text(f"PRAGMA table_xinfo({table})"))}
+
+
+@migration(1, "create tables")
+def _create_tables(connection):
+    for model in (Log, DailyRollup, DailyTagRollup, AnalysisJob):
+        model.__table__.create(connection, checkfirst=True)
+
+
+@migration(2, "add logs.day and composite indexes")
+def _add_log_indexes(connection):
+    # Filtering by category while ordering by time (the timeline, the
+    # cursor API) seeks straight to the category's newest logs:
+    #   SEARCH logs USING INDEX ix_logs_category_created_at (category=?)
+    # where the single-column index needed USE TEMP B-TREE FOR ORDER BY
+    # over every log in the category. The new index also serves all
+    # lookups by category alone, so the old one is dropped.
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_logs_category_created_at ON logs (category, created_at)"
+    ))
+    connection.execute(text("DROP INDEX IF EXISTS ix_logs_category"))
+
+    # Rebuilding the rollups for a range of days (after an import) scanned
+    # the whole table to evaluate date(created_at); with an index on the
+    # generated day column it reads only those days, already grouped:
+    #   SEARCH logs USING INDEX ix_logs_day_category (day>? AND day<?)
+    if "day" not in _columns(connection, "logs"):
+        connection.execute(text(
+            "ALTER TABLE logs ADD COLUMN day VARCHAR(10) "
+            "GENERATED ALWAYS AS (date(created_at)) VIRTUAL"
+        ))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_logs_day_category ON logs (day, category)"
+    ))
+
+
+@migration(3, "create rollup triggers")
+def _create_rollup_triggers(connection):
+    _ensure_rollup_triggers(connection)
+
+
+@migration(4, "create full-text search index")
+def _create_search_index(connection):
+    ensure_search_index(connection)
+
+
+@migration(5, "normalize tags into tags and log_tags")
+def _normalize_tags(connection):
+    # Logs with a tag, newest first, without scanning logs:
+    #   SEARCH log_tags USING COVERING INDEX ix_log_tags_tag_id_created_at (tag_id=?)
+    # the most used tags without counting anything:
+    #   SCAN tags USING INDEX ix_tags_log_count
+    # and a tag's co-occurring tags without reading its logs:
+    #   SEARCH tag_pairs USING PRIMARY KEY (tag_id=?)
+    for model in (Tag, LogTag, TagPair):
+        model.__table__.create(connection, checkfirst=True)
+    create_tag_tables(connection)
+
+
+@migration(6, "add logs.weekday/hour and the time-of-day index")
+def _add_time_of_day_index(connection):
+    # Hour-of-day and weekday breakdowns group by strftime() of every log
+    # in the range. An index on generated columns for them walks the logs
+    # in grouping order instead of sorting them; SQLite does not count an
+    # index with virtual columns as covering, but on 5 years of logs it is
+    # still ~6x faster than scanning the table:
+    #   SCAN logs USING INDEX ix_logs_weekday_hour
+    columns = _columns(connection, "logs")
+    if "weekday" not in columns:
+        connection.execute(text(
+            "ALTER TABLE logs ADD COLUMN weekday INTEGER "
+            "GENERATED ALWAYS AS (CAST(strftime('%w', created_at) AS INTEGER)) VIRTUAL"
+        ))
+    if "hour" not in columns:
+        connection.execute(text(
+            "ALTER TABLE logs ADD COLUMN hour INTEGER "
+            "GENERATED ALWAYS AS (CAST(strftime('%H', created_at) AS INTEGER)) VIRTUAL"
+        ))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_logs_weekday_hour "
+        "ON logs (weekday, hour, category, created_at, duration_estimate)"
+    ))
+
+
+@migration(7, "add logs.original_estimate")
+def _add_original_estimate(connection):
+    # duration_estimate is overwritten with the time until the next log of
+    # the day, so only the last log of each day still holds its own
+    # estimate; earlier logs fall back to none if they become the last
+    if "original_estimate" not in _columns(connection, "logs"):
+        connection.execute(text("ALTER TABLE logs ADD COLUMN original_estimate INTEGER"))
+        connection.execute(text("""
+            UPDATE logs SET original_estimate = duration_estimate
+            FROM (
+                SELECT id, lead(id) OVER (PARTITION BY date(created_at) ORDER BY created_at, id) AS next_id
+                FROM logs
+            ) AS following
+            WHERE logs.id = following.id AND following.next_id IS NULL
+        """))
+
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def schema_version(connection) -> int:
+    """Return the database's migration version (0 if never migrated)."""
+    return connection.execute(text("PRAGMA user_version")).scalar()
+
+
+def migrate(engine) -> List[int]:
+    """Apply pending migrations.
+
+    All pending steps and their version bumps run in one transaction,
+    opened with BEGIN IMMEDIATE: SQLite's DDL is transactional, so a step
+    that fails rolls back every step of the run, and a process starting at
+    the same time waits for the write lock, then finds the schema current.
+    Steps stay idempotent for databases created before migrations existed.
+
+    Returns:
+        Versions applied, empty if the schema was already current
+    """
+    with engine.connect() as connection:
+        if schema_version(connection) >= LATEST_VERSION:
+            return []
+
+    applied = []
+    with engine.begin() as connection:
+        # pysqlite issues no BEGIN of its own before DDL, which would then
+        # autocommit statement by statement; take the write lock first so
+        # that re-reading the version below is a real guard
+        connection.connection.dbapi_connection.execute("BEGIN IMMEDIATE")
+        current = schema_version(connection)
+        for version, _, step in MIGRATIONS:
+            if version <= current:
+                continue
+            step(connection)
+            connection.execute(text(f"PRAGMA user_version = {version}"))
+            applied.append(version)
+    return applied
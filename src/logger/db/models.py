@@ -1,28 +1,63 @@
 """Database models for the logger application."""
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Optional
 import json
+import re
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import (
+    create_engine, event, text, Column, Computed, Index, Integer, String, Text, DateTime, JSON,
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import deferred, sessionmaker
 
 Base = declarative_base()
 
+# One session factory for the whole process; sessions are bound per call.
+SessionLocal = sessionmaker()
+
+# Engines already initialized in this process, keyed by URL and options
+_engines = {}
+
 
 class Log(Base):
     """Log entry model."""
     
     __tablename__ = "logs"
+    # Indexes are created by the migrations in migrations.py; see there
+    # for the queries each one serves.
+    __table_args__ = (
+        Index("ix_logs_category_created_at", "category", "created_at"),
+        Index("ix_logs_day_category", "day", "category"),
+        Index(
+            "ix_logs_weekday_hour",
+            "weekday", "hour", "category", "created_at", "duration_estimate",
+        ),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
+    # SQLite appends the rowid (id) to every index, so this index already
+    # orders by (created_at, id) and backs keyset pagination on its own.
     created_at = Column(DateTime, default=datetime.now, nullable=False, index=True)
     original_text = Column(Text, nullable=True)
     image_path = Column(String(500), nullable=True)
     ai_summary = Column(Text, nullable=False)
-    category = Column(String(50), nullable=False, index=True)
+    category = Column(String(50), nullable=False)
     tags = Column(JSON, nullable=True)
     duration_estimate = Column(Integer, nullable=True)  # in minutes
+    # The log's own estimate, from its analysis or import: duration_estimate
+    # becomes the time until the next log of the day, and falls back to
+    # this once no log follows it that day
+    original_estimate = deferred(Column(Integer, nullable=True))  # in minutes
+    # YYYY-MM-DD of created_at, computed by SQLite on read (not stored)
+    day = Column(String(10), Computed("date(created_at)", persisted=False))
+    # Day of week (0 = Sunday) and hour of created_at, for time-of-day
+    # analytics; only stored in ix_logs_weekday_hour, so not loaded by default
+    weekday = deferred(Column(
+        Integer, Computed("CAST(strftime('%w', created_at) AS INTEGER)", persisted=False)
+    ))
+    hour = deferred(Column(
+        Integer, Computed("CAST(strftime('%H', created_at) AS INTEGER)", persisted=False)
+    ))
     
     def __repr__(self):
         return f"<Log(id={self.id}, category={self.category}, created_at={self.created_at})>"
@@ -41,16 +76,296 @@ class Log(Base):
         }
 
 
-def init_database(database_url: str):
-    """Initialize database and create all tables."""
-    engine = create_engine(database_url, echo=False)
-    Base.metadata.create_all(engine)
-    return engine
+class DailyRollup(Base):
+    """Per-day, per-category summary of logs, maintained by triggers on logs."""
+    
+    __tablename__ = "daily_rollups"
+    
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD
+    category = Column(String(50), primary_key=True)
+    log_count = Column(Integer, nullable=False, default=0)
+    duration_total = Column(Integer, nullable=False, default=0)  # in minutes
+    timed_count = Column(Integer, nullable=False, default=0)  # logs with a non-zero duration
+    
+    def __repr__(self):
+        return f"<DailyRollup(day={self.day}, category={self.category}, log_count={self.log_count})>"
 
 
-def get_session(engine):
-    """Get a new database session."""
-    Session = sessionmaker(bind=engine)
-    return Session()
+class DailyTagRollup(Base):
+    """Per-day tag usage counts, maintained by triggers on logs."""
+    
+    __tablename__ = "daily_tag_rollups"
+    
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD
+    tag = Column(String(100), primary_key=True)
+    tag_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<DailyTagRollup(day={self.day}, tag={self.tag}, tag_count={self.tag_count})>"
+
+
+class Tag(Base):
+    """A distinct tag. log_count is kept current by triggers on log_tags."""
+    
+    __tablename__ = "tags"
+    __table_args__ = (Index("ix_tags_log_count", "log_count"),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(100), nullable=False, unique=True)
+    log_count = Column(Integer, nullable=False, server_default="0")
+    
+    def __repr__(self):
+        return f"<Tag(id={self.id}, name={self.name}, log_count={self.log_count})>"
+
+
+class LogTag(Base):
+    """One tag of one log, derived from Log.tags by triggers on logs.
+    
+    created_at mirrors the log's, so a tag's logs can be read newest first
+    straight from the (tag_id, created_at) index.
+    """
+    
+    __tablename__ = "log_tags"
+    __table_args__ = (
+        Index("ix_log_tags_tag_id_created_at", "tag_id", "created_at"),
+        {"sqlite_with_rowid": False},
+    )
+    
+    log_id = Column(Integer, primary_key=True)
+    tag_id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f"<LogTag(log_id={self.log_id}, tag_id={self.tag_id})>"
+
+
+class TagPair(Base):
+    """How many logs carry both tag_id and other_tag_id, kept by triggers on log_tags.
+    
+    Each pair is stored in both directions, so a tag's co-occurring tags
+    are one primary key range.
+    """
+    
+    __tablename__ = "tag_pairs"
+    __table_args__ = ({"sqlite_with_rowid": False},)
+    
+    tag_id = Column(Integer, primary_key=True)
+    other_tag_id = Column(Integer, primary_key=True)
+    log_count = Column(Integer, nullable=False, server_default="0")
+    
+    def __repr__(self):
+        return f"<TagPair(tag_id={self.tag_id}, other_tag_id={self.other_tag_id}, log_count={self.log_count})>"
+
+
+class AnalysisJob(Base):
+    """Queued AI analysis of a log saved before it was analyzed.
+    
+    Jobs are claimed by a worker (status "running"), deleted once the log is
+    enriched, and put back to "pending" with a later available_at after a
+    failure, until max attempts turn them "failed".
+    """
+    
+    __tablename__ = "analysis_jobs"
+    __table_args__ = (Index("ix_analysis_jobs_status_available_at", "status", "available_at"),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    log_id = Column(Integer, nullable=False, unique=True)
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    available_at = Column(DateTime, default=datetime.now, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<AnalysisJob(id={self.id}, log_id={self.log_id}, status={self.status})>"
+
+
+def _rollup_add_sql(row: str) -> str:
+    """SQL adding one logs row (NEW or OLD) to the rollup tables."""
+    return f"""
+        INSERT INTO daily_rollups (day, category, log_count, duration_total, timed_count)
+        VALUES (
+            date({row}.created_at), {row}.category, 1,
+            coalesce({row}.duration_estimate, 0),
+            coalesce({row}.duration_estimate, 0) != 0
+        )
+        ON CONFLICT (day, category) DO UPDATE SET
+            log_count = log_count + excluded.log_count,
+            duration_total = duration_total + excluded.duration_total,
+            timed_count = timed_count + excluded.timed_count;
+        INSERT INTO daily_tag_rollups (day, tag, tag_count)
+        SELECT date({row}.created_at), value, 1 FROM json_each({row}.tags)
+        WHERE json_type({row}.tags) = 'array'
+        ON CONFLICT (day, tag) DO UPDATE SET tag_count = tag_count + 1;"""
+
+
+def _rollup_remove_sql(row: str) -> str:
+    """SQL removing one logs row (NEW or OLD) from the rollup tables."""
+    return f"""
+        UPDATE daily_rollups SET
+            log_count = log_count - 1,
+            duration_total = duration_total - coalesce({row}.duration_estimate, 0),
+            timed_count = timed_count - (coalesce({row}.duration_estimate, 0) != 0)
+        WHERE day = date({row}.created_at) AND category = {row}.category;
+        DELETE FROM daily_rollups
+        WHERE day = date({row}.created_at) AND category = {row}.category AND log_count <= 0;
+        UPDATE daily_tag_rollups SET tag_count = tag_count - (
+            SELECT count(*) FROM json_each({row}.tags) WHERE value = daily_tag_rollups.tag
+        )
+        WHERE day = date({row}.created_at)
+          AND json_type({row}.tags) = 'array'
+          AND tag IN (SELECT value FROM json_each({row}.tags));
+        DELETE FROM daily_tag_rollups
+        WHERE day = date({row}.created_at) AND tag_count <= 0;"""
+
+
+ROLLUP_TRIGGERS = {
+    "logs_rollup_insert": f"""
+        CREATE TRIGGER logs_rollup_insert AFTER INSERT ON logs BEGIN
+        {_rollup_add_sql("NEW")}
+        END""",
+    "logs_rollup_delete": f"""
+        CREATE TRIGGER logs_rollup_delete AFTER DELETE ON logs BEGIN
+        {_rollup_remove_sql("OLD")}
+        END""",
+    "logs_rollup_update": f"""
+        CREATE TRIGGER logs_rollup_update
+        AFTER UPDATE OF created_at, category, tags, duration_estimate ON logs BEGIN
+        {_rollup_remove_sql("OLD")}
+        {_rollup_add_sql("NEW")}
+        END""",
+}
+
+
+def rebuild_rollups(connection, start_day: Optional[str] = None, end_day: Optional[str] = None) -> int:
+    """Recompute the rollup tables from the logs table.
+    
+    Args:
+        connection: SQLAlchemy connection inside a transaction
+        start_day: First day (YYYY-MM-DD) to rebuild, or None for no lower bound
+        end_day: Last day (YYYY-MM-DD) to rebuild, or None for no upper bound
+        
+    Returns:
+        Number of days covered by the rebuilt rollups
+    """
+    params = {"start_day": start_day or "0000-00-00", "end_day": end_day or "9999-99-99"}
+    in_range = "BETWEEN :start_day AND :end_day"
+    connection.execute(text(f"DELETE FROM daily_rollups WHERE day {in_range}"), params)
+    connection.execute(text(f"DELETE FROM daily_tag_rollups WHERE day {in_range}"), params)
+    connection.execute(text(f"""
+        INSERT INTO daily_rollups (day, category, log_count, duration_total, timed_count)
+        SELECT day, category, count(*),
+               coalesce(sum(duration_estimate), 0),
+               sum(coalesce(duration_estimate, 0) != 0)
+        FROM logs
+        WHERE day {in_range}
+        GROUP BY day, category
+    """), params)
+    connection.execute(text(f"""
+        INSERT INTO daily_tag_rollups (day, tag, tag_count)
+        SELECT logs.day, tag.value, count(*)
+        FROM logs, json_each(logs.tags) AS tag
+        WHERE json_type(logs.tags) = 'array' AND logs.day {in_range}
+        GROUP BY logs.day, tag.value
+    """), params)
+    return connection.execute(
+        text(f"SELECT count(DISTINCT day) FROM daily_rollups WHERE day {in_range}"), params
+    ).scalar()
+
+
+def suspend_rollup_triggers(connection):
+    """Drop the insert/update rollup triggers for a bulk write.
+    
+    Call resume_rollup_triggers in the same transaction before committing.
+    The transaction must be opened explicitly (BEGIN IMMEDIATE) beforehand:
+    pysqlite autocommits DDL run outside one, and a rollback would then
+    leave the triggers dropped.
+    """
+    for name in ("logs_rollup_insert", "logs_rollup_update"):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
 
+def resume_rollup_triggers(connection, start_day: Optional[str] = None, end_day: Optional[str] = None):
+    """Recreate the rollup triggers and rebuild the days touched by a bulk write."""
+    for name in ("logs_rollup_insert", "logs_rollup_update"):
+        connection.execute(text(ROLLUP_TRIGGERS[name]))
+    rebuild_rollups(connection, start_day, end_day)
 
+
+def _ensure_rollup_triggers(connection):
+    """Create missing rollup triggers, backfilling the rollups for existing data."""
+    existing = set(connection.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    ).scalars())
+    missing = [name for name in ROLLUP_TRIGGERS if name not in existing]
+    if not missing:
+        return
+    for name in missing:
+        connection.execute(text(ROLLUP_TRIGGERS[name]))
+    rebuild_rollups(connection)
+
+
+# PRAGMA values are interpolated into SQL, so only plain words and integers
+_PRAGMA_NAME_RE = re.compile(r"[a-z_]+")
+_PRAGMA_VALUE_RE = re.compile(r"-?\d+|[A-Za-z]+")
+
+
+def _pragma_statements(pragmas: Dict[str, Any]):
+    """Validate PRAGMA settings and render them as statements."""
+    statements = []
+    for name, value in pragmas.items():
+        if not _PRAGMA_NAME_RE.fullmatch(name) or not _PRAGMA_VALUE_RE.fullmatch(str(value)):
+            raise ValueError(f"Invalid SQLite PRAGMA: {name}={value}")
+        statements.append(f"PRAGMA {name} = {value}")
+    return statements
+
+
+def init_database(database_url: str, pragmas: Optional[Dict[str, Any]] = None, **engine_options):
+    """Initialize database and bring its schema up to date.
+    
+    Engines are cached per URL and options, so repeated calls reuse the
+    same connection pool and only check the schema once.
+    
+    Args:
+        database_url: SQLAlchemy database URL
+        pragmas: SQLite PRAGMAs to run, in order, on every new connection,
+            e.g. {"journal_mode": "WAL", "synchronous": "NORMAL"}
+        **engine_options: Extra keyword arguments for create_engine, such as
+            pool_size, max_overflow, pool_timeout and pool_recycle
+    """
+    from .migrations import migrate
+    
+    pragmas = pragmas or {}
+    cache_key = (database_url, tuple(pragmas.items()), tuple(sorted(engine_options.items())))
+    if cache_key in _engines:
+        return _engines[cache_key]
+    
+    statements = _pragma_statements(pragmas)
+    engine = create_engine(
+        database_url,
+        echo=False,
+        # Sessions may be opened and used from different threads (e.g. a
+        # FastAPI threadpool); each connection is still used by one thread at a time.
+        connect_args={"check_same_thread": False},
+        **engine_options,
+    )
+    
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+    
+    migrate(engine)
+    
+    _engines[cache_key] = engine
+    return engine
+
+
+def get_session(engine):
+    """Get a new database session bound to engine."""
+    return SessionLocal(bind=engine)
@@ -1,12 +1,123 @@
 """Database CRUD operations for the logger application."""
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
-from collections import Counter
+import asyncio
+import base64
+import json
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Set, Tuple
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, text, and_, or_, true, tuple_
 
-from .models import Log
+from .models import (
+    AnalysisJob,
+    Log,
+    LogTag,
+    Tag,
+    TagPair,
+    DailyRollup,
+    DailyTagRollup,
+    rebuild_rollups,
+    resume_rollup_triggers,
+    suspend_rollup_triggers,
+)
+from .events import log_events
+from .generation import write_generation
+
+
+def encode_cursor(log: Log) -> str:
+    """Encode a log's (created_at, id) position as an opaque page cursor."""
+    raw = f"{log.created_at.isoformat()}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a page cursor into its (created_at, id) position."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, log_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(log_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+_BULK_INSERT_SQL = (
+    "INSERT INTO logs (created_at, original_text, image_path, ai_summary, "
+    "category, tags, duration_estimate, original_estimate) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+# SELECT DISTINCT category as a skip scan: each step seeks the index of
+# logs.category for the next larger value instead of reading every entry
+_DISTINCT_CATEGORIES_SQL = """
+    WITH RECURSIVE categories(category) AS (
+        SELECT min(category) FROM logs
+        UNION ALL
+        SELECT (SELECT min(category) FROM logs WHERE category > categories.category)
+        FROM categories WHERE category IS NOT NULL
+    )
+    SELECT category FROM categories WHERE category IS NOT NULL
+"""
+
+
+# Whole minutes until the next log of the same day, truncated like
+# int(timedelta.total_seconds() / 60); the log's own original_estimate
+# for the last log of a day
+_CHAINED_DURATION_SQL = """
+    coalesce(CAST(round((
+        julianday(lead(created_at) OVER (PARTITION BY date(created_at) ORDER BY created_at, id))
+        - julianday(created_at)
+    ) * 86400000) AS INTEGER) / 60000, original_estimate)
+"""
+
+# Re-chain the logs around :moment on its day: the window covers the
+# last log before it, every log at it and the first log after it, so only
+# those neighbours can change. Bounds are read with two index seeks. The
+# first log after :moment only provides the others' next log (its own
+# may lie beyond the window), so it is not updated.
+_NEIGHBOUR_DURATIONS_SQL = f"""
+    UPDATE logs SET duration_estimate = chained.duration
+    FROM (
+        SELECT id, created_at, {_CHAINED_DURATION_SQL} AS duration
+        FROM logs
+        WHERE created_at >= coalesce((
+                SELECT max(created_at) FROM logs
+                WHERE created_at >= :day_start AND created_at < :moment
+            ), :moment)
+          AND created_at <= coalesce((
+                SELECT min(created_at) FROM logs
+                WHERE created_at > :moment AND created_at < :day_end
+            ), :moment)
+    ) AS chained
+    WHERE logs.id = chained.id
+      AND chained.created_at <= :moment
+      AND logs.duration_estimate IS NOT chained.duration
+"""
+
+
+# The batch form: one window over all logs in created_at order, which the
+# index already provides, instead of a partition per day that has to be
+# sorted; a next log on another day ends the chain.
+_RECOMPUTE_DURATIONS_SQL = """
+    UPDATE logs SET duration_estimate = chained.duration
+    FROM (
+        SELECT id, CASE WHEN date(next_at) = date(created_at) THEN
+            CAST(round((julianday(next_at) - julianday(created_at)) * 86400000) AS INTEGER) / 60000
+        ELSE original_estimate END AS duration
+        FROM (
+            SELECT id, created_at, original_estimate,
+                   lead(created_at) OVER (ORDER BY created_at, id) AS next_at
+            FROM logs WHERE created_at >= :start
+        )
+    ) AS chained
+    WHERE logs.id = chained.id
+      AND logs.duration_estimate IS NOT chained.duration
+"""
+
+
+def _sql_datetime(moment: datetime) -> str:
+    """Format a datetime the way the DateTime column stores it."""
+    return moment.isoformat(" ", "microseconds")
 
 
 class LogOperations:
@@ -15,6 +126,11 @@ class LogOperations:
     def __init__(self, session: Session):
         self.session = session
     
+    def _commit(self):
+        """Commit and bump the write generation, invalidating cached reads."""
+        self.session.commit()
+        write_generation.bump()
+    
     def create_log(
         self,
         ai_summary: str,
@@ -32,47 +148,370 @@ class LogOperations:
             category=category,
             tags=tags or [],
             duration_estimate=duration_estimate,
+            original_estimate=duration_estimate,
         )
         self.session.add(log)
-        self.session.commit()
+        self._commit()
         self.session.refresh(log)
+        log_events.publish("log", log.to_dict(), log_id=log.id)
         return log
     
+    def _begin_write(self):
+        """Take SQLite's write lock now instead of at the first write.
+        
+        Reads made before the first write then cannot be invalidated by
+        another writer committing in between; a concurrent writer waits
+        (up to the busy timeout) for this transaction instead.
+        """
+        dbapi_connection = self.session.connection().connection.dbapi_connection
+        if not dbapi_connection.in_transaction:
+            dbapi_connection.execute("BEGIN IMMEDIATE")
+    
+    def append_log(
+        self,
+        ai_summary: str,
+        category: str,
+        original_text: Optional[str] = None,
+        image_path: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        duration_estimate: Optional[int] = None,
+        created_at: Optional[datetime] = None,
+        queue_analysis: bool = False,
+    ) -> Tuple[Log, Optional[Tuple[Log, int]]]:
+        """Record a new log as one unit of work, committed once.
+        
+        Sets the duration of the day's previous log to the time until the
+        new one (as auto_update_previous_log_duration does), inserts the
+        new log and, with queue_analysis, its analysis job, all in a
+        single transaction: either everything is written or nothing is.
+        
+        Args:
+            created_at: Time of the new log, defaults to now
+            queue_analysis: Also queue an AnalysisJob for the new log
+            
+        Returns:
+            Tuple of (new log, (previous log, its duration in minutes) or
+            None if it is the first log of the day)
+        """
+        created_at = created_at or datetime.now()
+        try:
+            self._begin_write()
+            chained = self._chain_previous_log(created_at)
+            log = Log(
+                created_at=created_at,
+                original_text=original_text,
+                image_path=image_path,
+                ai_summary=ai_summary,
+                category=category,
+                tags=tags or [],
+                duration_estimate=duration_estimate,
+                original_estimate=duration_estimate,
+            )
+            self.session.add(log)
+            self.session.flush()
+            if queue_analysis:
+                self.session.add(AnalysisJob(log_id=log.id))
+            # A backdated log is followed by others that day, which
+            # determine its own duration
+            self._recompute_neighbours([created_at])
+            self._commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        
+        if chained:
+            previous_log, duration_minutes = chained
+            log_events.publish("duration", {"id": previous_log.id, "duration_estimate": duration_minutes})
+        log_events.publish("log", log.to_dict(), log_id=log.id)
+        return log, chained
+    
+    def bulk_import(self, records: Iterable[Dict[str, Any]], batch_size: int = 5000) -> int:
+        """Insert many log entries in a single transaction.
+        
+        Rows are written with executemany in batches, the search index is
+        updated in bulk, and the chained durations that
+        auto_update_previous_log_duration would have set are recomputed for
+        every affected day in one ordered pass. The per-row rollup and tag
+        triggers are suspended meanwhile; the affected days are rebuilt and
+        the new logs' tags added once at the end. Nothing is committed if
+        any record fails.
+        
+        Args:
+            records: Iterable of dicts with Log column values (created_at,
+                ai_summary, category, ...), consumed lazily
+            batch_size: Number of rows per executemany call
+            
+        Returns:
+            Number of log entries imported
+        """
+        from .search import index_rows
+        from .tags import resume_tag_triggers, suspend_tag_triggers
+        
+        connection = self.session.connection()
+        imported = 0
+        days = set()
+        
+        try:
+            # Hold the write lock from the first read: no other writer can
+            # insert before our rows, and the trigger DDL below runs inside
+            # this transaction, so a rollback restores the triggers too
+            self._begin_write()
+            last_id = self.session.query(func.coalesce(func.max(Log.id), 0)).scalar()
+            suspend_rollup_triggers(connection)
+            suspend_tag_triggers(connection)
+            
+            iterator = iter(records)
+            while True:
+                batch = list(islice(iterator, batch_size))
+                if not batch:
+                    break
+                # Serialize values the same way the DateTime and JSON column
+                # types do, and skip per-row statement processing
+                connection.exec_driver_sql(_BULK_INSERT_SQL, [
+                    (
+                        record["created_at"].isoformat(" ", "microseconds"),
+                        record.get("original_text"),
+                        record.get("image_path"),
+                        record["ai_summary"],
+                        record["category"],
+                        json.dumps(record.get("tags") or []),
+                        record.get("duration_estimate"),
+                        record.get("duration_estimate"),
+                    )
+                    for record in batch
+                ])
+                # We hold the write lock, so the new rows got consecutive ids
+                index_rows(connection, [
+                    (last_id + imported + offset + 1, record.get("original_text"),
+                     record["ai_summary"], record.get("tags"))
+                    for offset, record in enumerate(batch)
+                ])
+                days.update(record["created_at"].date() for record in batch)
+                imported += len(batch)
+            
+            self._recompute_chained_durations(days)
+            
+            resume_tag_triggers(connection, last_id)
+            resume_rollup_triggers(
+                connection,
+                min(days).isoformat() if days else None,
+                max(days).isoformat() if days else None,
+            )
+            self._commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        
+        return imported
+    
+    def _recompute_chained_durations(self, days: Set[date]) -> int:
+        """Set each log's duration to the gap until the next log on the same day.
+        
+        Runs as one UPDATE over a LEAD() window ordered by (created_at, id).
+        Only logs on the given days are touched; the last log of each day
+        gets its original_estimate. Does not commit. Returns the number of
+        logs updated.
+        """
+        if not days:
+            return 0
+        
+        result = self.session.execute(
+            text(f"""
+                UPDATE logs SET duration_estimate = chained.duration
+                FROM (
+                    SELECT id, {_CHAINED_DURATION_SQL} AS duration
+                    FROM logs
+                    WHERE created_at >= :start AND created_at <= :end
+                ) AS chained
+                WHERE logs.id = chained.id
+                  AND logs.duration_estimate IS NOT chained.duration
+                  AND date(logs.created_at) IN (SELECT value FROM json_each(:days))
+            """),
+            {
+                "start": datetime.combine(min(days), time.min),
+                "end": datetime.combine(max(days), time.max),
+                "days": json.dumps(sorted(day.isoformat() for day in days)),
+            },
+        )
+        return result.rowcount
+    
+    def _recompute_neighbours(self, moments: Iterable[datetime]) -> int:
+        """Re-chain the durations of the logs next to each moment.
+        
+        For a log inserted, deleted or moved at a moment, the log before
+        it and the log itself get the time until their next log; nothing
+        else on the day changes. Whichever of them is now the last log of
+        the day gets its original_estimate back (None if it never had one),
+        as in recompute_durations, so a log does not keep a duration
+        chained to a log that was deleted or moved away. Does not commit.
+        Returns the number of logs updated.
+        """
+        updated = 0
+        for moment in set(moments):
+            day_start = datetime.combine(moment.date(), time.min)
+            updated += self.session.execute(text(_NEIGHBOUR_DURATIONS_SQL), {
+                "moment": _sql_datetime(moment),
+                "day_start": _sql_datetime(day_start),
+                "day_end": _sql_datetime(day_start + timedelta(days=1)),
+            }).rowcount
+        return updated
+    
+    def recompute_durations(self, since: Optional[date] = None) -> int:
+        """Re-chain the durations of every log from since on, in one pass.
+        
+        Repairs durations left inconsistent by edits made outside
+        LogOperations or before the incremental recomputation existed.
+        Each log gets the time until the next log of its day, and the last
+        log of a day its original_estimate, exactly as the incremental
+        updates set them. The logs are read once in created_at order off
+        the index; only the logs whose duration changes are written, so
+        the rollup triggers stay in place and a consistent database costs
+        one scan.
+        
+        Returns:
+            Number of logs whose duration changed
+        """
+        start = datetime.combine(since, time.min) if since else datetime.min
+        try:
+            updated = self.session.execute(
+                text(_RECOMPUTE_DURATIONS_SQL), {"start": _sql_datetime(start)}
+            ).rowcount
+            self._commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return updated
+    
     def get_log_by_id(self, log_id: int) -> Optional[Log]:
         """Get a log entry by ID."""
         return self.session.query(Log).filter(Log.id == log_id).first()
     
-    def get_logs(
+    @staticmethod
+    def _timeline_columns(tag: Optional[str] = None):
+        """Return the (created_at, id) columns to filter and order a list by.
+        
+        With a tag filter these are log_tags' copies, so the tag's logs are
+        read in order from the (tag_id, created_at) index instead of every
+        tagged log being sorted.
+        """
+        if tag:
+            return LogTag.created_at, LogTag.log_id
+        return Log.created_at, Log.id
+    
+    def _filtered_logs_query(
         self,
-        limit: int = 10,
-        offset: int = 0,
         category: Optional[str] = None,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-    ) -> List[Log]:
-        """Get log entries with optional filters."""
+        tag: Optional[str] = None,
+    ):
+        """Build a Log query with the common list filters applied."""
         query = self.session.query(Log)
+        created_at, _ = self._timeline_columns(tag)
+        
+        if tag:
+            tag_id = self.session.query(Tag.id).filter(Tag.name == tag).scalar_subquery()
+            query = query.join(LogTag, LogTag.log_id == Log.id).filter(LogTag.tag_id == tag_id)
         
-        # Apply filters
         if category:
             query = query.filter(Log.category == category)
         
         if start_date:
-            query = query.filter(Log.created_at >= start_date)
+            query = query.filter(created_at >= start_date)
         
         if end_date:
             # Include the entire end date
             end_datetime = end_date.replace(hour=23, minute=59, second=59)
-            query = query.filter(Log.created_at <= end_datetime)
+            query = query.filter(created_at <= end_datetime)
         
-        # Order by most recent first
-        query = query.order_by(Log.created_at.desc())
+        return query
+    
+    def get_logs(
+        self,
+        limit: int = 10,
+        offset: int = 0,
+        category: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        tag: Optional[str] = None,
+    ) -> List[Log]:
+        """Get log entries with optional filters."""
+        query = self._filtered_logs_query(category, start_date, end_date, tag)
+        created_at, log_id = self._timeline_columns(tag)
+        
+        # Order by most recent first; id breaks ties so pages are stable
+        query = query.order_by(created_at.desc(), log_id.desc())
         
         # Apply pagination
         query = query.limit(limit).offset(offset)
         
         return query.all()
     
+    def get_logs_page(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        category: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        tag: Optional[str] = None,
+    ) -> Tuple[List[Log], Optional[str]]:
+        """Get one page of log entries using keyset (cursor) pagination.
+        
+        Unlike offset paging, each page seeks straight to its position on
+        the (created_at, id) index, so deep pages cost the same as the first.
+        
+        Args:
+            limit: Maximum number of logs in the page
+            cursor: Opaque cursor returned with the previous page, or None
+                for the first page
+            category: Only include logs in this category
+            start_date: Only include logs created on or after this time
+            end_date: Only include logs created on or before this date
+            tag: Only include logs with this tag
+            
+        Returns:
+            Tuple of (logs, next_cursor); next_cursor is None on the last page
+            
+        Raises:
+            ValueError: If cursor is malformed
+        """
+        query = self._filtered_logs_query(category, start_date, end_date, tag)
+        created_at, log_id = self._timeline_columns(tag)
+        
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            query = query.filter(
+                tuple_(created_at, log_id) < tuple_(cursor_created_at, cursor_id)
+            )
+        
+        # Fetch one extra row to find out whether another page exists
+        logs = query.order_by(
+            created_at.desc(), log_id.desc()
+        ).limit(limit + 1).all()
+        
+        if len(logs) > limit:
+            logs = logs[:limit]
+            return logs, encode_cursor(logs[-1])
+        return logs, None
+    
+    def iter_logs(
+        self,
+        batch_size: int = 1000,
+        category: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        tag: Optional[str] = None,
+    ) -> Iterator[Log]:
+        """Iterate over log entries, oldest first, fetching batch_size rows at a time.
+        
+        Rows are streamed from the database cursor rather than loaded into a
+        list, so memory use stays constant regardless of table size.
+        """
+        query = self._filtered_logs_query(category, start_date, end_date, tag)
+        created_at, log_id = self._timeline_columns(tag)
+        return iter(query.order_by(created_at, log_id).yield_per(batch_size))
+    
     def get_logs_by_date(self, date: datetime) -> List[Log]:
         """Get all logs for a specific date."""
         start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -109,64 +548,221 @@ class LogOperations:
         ).order_by(Log.created_at.desc()).all()
     
     def delete_log(self, log_id: int) -> bool:
-        """Delete a log entry."""
-        log = self.get_log_by_id(log_id)
-        if log:
+        """Delete a log entry, re-chaining the duration of the log before it."""
+        try:
+            self._begin_write()
+            log = self.get_log_by_id(log_id)
+            if log is None:
+                self.session.rollback()
+                return False
             self.session.delete(log)
-            self.session.commit()
-            return True
-        return False
+            self.session.flush()
+            self._recompute_neighbours([log.created_at])
+            self._commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return True
+    
+    def update_log_time(self, log_id: int, created_at: datetime) -> bool:
+        """Move a log to another time, re-chaining the durations at both places."""
+        try:
+            self._begin_write()
+            log = self.get_log_by_id(log_id)
+            if log is None:
+                self.session.rollback()
+                return False
+            previous_time = log.created_at
+            log.created_at = created_at
+            self.session.flush()
+            self._recompute_neighbours([previous_time, created_at])
+            self._commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return True
+    
+    def get_image_paths(self) -> List[str]:
+        """Get the distinct image paths referenced by logs."""
+        rows = (
+            self.session.query(Log.image_path)
+            .filter(Log.image_path.isnot(None))
+            .distinct()
+            .order_by(Log.image_path)
+            .all()
+        )
+        return [path for (path,) in rows]
+    
+    def get_categories(self) -> List[str]:
+        """Get the distinct categories in use, sorted.
+        
+        Walks the category index one distinct value at a time, so the cost
+        grows with the number of categories rather than the number of logs.
+        """
+        rows = self.session.execute(text(_DISTINCT_CATEGORIES_SQL)).all()
+        return [category for (category,) in rows]
+    
+    def get_top_tags(self, limit: int = 20) -> List[Tuple[str, int]]:
+        """Get the most used tags with their log counts, most used first.
+        
+        Reads the maintained tags.log_count in index order, so the cost
+        does not depend on the number of logs.
+        """
+        return [
+            (name, log_count) for name, log_count in
+            self.session.query(Tag.name, Tag.log_count)
+            .filter(Tag.log_count > 0)
+            .order_by(Tag.log_count.desc(), Tag.name)
+            .limit(limit)
+        ]
+    
+    def get_tag_cooccurrence(self, tag: str, limit: int = 20) -> List[Tuple[str, int]]:
+        """Get the tags used most often on the same logs as tag.
+        
+        Reads the tag's row range of the maintained tag_pairs counts, so
+        the cost grows with the number of distinct companion tags rather
+        than the number of logs carrying tag.
+        
+        Returns:
+            List of (tag, number of logs with both tags), most frequent first
+        """
+        tag_id = self.session.query(Tag.id).filter(Tag.name == tag).scalar_subquery()
+        return [
+            (name, log_count) for name, log_count in
+            self.session.query(Tag.name, TagPair.log_count)
+            .join(Tag, Tag.id == TagPair.other_tag_id)
+            .filter(TagPair.tag_id == tag_id, TagPair.log_count > 0)
+            .order_by(TagPair.log_count.desc(), Tag.name)
+            .limit(limit)
+        ]
+    
+    def replace_image_path(self, old_path: str, new_path: str) -> int:
+        """Point every log using old_path at new_path. Returns the number updated."""
+        updated = self.session.query(Log).filter(Log.image_path == old_path).update(
+            {Log.image_path: new_path}, synchronize_session=False
+        )
+        self._commit()
+        return updated
     
     def get_statistics(
         self,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
     ) -> Dict[str, Any]:
-        """Get statistics for logs."""
-        query = self.session.query(Log)
+        """Get statistics for logs.
         
-        # Apply date filters
-        if start_date:
-            query = query.filter(Log.created_at >= start_date)
+        Whole-day ranges are answered from the daily rollup tables, which
+        costs O(days) instead of O(rows). Other ranges fall back to
+        aggregating the logs table directly.
+        """
+        if start_date is None or start_date.time() == time.min:
+            return self._statistics_from_rollups(start_date, end_date)
+        return self._statistics_from_logs(start_date, end_date)
+    
+    def _statistics_from_rollups(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Compute statistics from the daily_rollups/daily_tag_rollups tables."""
+        def in_range(query, day_column):
+            if start_date:
+                query = query.filter(day_column >= start_date.date().isoformat())
+            if end_date:
+                query = query.filter(day_column <= end_date.date().isoformat())
+            return query
         
-        if end_date:
-            end_datetime = end_date.replace(hour=23, minute=59, second=59)
-            query = query.filter(Log.created_at <= end_datetime)
+        # Category distribution and duration by category
+        category_rows = in_range(
+            self.session.query(
+                DailyRollup.category,
+                func.sum(DailyRollup.log_count),
+                func.sum(DailyRollup.duration_total),
+                func.sum(DailyRollup.timed_count),
+            ),
+            DailyRollup.day,
+        ).group_by(DailyRollup.category).all()
+        category_counts = {
+            category: count for category, count, _, _ in category_rows if count
+        }
+        duration_by_category = {
+            category: duration for category, _, duration, timed in category_rows if timed
+        }
         
-        logs = query.all()
+        # Top tags
+        tag_total = func.sum(DailyTagRollup.tag_count)
+        tag_rows = in_range(
+            self.session.query(DailyTagRollup.tag, tag_total),
+            DailyTagRollup.day,
+        ).group_by(DailyTagRollup.tag).order_by(
+            tag_total.desc(), func.min(DailyTagRollup.day)
+        ).limit(10).all()
         
-        # Calculate statistics
-        total_logs = len(logs)
+        # Daily log counts
+        daily_rows = in_range(
+            self.session.query(DailyRollup.day, func.sum(DailyRollup.log_count)),
+            DailyRollup.day,
+        ).group_by(DailyRollup.day).order_by(DailyRollup.day).all()
         
-        # Category distribution
-        categories = [log.category for log in logs]
-        category_counts = dict(Counter(categories))
+        return {
+            "total_logs": sum(category_counts.values()),
+            "category_counts": category_counts,
+            "total_duration_minutes": sum(duration_by_category.values()),
+            "duration_by_category": duration_by_category,
+            "top_tags": {tag: count for tag, count in tag_rows},
+            "daily_counts": {day: count for day, count in daily_rows if count},
+        }
+    
+    def _statistics_from_logs(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Compute statistics by aggregating the logs table in SQL."""
+        def in_range(query):
+            if start_date:
+                query = query.filter(Log.created_at >= start_date)
+            if end_date:
+                end_datetime = end_date.replace(hour=23, minute=59, second=59)
+                query = query.filter(Log.created_at <= end_datetime)
+            return query
         
-        # Total duration
-        total_duration = sum(
-            log.duration_estimate for log in logs if log.duration_estimate
-        )
+        # Category distribution and total count
+        category_rows = in_range(
+            self.session.query(Log.category, func.count(Log.id))
+        ).group_by(Log.category).all()
+        category_counts = {category: count for category, count in category_rows}
+        total_logs = sum(category_counts.values())
         
-        # Duration by category
-        duration_by_category = {}
-        for log in logs:
-            if log.duration_estimate:
-                if log.category not in duration_by_category:
-                    duration_by_category[log.category] = 0
-                duration_by_category[log.category] += log.duration_estimate
+        # Duration by category (only logs with a non-zero duration)
+        duration_rows = in_range(
+            self.session.query(Log.category, func.sum(Log.duration_estimate))
+        ).filter(
+            Log.duration_estimate.isnot(None),
+            Log.duration_estimate != 0,
+        ).group_by(Log.category).all()
+        duration_by_category = {category: total for category, total in duration_rows}
+        total_duration = sum(duration_by_category.values())
         
-        # Top tags
-        all_tags = []
-        for log in logs:
-            if log.tags:
-                all_tags.extend(log.tags)
-        tag_counts = dict(Counter(all_tags).most_common(10))
+        # Top tags, expanded from the JSON array with json_each
+        tag = func.json_each(Log.tags).table_valued("value")
+        tag_count = func.count()
+        tag_rows = in_range(
+            self.session.query(tag.c.value, tag_count)
+            .select_from(Log)
+            .join(tag, true())
+            .filter(func.json_type(Log.tags) == "array")
+        ).group_by(tag.c.value).order_by(
+            tag_count.desc(), func.min(Log.id)
+        ).limit(10).all()
+        tag_counts = {value: count for value, count in tag_rows}
         
         # Daily log counts
-        daily_counts = {}
-        for log in logs:
-            date_key = log.created_at.date().isoformat()
-            daily_counts[date_key] = daily_counts.get(date_key, 0) + 1
+        day = func.date(Log.created_at)
+        daily_rows = in_range(
+            self.session.query(day, func.count(Log.id))
+        ).group_by(day).order_by(day).all()
+        daily_counts = {date_key: count for date_key, count in daily_rows}
         
         return {
             "total_logs": total_logs,
@@ -177,14 +773,89 @@ class LogOperations:
             "daily_counts": daily_counts,
         }
     
+    def get_time_buckets(
+        self,
+        by: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Get log counts and durations per category, bucketed by time.
+        
+        Args:
+            by: "hour" (of day), "weekday", "week" or "day"; days also
+                carry 7- and 30-day rolling average durations
+            start_date: First day to include
+            end_date: Last day to include
+            
+        Raises:
+            ValueError: If by is not a known bucket
+        """
+        from .analytics import time_buckets
+        
+        return time_buckets(self.session.connection(), by, start_date, end_date)
+    
+    def get_heatmap(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Get log counts and durations as a weekday x hour matrix."""
+        from .analytics import time_of_day_heatmap
+        
+        return time_of_day_heatmap(self.session.connection(), start_date, end_date, category)
+    
+    def get_year_report(self, year: int) -> Dict[str, Any]:
+        """Get year-in-review figures for a calendar year.
+        
+        Computed on a cached columnar snapshot of every log (see
+        columnar.py) rather than ORM objects.
+        
+        Raises:
+            ImportError: If numpy is not installed
+        """
+        # numpy is optional and slow to import, so only load it here
+        from .columnar import load_columns, year_report
+        
+        return year_report(load_columns(self.session.connection()), year)
+    
+    def rebuild_rollups(self) -> int:
+        """Rebuild the daily rollup tables from the logs table.
+        
+        Returns the number of days covered by the rebuilt rollups.
+        """
+        days = rebuild_rollups(self.session.connection())
+        self._commit()
+        return days
+    
     def search_logs(self, keyword: str, limit: int = 50) -> List[Log]:
-        """Search logs by keyword in text or summary."""
-        return self.session.query(Log).filter(
-            or_(
-                Log.original_text.like(f"%{keyword}%"),
-                Log.ai_summary.like(f"%{keyword}%")
-            )
-        ).order_by(Log.created_at.desc()).limit(limit).all()
+        """Search logs by keyword in text, summary and tags.
+        
+        Uses the FTS5 index with BM25 ranking (best match first) and
+        prefix matching. Falls back to a LIKE scan, newest first, when
+        the index is unavailable.
+        """
+        from .search import search_log_ids
+        
+        log_ids = search_log_ids(self.session, keyword, limit=limit)
+        if log_ids is None:
+            return self.session.query(Log).filter(
+                or_(
+                    Log.original_text.like(f"%{keyword}%"),
+                    Log.ai_summary.like(f"%{keyword}%")
+                )
+            ).order_by(Log.created_at.desc()).limit(limit).all()
+        
+        logs = {log.id: log for log in self.session.query(Log).filter(Log.id.in_(log_ids))}
+        return [logs[log_id] for log_id in log_ids if log_id in logs]
+    
+    def rebuild_search_index(self) -> int:
+        """Rebuild the full-text search index. Returns the number of logs indexed."""
+        from .search import rebuild_search_index
+        
+        indexed = rebuild_search_index(self.session.connection())
+        self._commit()
+        return indexed
     
     def get_last_log_of_day(self, target_date: datetime) -> Optional[Log]:
         """Get the last log entry of a specific day."""
@@ -199,11 +870,17 @@ class LogOperations:
         ).order_by(Log.created_at.desc()).first()
     
     def update_log_duration(self, log_id: int, duration_minutes: int) -> bool:
-        """Update the duration estimate of a log entry."""
+        """Set a log's duration, also as its own estimate.
+        
+        Recomputing durations keeps the value while the log is the last
+        of its day; a later log on that day replaces it with the gap.
+        """
         log = self.get_log_by_id(log_id)
         if log:
             log.duration_estimate = duration_minutes
-            self.session.commit()
+            log.original_estimate = duration_minutes
+            self._commit()
+            log_events.publish("duration", {"id": log_id, "duration_estimate": duration_minutes})
             return True
         return False
     
@@ -212,6 +889,21 @@ class LogOperations:
         Automatically update the duration of the previous log on the same day.
         Returns (previous_log, calculated_duration) if updated, None otherwise.
         """
+        chained = self._chain_previous_log(new_log_time)
+        if chained:
+            previous_log, duration_minutes = chained
+            self._commit()
+            log_events.publish(
+                "duration", {"id": previous_log.id, "duration_estimate": duration_minutes}
+            )
+        return chained
+    
+    def _chain_previous_log(self, new_log_time: datetime) -> Optional[Tuple[Log, int]]:
+        """Set the duration of the last log before new_log_time on its day.
+        
+        Does not commit. Returns (previous_log, duration in minutes), or
+        None if no earlier log exists that day.
+        """
         # Get the last log before the new log time on the same day
         start_of_day = new_log_time.replace(hour=0, minute=0, second=0, microsecond=0)
         
@@ -222,16 +914,188 @@ class LogOperations:
             )
         ).order_by(Log.created_at.desc()).first()
         
-        if previous_log:
-            # Calculate duration in minutes
-            time_diff = new_log_time - previous_log.created_at
-            duration_minutes = int(time_diff.total_seconds() / 60)
-            
-            # Update the previous log's duration
-            previous_log.duration_estimate = duration_minutes
-            self.session.commit()
-            
-            return (previous_log, duration_minutes)
+        if previous_log is None:
+            return None
         
-        return None
+        # Calculate duration in minutes
+        time_diff = new_log_time - previous_log.created_at
+        duration_minutes = int(time_diff.total_seconds() / 60)
+        previous_log.duration_estimate = duration_minutes
+        return previous_log, duration_minutes
+
 
+
+class AsyncLogOperations:
+    """Awaitable counterparts of LogOperations for async code.
+    
+    SQLite access is blocking, so every call runs the synchronous
+    LogOperations method in a worker thread and the event loop stays free
+    for other requests. Calls on one instance must be awaited one at a
+    time, since they share a single session.
+    """
+    
+    def __init__(self, ops: LogOperations):
+        self.ops = ops
+    
+    async def _run(self, method, *args, **kwargs):
+        return await asyncio.to_thread(method, *args, **kwargs)
+    
+    async def create_log(
+        self,
+        ai_summary: str,
+        category: str,
+        original_text: Optional[str] = None,
+        image_path: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        duration_estimate: Optional[int] = None,
+    ) -> Log:
+        """Create a new log entry."""
+        return await self._run(
+            self.ops.create_log,
+            ai_summary=ai_summary,
+            category=category,
+            original_text=original_text,
+            image_path=image_path,
+            tags=tags,
+            duration_estimate=duration_estimate,
+        )
+    
+    async def append_log(
+        self,
+        ai_summary: str,
+        category: str,
+        original_text: Optional[str] = None,
+        image_path: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        duration_estimate: Optional[int] = None,
+        created_at: Optional[datetime] = None,
+        queue_analysis: bool = False,
+    ) -> Tuple[Log, Optional[Tuple[Log, int]]]:
+        """Record a new log and chain the previous log's duration, committed once."""
+        return await self._run(
+            self.ops.append_log,
+            ai_summary=ai_summary,
+            category=category,
+            original_text=original_text,
+            image_path=image_path,
+            tags=tags,
+            duration_estimate=duration_estimate,
+            created_at=created_at,
+            queue_analysis=queue_analysis,
+        )
+    
+    async def get_log_by_id(self, log_id: int) -> Optional[Log]:
+        """Get a log entry by ID."""
+        return await self._run(self.ops.get_log_by_id, log_id)
+    
+    async def get_logs(
+        self,
+        limit: int = 10,
+        offset: int = 0,
+        category: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        tag: Optional[str] = None,
+    ) -> List[Log]:
+        """Get log entries with optional filters."""
+        return await self._run(
+            self.ops.get_logs,
+            limit=limit,
+            offset=offset,
+            category=category,
+            start_date=start_date,
+            end_date=end_date,
+            tag=tag,
+        )
+    
+    async def get_logs_page(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        category: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        tag: Optional[str] = None,
+    ) -> Tuple[List[Log], Optional[str]]:
+        """Get one page of log entries using keyset (cursor) pagination."""
+        return await self._run(
+            self.ops.get_logs_page,
+            limit=limit,
+            cursor=cursor,
+            category=category,
+            start_date=start_date,
+            end_date=end_date,
+            tag=tag,
+        )
+    
+    async def get_categories(self) -> List[str]:
+        """Get the distinct categories in use, sorted."""
+        return await self._run(self.ops.get_categories)
+    
+    async def get_top_tags(self, limit: int = 20) -> List[Tuple[str, int]]:
+        """Get the most used tags with their log counts, most used first."""
+        return await self._run(self.ops.get_top_tags, limit=limit)
+    
+    async def get_tag_cooccurrence(self, tag: str, limit: int = 20) -> List[Tuple[str, int]]:
+        """Get the tags used most often on the same logs as tag."""
+        return await self._run(self.ops.get_tag_cooccurrence, tag, limit=limit)
+    
+    async def get_logs_by_date(self, date: datetime) -> List[Log]:
+        """Get all logs for a specific date."""
+        return await self._run(self.ops.get_logs_by_date, date)
+    
+    async def delete_log(self, log_id: int) -> bool:
+        """Delete a log entry."""
+        return await self._run(self.ops.delete_log, log_id)
+    
+    async def update_log_time(self, log_id: int, created_at: datetime) -> bool:
+        """Move a log to another time, re-chaining the durations at both places."""
+        return await self._run(self.ops.update_log_time, log_id, created_at)
+    
+    async def recompute_durations(self, since: Optional[date] = None) -> int:
+        """Re-chain the durations of every log from since on, in one pass."""
+        return await self._run(self.ops.recompute_durations, since)
+    
+    async def get_statistics(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Get statistics for logs."""
+        return await self._run(self.ops.get_statistics, start_date=start_date, end_date=end_date)
+    
+    async def get_time_buckets(
+        self,
+        by: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Get log counts and durations per category, bucketed by time."""
+        return await self._run(self.ops.get_time_buckets, by, start_date=start_date, end_date=end_date)
+    
+    async def get_heatmap(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Get log counts and durations as a weekday x hour matrix."""
+        return await self._run(
+            self.ops.get_heatmap, start_date=start_date, end_date=end_date, category=category
+        )
+    
+    async def search_logs(self, keyword: str, limit: int = 50) -> List[Log]:
+        """Search logs by keyword in text, summary and tags."""
+        return await self._run(self.ops.search_logs, keyword, limit=limit)
+    
+    async def get_last_log_of_day(self, target_date: datetime) -> Optional[Log]:
+        """Get the last log entry of a specific day."""
+        return await self._run(self.ops.get_last_log_of_day, target_date)
+    
+    async def update_log_duration(self, log_id: int, duration_minutes: int) -> bool:
+        """Update the duration estimate of a log entry."""
+        return await self._run(self.ops.update_log_duration, log_id, duration_minutes)
+    
+    async def auto_update_previous_log_duration(self, new_log_time: datetime) -> Optional[tuple]:
+        """Automatically update the duration of the previous log on the same day."""
+        return await self._run(self.ops.auto_update_previous_log_duration, new_log_time)
@@ -0,0 +1,161 @@
+"""Persistent queue of pending AI analyses, stored in the logs database."""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from .events import log_events
+from .generation import write_generation
+from .models import AnalysisJob, Log
+from .operations import LogOperations
+
+# Shown until the worker fills in the real analysis
+PENDING_SUMMARY = "⏳ 等待 AI 分析"
+PENDING_CATEGORY = "其他"
+
+
+class AnalysisQueue:
+    """Queue operations for AnalysisJob entries."""
+    
+    def __init__(self, session: Session):
+        """Initialize with a database session."""
+        self.session = session
+    
+    def add_pending_log(
+        self,
+        original_text: Optional[str] = None,
+        image_path: Optional[str] = None,
+    ) -> Tuple[Log, Optional[Tuple[Log, int]]]:
+        """Save a log with placeholder analysis and queue it, in one commit.
+    
+        The day's previous log gets its duration in the same transaction,
+        see LogOperations.append_log.
+    
+        Returns:
+            Tuple of (the saved Log, to be enriched later by a worker,
+            (previous log, its duration in minutes) or None)
+        """
+        return LogOperations(self.session).append_log(
+            original_text=original_text,
+            image_path=image_path,
+            ai_summary=(original_text[:100] if original_text else None) or PENDING_SUMMARY,
+            category=PENDING_CATEGORY,
+            queue_analysis=True,
+        )
+    
+    def claim(self, lease_seconds: int = 300) -> Optional[AnalysisJob]:
+        """Atomically take the next due job and mark it running.
+    
+        Jobs left running for longer than lease_seconds (e.g. by a worker
+        that crashed) are claimed again.
+    
+        Returns:
+            The claimed job, or None if nothing is due
+        """
+        now = datetime.now()
+        next_job = (
+            select(AnalysisJob.id)
+            .where(or_(
+                and_(AnalysisJob.status == "pending", AnalysisJob.available_at <= now),
+                and_(
+                    AnalysisJob.status == "running",
+                    AnalysisJob.started_at < now - timedelta(seconds=lease_seconds),
+                ),
+            ))
+            .order_by(AnalysisJob.available_at, AnalysisJob.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        # One UPDATE ... RETURNING, so two workers never claim the same job
+        job_id = self.session.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == next_job)
+            .values(status="running", attempts=AnalysisJob.attempts + 1, started_at=now)
+            .returning(AnalysisJob.id)
+        ).scalar()
+        self.session.commit()
+        return self.session.get(AnalysisJob, job_id) if job_id is not None else None
+    
+    def complete(self, job: AnalysisJob, result: Dict[str, Any]) -> Optional[Log]:
+        """Write an analysis result to the job's log and remove the job.
+    
+        The duration estimate is kept as the log's original_estimate, and
+        only becomes its duration if it has none yet, since adding the
+        next log may already have set the real one.
+    
+        Returns:
+            The updated log, or None if it was deleted meanwhile
+        """
+        log = self.session.get(Log, job.log_id)
+        if log is not None:
+            log.ai_summary = result["summary"]
+            log.category = result["category"]
+            log.tags = result["tags"]
+            if log.original_estimate is None:
+                log.original_estimate = result["duration_estimate"]
+            if log.duration_estimate is None:
+                log.duration_estimate = result["duration_estimate"]
+        self.session.delete(job)
+        self.session.commit()
+        write_generation.bump()
+        if log is not None:
+            # The log now has its real summary, category and tags
+            log_events.publish("log", log.to_dict())
+        return log
+    
+    def fail(self, job: AnalysisJob, error: str, max_attempts: int = 5, retry_delay: float = 30):
+        """Record a failed attempt and schedule a retry with exponential backoff.
+    
+        After max_attempts the job is marked failed and left for
+        retry_failed(); its log keeps the placeholder analysis.
+        """
+        job.last_error = error
+        if job.attempts >= max_attempts:
+            job.status = "failed"
+        else:
+            job.status = "pending"
+            job.available_at = datetime.now() + timedelta(
+                seconds=retry_delay * 2 ** (job.attempts - 1)
+            )
+        self.session.commit()
+    
+    def retry_failed(self) -> int:
+        """Put all failed jobs back in the queue. Returns the number requeued."""
+        result = self.session.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.status == "failed")
+            .values(status="pending", attempts=0, available_at=datetime.now())
+        )
+        self.session.commit()
+        return result.rowcount
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Return queue depth and lag.
+    
+        Returns:
+            Dictionary with:
+                - pending, running, failed: Job counts by status
+                - depth: Jobs not yet done (pending + running)
+                - lag_seconds: Age of the oldest unfinished job, 0 if none
+                - next_retry_at: When the earliest delayed retry is due, if any
+        """
+        counts = dict(
+            self.session.query(AnalysisJob.status, func.count(AnalysisJob.id))
+            .group_by(AnalysisJob.status)
+            .all()
+        )
+        now = datetime.now()
+        oldest, next_retry = self.session.query(
+            func.min(AnalysisJob.created_at),
+            func.min(AnalysisJob.available_at).filter(AnalysisJob.available_at > now),
+        ).filter(AnalysisJob.status.in_(["pending", "running"])).one()
+    
+        return {
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "failed": counts.get("failed", 0),
+            "depth": counts.get("pending", 0) + counts.get("running", 0),
+            "lag_seconds": round((now - oldest).total_seconds(), 1) if oldest else 0,
+            "next_retry_at": next_retry.isoformat() if next_retry else None,
+        }
@@ -0,0 +1,191 @@
+"""Full-text search index for log entries, backed by SQLite FTS5."""
+import re
+import sqlite3
+from typing import Optional
+
+from sqlalchemy import event, inspect, select, text
+
+from .models import Log
+
+FTS_TABLE = "logs_fts"
+
+# Han, kana and hangul have no word separators, so the unicode61 tokenizer
+# would index a whole run of them as one token. Splitting them into single
+# characters before indexing lets a phrase query match any substring.
+# The patterns are compiled on first use (through re's cache), which keeps
+# them off the import path of every CLI command.
+_CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_CJK_PATTERN = f"[{_CJK_CHARS}]"
+_CJK_RUN_PATTERN = f"[{_CJK_CHARS}]+"
+_QUERY_TOKEN_PATTERN = f"[{_CJK_CHARS}]+|[^\\W{_CJK_CHARS}]+"
+
+# bm25() column weights for (original_text, ai_summary, tags)
+_BM25_WEIGHTS = "1.0, 2.0, 1.5"
+
+_INSERT_SQL = text(
+    f"INSERT INTO {FTS_TABLE} (rowid, original_text, ai_summary, tags) "
+    "VALUES (:id, :original_text, :ai_summary, :tags)"
+)
+_BULK_INSERT_SQL = (
+    f"INSERT INTO {FTS_TABLE} (rowid, original_text, ai_summary, tags) VALUES (?, ?, ?, ?)"
+)
+
+
+def _fts5_available() -> bool:
+    """Check whether the linked SQLite library was built with FTS5."""
+    try:
+        connection = sqlite3.connect(":memory:")
+        try:
+            connection.execute("CREATE VIRTUAL TABLE probe USING fts5(content)")
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return False
+    return True
+
+
+FTS5_AVAILABLE = _fts5_available()
+
+
+def segment(value: Optional[str]) -> str:
+    """Prepare text for indexing by separating CJK characters with spaces."""
+    if not value:
+        return ""
+    if value.isascii():
+        return value
+    return re.sub(_CJK_RUN_PATTERN, lambda match: " " + " ".join(match.group(0)) + " ", value)
+
+
+def build_match_query(keyword: str) -> Optional[str]:
+    """Translate a user keyword into an FTS5 MATCH expression.
+
+    CJK runs become phrase queries over their characters, other words
+    become prefix queries. All terms must match. Returns None if the
+    keyword contains nothing searchable.
+    """
+    terms = []
+    for token in re.findall(_QUERY_TOKEN_PATTERN, keyword):
+        if re.match(_CJK_PATTERN, token):
+            terms.append('"' + " ".join(token) + '"')
+        else:
+            terms.append(f'"{token}"*')
+    return " ".join(terms) or None
+
+
+def _tags_text(tags) -> str:
+    if not isinstance(tags, list):
+        return ""
+    return segment(" ".join(str(tag) for tag in tags))
+
+
+def _index_params(log_id: int, original_text, ai_summary, tags) -> dict:
+    return {
+        "id": log_id,
+        "original_text": segment(original_text),
+        "ai_summary": segment(ai_summary),
+        "tags": _tags_text(tags),
+    }
+
+
+def _index_log(connection, log_id: int, original_text, ai_summary, tags):
+    connection.execute(_INSERT_SQL, _index_params(log_id, original_text, ai_summary, tags))
+
+
+def _unindex_log(connection, log_id: int):
+    connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": log_id})
+
+
+def index_rows(connection, rows) -> int:
+    """Index (id, original_text, ai_summary, tags) tuples with one executemany."""
+    if not FTS5_AVAILABLE:
+        return 0
+    params = [
+        (log_id, segment(original_text), segment(ai_summary), _tags_text(tags))
+        for log_id, original_text, ai_summary, tags in rows
+    ]
+    connection.exec_driver_sql(_BULK_INSERT_SQL, params)
+    return len(params)
+
+
+def index_logs(connection, min_id: int = 0, batch_size: int = 1000) -> int:
+    """Index all logs with an id greater than min_id. Returns the number indexed."""
+    result = connection.execution_options(yield_per=batch_size).execute(
+        select(Log.id, Log.original_text, Log.ai_summary, Log.tags)
+        .where(Log.id > min_id)
+        .order_by(Log.id)
+    )
+    indexed = 0
+    for rows in result.partitions():
+        indexed += index_rows(connection, rows)
+    return indexed
+
+
+def ensure_search_index(connection) -> int:
+    """Create the FTS table if missing and index existing logs.
+    
+    Returns the number of logs indexed, 0 if the table already existed.
+    """
+    if not FTS5_AVAILABLE:
+        return 0
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first()
+    if exists:
+        return 0
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        "original_text, ai_summary, tags, tokenize = 'unicode61 remove_diacritics 2')"
+    ))
+    return index_logs(connection)
+
+
+def rebuild_search_index(connection) -> int:
+    """Drop and rebuild the search index from the logs table."""
+    connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+    return ensure_search_index(connection)
+
+
+def search_log_ids(session, keyword: str, limit: int = 50) -> Optional[list]:
+    """Return ids of logs matching keyword, best BM25 match first.
+
+    Returns None when the full-text index cannot serve the query, in which
+    case the caller should fall back to a LIKE scan.
+    """
+    match_query = build_match_query(keyword)
+    if not FTS5_AVAILABLE or match_query is None:
+        return None
+    return session.execute(
+        text(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :query "
+            f"ORDER BY bm25({FTS_TABLE}, {_BM25_WEIGHTS}) LIMIT :limit"
+        ),
+        {"query": match_query, "limit": limit},
+    ).scalars().all()
+
+
+# Keep the index in sync with ORM writes to logs.
+
+@event.listens_for(Log, "after_insert")
+def _log_inserted(mapper, connection, target):
+    if FTS5_AVAILABLE:
+        _index_log(connection, target.id, target.original_text, target.ai_summary, target.tags)
+
+
+@event.listens_for(Log, "after_update")
+def _log_updated(mapper, connection, target):
+    if not FTS5_AVAILABLE:
+        return
+    state = inspect(target)
+    if any(
+        state.attrs[name].history.has_changes()
+        for name in ("original_text", "ai_summary", "tags")
+    ):
+        _unindex_log(connection, target.id)
+        _index_log(connection, target.id, target.original_text, target.ai_summary, target.tags)
+
+
+@event.listens_for(Log, "after_delete")
+def _log_deleted(mapper, connection, target):
+    if FTS5_AVAILABLE:
+        _unindex_log(connection, target.id)
@@ -0,0 +1,153 @@
+"""Normalized tag tables (tags, log_tags, tag_pairs), kept in sync with Log.tags.
+
+Log.tags stays the source of truth; triggers on logs mirror it into
+log_tags whenever a log is inserted, retagged, moved in time or deleted,
+whichever code path writes it. Triggers on log_tags keep tags.log_count
+and the tag_pairs co-occurrence counts current, so the most used tags
+and a tag's companions are index reads rather than scans of its logs.
+"""
+from sqlalchemy import text
+
+
+def _add_log_tags_sql(row: str) -> str:
+    """SQL adding the tags of one logs row (NEW) to tags and log_tags."""
+    return f"""
+        INSERT OR IGNORE INTO tags (name)
+        SELECT value FROM json_each({row}.tags) WHERE json_type({row}.tags) = 'array';
+        INSERT OR IGNORE INTO log_tags (log_id, tag_id, created_at)
+        SELECT {row}.id, tags.id, {row}.created_at
+        FROM json_each({row}.tags) AS tag JOIN tags ON tags.name = tag.value
+        WHERE json_type({row}.tags) = 'array';"""
+
+
+TAG_TRIGGERS = {
+    "logs_tags_insert": f"""
+        CREATE TRIGGER logs_tags_insert AFTER INSERT ON logs BEGIN
+        {_add_log_tags_sql("NEW")}
+        END""",
+    "logs_tags_delete": """
+        CREATE TRIGGER logs_tags_delete AFTER DELETE ON logs BEGIN
+        DELETE FROM log_tags WHERE log_id = OLD.id;
+        END""",
+    "logs_tags_update": f"""
+        CREATE TRIGGER logs_tags_update AFTER UPDATE OF tags, created_at ON logs BEGIN
+        DELETE FROM log_tags WHERE log_id = OLD.id;
+        {_add_log_tags_sql("NEW")}
+        END""",
+    # The log's other tags are already in log_tags (insert) or no longer
+    # are (delete), so each pair is counted once per log
+    "log_tags_count_insert": """
+        CREATE TRIGGER log_tags_count_insert AFTER INSERT ON log_tags BEGIN
+        UPDATE tags SET log_count = log_count + 1 WHERE id = NEW.tag_id;
+        INSERT INTO tag_pairs (tag_id, other_tag_id, log_count)
+        SELECT NEW.tag_id, tag_id, 1 FROM log_tags
+        WHERE log_id = NEW.log_id AND tag_id != NEW.tag_id
+        UNION ALL
+        SELECT tag_id, NEW.tag_id, 1 FROM log_tags
+        WHERE log_id = NEW.log_id AND tag_id != NEW.tag_id
+        ON CONFLICT (tag_id, other_tag_id) DO UPDATE SET log_count = log_count + 1;
+        END""",
+    "log_tags_count_delete": """
+        CREATE TRIGGER log_tags_count_delete AFTER DELETE ON log_tags BEGIN
+        UPDATE tags SET log_count = log_count - 1 WHERE id = OLD.tag_id;
+        UPDATE tag_pairs SET log_count = log_count - 1
+        WHERE (tag_id = OLD.tag_id
+               AND other_tag_id IN (SELECT tag_id FROM log_tags WHERE log_id = OLD.log_id))
+           OR (other_tag_id = OLD.tag_id
+               AND tag_id IN (SELECT tag_id FROM log_tags WHERE log_id = OLD.log_id));
+        END""",
+}
+
+# Triggers dropped while a bulk import writes logs and log_tags
+_BULK_SUSPENDED = ("logs_tags_insert", "log_tags_count_insert")
+
+
+def sync_log_tags(connection, min_id: int = 0) -> int:
+    """Add the tags of every log with an id greater than min_id, set-based.
+
+    Used to backfill existing logs and after a bulk import that ran with
+    the insert triggers suspended; call add_tag_counts for the same logs
+    afterwards. Returns the number of log_tags rows added.
+    """
+    connection.execute(text("""
+        INSERT OR IGNORE INTO tags (name)
+        SELECT DISTINCT tag.value FROM logs, json_each(logs.tags) AS tag
+        WHERE logs.id > :min_id AND json_type(logs.tags) = 'array'
+    """), {"min_id": min_id})
+    return connection.execute(text("""
+        INSERT OR IGNORE INTO log_tags (log_id, tag_id, created_at)
+        SELECT logs.id, tags.id, logs.created_at
+        FROM logs, json_each(logs.tags) AS tag JOIN tags ON tags.name = tag.value
+        WHERE logs.id > :min_id AND json_type(logs.tags) = 'array'
+    """), {"min_id": min_id}).rowcount
+
+
+def add_tag_counts(connection, min_id: int = 0):
+    """Add the log_tags rows of logs after min_id to tags and tag_pairs counts.
+
+    Both are range reads of the log_tags primary key, grouped once,
+    instead of a trigger run per row.
+    """
+    connection.execute(text("""
+        UPDATE tags SET log_count = tags.log_count + added.log_count
+        FROM (
+            SELECT tag_id, count(*) AS log_count FROM log_tags
+            WHERE log_id > :min_id GROUP BY tag_id
+        ) AS added
+        WHERE tags.id = added.tag_id
+    """), {"min_id": min_id})
+    connection.execute(text("""
+        INSERT INTO tag_pairs (tag_id, other_tag_id, log_count)
+        SELECT a.tag_id, b.tag_id, count(*)
+        FROM log_tags AS a JOIN log_tags AS b ON b.log_id = a.log_id AND b.tag_id != a.tag_id
+        WHERE a.log_id > :min_id
+        GROUP BY a.tag_id, b.tag_id
+        ON CONFLICT (tag_id, other_tag_id) DO UPDATE SET log_count = tag_pairs.log_count + excluded.log_count
+    """), {"min_id": min_id})
+
+
+def rebuild_tag_counts(connection):
+    """Recompute tags.log_count and tag_pairs from log_tags."""
+    connection.execute(text("UPDATE tags SET log_count = 0"))
+    connection.execute(text("DELETE FROM tag_pairs"))
+    add_tag_counts(connection)
+
+
+def create_tag_tables(connection) -> int:
+    """Backfill the tag tables from existing logs and create the triggers.
+
+    The tables must exist. Returns the number of log_tags rows added.
+    """
+    existing = set(connection.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    ).scalars())
+    if all(name in existing for name in TAG_TRIGGERS):
+        return 0
+    for name in TAG_TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+    # Fill in bulk first, then count once, instead of per-row triggers
+    added = sync_log_tags(connection)
+    rebuild_tag_counts(connection)
+    for name in TAG_TRIGGERS:
+        connection.execute(text(TAG_TRIGGERS[name]))
+    return added
+
+
+def suspend_tag_triggers(connection):
+    """Drop the per-row insert triggers for a bulk write.
+
+    Call resume_tag_triggers in the same transaction before committing.
+    The transaction must be opened explicitly (BEGIN IMMEDIATE) beforehand:
+    pysqlite autocommits DDL run outside one, and a rollback would then
+    leave the triggers dropped.
+    """
+    for name in _BULK_SUSPENDED:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def resume_tag_triggers(connection, min_id: int):
+    """Add the tags of logs after min_id and recreate the insert triggers."""
+    sync_log_tags(connection, min_id)
+    add_tag_counts(connection, min_id)
+    for name in _BULK_SUSPENDED:
+        connection.execute(text(TAG_TRIGGERS[name]))
@@ -2,24 +2,31 @@
 import os
 import tempfile
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Optional, Tuple
 from datetime import datetime
 
 import pyperclip
 from PIL import ImageGrab, Image
 
+if TYPE_CHECKING:
+    from .images import ImagePipeline
+
 
 class ClipboardHandler:
     """Handle clipboard operations for text and images."""
     
-    def __init__(self, image_storage_path: str):
+    def __init__(self, image_storage_path: str, pipeline: Optional["ImagePipeline"] = None):
         """Initialize clipboard handler.
         
         Args:
             image_storage_path: Directory to store clipboard images
+            pipeline: Image pipeline used to downscale, re-encode and
+                deduplicate captures; without one they are saved as PNG
         """
         self.image_storage_path = Path(image_storage_path)
         self.image_storage_path.mkdir(parents=True, exist_ok=True)
+        self.pipeline = pipeline
+        self.last_stored = None  # StoredImage of the last capture, with a pipeline
     
     def get_text(self) -> Optional[str]:
         """Get text from clipboard.
@@ -73,6 +80,10 @@ class ClipboardHandler:
         Returns:
             Path to saved image file
         """
+        if self.pipeline is not None:
+            self.last_stored = self.pipeline.store(image)
+            return self.last_stored.path
+        
         # Generate unique filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         filename = f"clipboard_{timestamp}.png"
@@ -0,0 +1,114 @@
+"""Streaming export of log entries to NDJSON, CSV and Parquet."""
+import csv
+import io
+import json
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+# Column order shared by every export format (matches Log.to_dict)
+EXPORT_FIELDS = [
+    "id",
+    "created_at",
+    "original_text",
+    "image_path",
+    "ai_summary",
+    "category",
+    "tags",
+    "duration_estimate",
+]
+
+EXPORT_FORMATS = ["ndjson", "csv", "parquet"]
+
+
+def _chunks(logs: Iterable, chunk_size: int) -> Iterator[List]:
+    """Group an iterable of logs into lists of at most chunk_size items."""
+    iterator = iter(logs)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_ndjson(logs: Iterable, chunk_size: int = 500) -> Iterator[str]:
+    """Yield newline-delimited JSON, one log per line, in chunks of lines.
+
+    Args:
+        logs: Iterable of Log objects, consumed lazily
+        chunk_size: Number of logs per yielded string
+    """
+    for chunk in _chunks(logs, chunk_size):
+        yield "".join(
+            json.dumps(log.to_dict(), ensure_ascii=False) + "\n" for log in chunk
+        )
+
+
+def iter_csv(logs: Iterable, chunk_size: int = 500) -> Iterator[str]:
+    """Yield CSV text, starting with a header row, in chunks of rows.
+
+    Tags are written as a JSON array so they survive a round trip.
+
+    Args:
+        logs: Iterable of Log objects, consumed lazily
+        chunk_size: Number of logs per yielded string
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for chunk in _chunks(logs, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        for log in chunk:
+            row = log.to_dict()
+            row["tags"] = json.dumps(row["tags"] or [], ensure_ascii=False)
+            writer.writerow(row)
+        yield buffer.getvalue()
+
+
+def write_parquet(logs: Iterable, path: str, chunk_size: int = 10000) -> int:
+    """Write logs to a Parquet file one row group per chunk.
+
+    Requires the optional pyarrow package.
+
+    Args:
+        logs: Iterable of Log objects, consumed lazily
+        path: Output file path
+        chunk_size: Number of logs per row group
+
+    Returns:
+        Number of logs written
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Parquet export requires pyarrow. Install it with: pip install pyarrow"
+        ) from e
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("created_at", pa.timestamp("us")),
+        ("original_text", pa.string()),
+        ("image_path", pa.string()),
+        ("ai_summary", pa.string()),
+        ("category", pa.string()),
+        ("tags", pa.list_(pa.string())),
+        ("duration_estimate", pa.int64()),
+    ])
+
+    written = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in _chunks(logs, chunk_size):
+            columns = {field: [] for field in EXPORT_FIELDS}
+            for log in chunk:
+                for field in EXPORT_FIELDS:
+                    columns[field].append(getattr(log, field))
+            writer.write_table(pa.table(columns, schema=schema))
+            written += len(chunk)
+    return written
@@ -0,0 +1,220 @@
+"""Image storage pipeline: downscale, re-encode and deduplicate screenshots."""
+import hashlib
+import io
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from PIL import Image
+
+IMAGE_FORMATS = {
+    # name: (PIL format, file extension)
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg"),
+    "png": ("PNG", ".png"),
+}
+
+
+# Stored files are named img_<content hash prefix>.<extension>
+_STORED_NAME_RE = re.compile(r"img_[0-9a-f]{24}\.[a-z]+")
+
+
+class StoredImage(NamedTuple):
+    """Result of storing one image."""
+
+    path: str
+    size: int  # bytes on disk
+    deduplicated: bool  # an identical image was already stored
+
+
+def downscale(image: Image.Image, max_dimension: int) -> Image.Image:
+    """Return image shrunk to fit max_dimension on its longer side.
+
+    Images that already fit are returned unchanged; 0 disables resizing.
+    """
+    if not max_dimension or max(image.size) <= max_dimension:
+        return image
+    image = image.copy()
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    return image
+
+
+def content_hash(image: Image.Image) -> str:
+    """Hash the decoded pixels, so identical screenshots match in any file format."""
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class ImagePipeline:
+    """Store images downscaled, re-encoded and named by content hash."""
+
+    def __init__(
+        self,
+        storage_path: str,
+        max_dimension: int = 2560,
+        image_format: str = "webp",
+        quality: int = 85,
+    ):
+        """Initialize the pipeline.
+
+        Args:
+            storage_path: Directory to store images in
+            max_dimension: Longest side of stored images in pixels, 0 to keep
+                the original size
+            image_format: "webp", "jpeg" or "png"
+            quality: Encoder quality for WebP and JPEG (1-100)
+        """
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        self.storage_path = Path(storage_path)
+        self.storage_path.mkdir(parents=True, exist_ok=True)
+        self.max_dimension = max_dimension
+        self.image_format = image_format
+        self.quality = quality
+
+    @classmethod
+    def from_config(cls, config) -> "ImagePipeline":
+        """Create a pipeline from the IMAGE_* settings."""
+        return cls(
+            config.IMAGE_STORAGE_PATH,
+            max_dimension=config.IMAGE_MAX_DIMENSION,
+            image_format=config.IMAGE_FORMAT,
+            quality=config.IMAGE_QUALITY,
+        )
+
+    def _prepare(self, image: Image.Image) -> Image.Image:
+        """Normalize the pixel mode for the target format and downscale."""
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        if self.image_format == "jpeg" or not has_alpha:
+            if has_alpha:
+                # JPEG has no alpha channel: flatten onto white
+                background = Image.new("RGB", image.size, "white")
+                background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+        elif image.mode != "RGBA":
+            image = image.convert("RGBA")
+        return downscale(image, self.max_dimension)
+
+    def encode(self, image: Image.Image) -> bytes:
+        """Encode an already prepared image in the configured format."""
+        pil_format, _ = IMAGE_FORMATS[self.image_format]
+        options = {"optimize": True}
+        if self.image_format in ("webp", "jpeg"):
+            options["quality"] = self.quality
+        if self.image_format == "webp":
+            options["method"] = 4
+        buffer = io.BytesIO()
+        image.save(buffer, pil_format, **options)
+        return buffer.getvalue()
+
+    def store(self, image: Image.Image) -> StoredImage:
+        """Store an image, reusing the existing file for identical content.
+
+        Returns:
+            Where the image was stored and how many bytes it takes
+        """
+        image = self._prepare(image)
+        _, extension = IMAGE_FORMATS[self.image_format]
+        path = self.storage_path / f"img_{content_hash(image)[:24]}{extension}"
+        if path.exists():
+            return StoredImage(str(path), path.stat().st_size, True)
+
+        data = self.encode(image)
+        # Write to a temporary name first so a crash never leaves a
+        # truncated file under the content-hash name
+        partial = path.with_suffix(path.suffix + ".part")
+        partial.write_bytes(data)
+        partial.replace(path)
+        return StoredImage(str(path), len(data), False)
+
+    def store_file(self, source: str) -> StoredImage:
+        """Store the image in a file through the pipeline."""
+        with Image.open(source) as image:
+            image.load()
+            return self.store(image)
+
+    def is_stored(self, path: Optional[str]) -> bool:
+        """Whether path is a file inside this pipeline's storage directory."""
+        if not path:
+            return False
+        try:
+            Path(path).resolve().relative_to(self.storage_path.resolve())
+        except ValueError:
+            return False
+        return True
+
+    def is_pipeline_file(self, path: str) -> bool:
+        """Whether path was written by store() in the configured format."""
+        _, extension = IMAGE_FORMATS[self.image_format]
+        name = Path(path).name
+        return (
+            self.is_stored(path)
+            and name.endswith(extension)
+            and _STORED_NAME_RE.fullmatch(name) is not None
+        )
+
+
+class ThumbnailCache:
+    """Generate thumbnails on first use and keep them on disk.
+
+    A thumbnail is named after its source's path, modification time and
+    size, so replacing the source produces a new thumbnail instead of
+    serving a stale one.
+    """
+
+    def __init__(self, cache_path: str, max_dimension: int = 320, quality: int = 70):
+        """Initialize the cache.
+
+        Args:
+            cache_path: Directory to keep thumbnails in
+            max_dimension: Longest side of thumbnails in pixels
+            quality: WebP encoder quality (1-100)
+        """
+        self.cache_path = Path(cache_path)
+        self.max_dimension = max_dimension
+        self.quality = quality
+        # Reused for mode normalization, downscaling and encoding
+        self._pipeline = ImagePipeline(cache_path, max_dimension, "webp", quality)
+
+    @classmethod
+    def from_config(cls, config) -> "ThumbnailCache":
+        """Create a cache from the THUMBNAIL_* settings."""
+        return cls(
+            config.THUMBNAIL_CACHE_PATH,
+            max_dimension=config.THUMBNAIL_MAX_DIMENSION,
+            quality=config.THUMBNAIL_QUALITY,
+        )
+
+    def key(self, source: str, stat: Optional[os.stat_result] = None) -> str:
+        """Identify the thumbnail of source as it is on disk now."""
+        stat = stat or os.stat(source)
+        digest = hashlib.sha256(
+            f"{Path(source).resolve()}:{stat.st_mtime_ns}:{stat.st_size}:"
+            f"{self.max_dimension}:{self.quality}".encode("utf-8")
+        )
+        return digest.hexdigest()[:24]
+
+    def get(self, source: str, stat: Optional[os.stat_result] = None) -> Path:
+        """Return the thumbnail file for source, creating it if needed."""
+        path = self.cache_path / f"thumb_{self.key(source, stat)}.webp"
+        if path.exists():
+            return path
+
+        with Image.open(source) as image:
+            # Lets JPEG decode at a reduced scale; other formats ignore it
+            image.draft("RGB", (self.max_dimension, self.max_dimension))
+            image.load()
+            data = self._pipeline.encode(self._pipeline._prepare(image))
+
+        # Concurrent requests for the same thumbnail each write their own
+        # temporary file; whichever rename lands last wins, harmlessly
+        with tempfile.NamedTemporaryFile(dir=self.cache_path, suffix=".part", delete=False) as partial:
+            partial.write(data)
+        os.replace(partial.name, path)
+        return path
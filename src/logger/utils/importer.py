@@ -0,0 +1,165 @@
+"""Readers for bulk-importing log entries from NDJSON or CSV files."""
+import csv
+import json
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+IMPORT_FORMATS = ["ndjson", "csv"]
+
+# Accepted column names for each Log field. Our own export uses the first
+# name; the others cover common dumps from other time trackers.
+FIELD_ALIASES = {
+    "created_at": ["created_at", "timestamp", "time", "start", "start_time", "date"],
+    "original_text": ["original_text", "text", "content", "note", "notes"],
+    "image_path": ["image_path", "image"],
+    "ai_summary": ["ai_summary", "summary", "description", "title", "activity"],
+    "category": ["category", "type", "project"],
+    "tags": ["tags", "labels"],
+    "duration_estimate": ["duration_estimate", "duration", "duration_minutes", "minutes"],
+}
+
+DEFAULT_CATEGORY = "其他"
+
+# NDJSON lines decoded per json.loads call
+NDJSON_CHUNK_LINES = 1000
+
+
+def detect_format(path: str) -> str:
+    """Guess the import format from the file extension."""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in (".ndjson", ".jsonl", ".json"):
+        return "ndjson"
+    raise ValueError(f"Cannot detect import format from extension: {path}")
+
+
+def _aliases_present(keys) -> Dict[str, Tuple[str, ...]]:
+    """Per Log field, the accepted names found among keys, most preferred first."""
+    return {
+        field: tuple(name for name in names if name in keys)
+        for field, names in FIELD_ALIASES.items()
+    }
+
+
+def _pick(record: Dict[str, Any], names: Tuple[str, ...]) -> Any:
+    for name in names:
+        value = record.get(name)
+        if value is not None and value != "":
+            return value
+    return None
+
+
+def _parse_tags(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(tag) for tag in value]
+    value = str(value).strip()
+    if value.startswith("["):
+        return [str(tag) for tag in json.loads(value)]
+    separator = ";" if ";" in value else ","
+    return [tag.strip() for tag in value.split(separator) if tag.strip()]
+
+
+def normalize_record(
+    record: Dict[str, Any], fields: Optional[Dict[str, Tuple[str, ...]]] = None
+) -> Dict[str, Any]:
+    """Map one raw record onto Log column values.
+
+    Args:
+        record: Raw record from the file
+        fields: _aliases_present() of the record's keys; files repeat the
+            same keys on every record, so readers resolve them once
+
+    Raises:
+        ValueError: If the record has no usable timestamp or content
+    """
+    if fields is None:
+        fields = _aliases_present(record)
+
+    created_at = _pick(record, fields["created_at"])
+    if created_at is None:
+        raise ValueError("missing created_at/timestamp")
+    created_at = datetime.fromisoformat(str(created_at).replace("Z", "+00:00"))
+    if created_at.tzinfo is not None:
+        # Stored timestamps are naive local time, like datetime.now()
+        created_at = created_at.astimezone().replace(tzinfo=None)
+
+    original_text = _pick(record, fields["original_text"])
+    ai_summary = _pick(record, fields["ai_summary"]) or (str(original_text)[:100] if original_text else None)
+    if not ai_summary:
+        raise ValueError("missing summary/text")
+
+    duration = _pick(record, fields["duration_estimate"])
+    if duration is not None and type(duration) is not int:
+        duration = int(float(duration))
+
+    return {
+        "created_at": created_at,
+        "original_text": original_text,
+        "image_path": _pick(record, fields["image_path"]),
+        "ai_summary": str(ai_summary),
+        "category": str(_pick(record, fields["category"]) or DEFAULT_CATEGORY),
+        "tags": _parse_tags(_pick(record, fields["tags"])),
+        "duration_estimate": duration,
+    }
+
+
+def _ndjson_records(path: str, f) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, decoded value) for the non-blank lines of f.
+
+    Lines are decoded a chunk at a time as one JSON array: a json.loads
+    call per line costs more than decoding the line itself.
+    """
+    lines = ((number, line) for number, line in enumerate(f, start=1) if line.strip())
+    while True:
+        chunk = list(islice(lines, NDJSON_CHUNK_LINES))
+        if not chunk:
+            return
+        try:
+            values = json.loads("[" + ",".join(line for _, line in chunk) + "]")
+        except ValueError:
+            values = None
+        if values is not None and len(values) == len(chunk):
+            yield from zip((number for number, _ in chunk), values)
+            continue
+        # Some line is not a single JSON value; decode line by line to name it
+        for number, line in chunk:
+            try:
+                yield number, json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: {e}") from e
+
+
+def iter_import_records(path: str, import_format: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Read and normalize records from an NDJSON or CSV file, lazily.
+
+    Args:
+        path: File to read
+        import_format: "ndjson" or "csv"; detected from the extension if None
+
+    Raises:
+        ValueError: If a line cannot be parsed, with its line number
+    """
+    import_format = import_format or detect_format(path)
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if import_format == "csv":
+            reader = csv.DictReader(f)
+            records = ((reader.line_num, row) for row in reader)
+        else:
+            records = _ndjson_records(path, f)
+
+        resolved = {}
+        for line_number, record in records:
+            try:
+                keys = tuple(record)
+                fields = resolved.get(keys)
+                if fields is None:
+                    fields = resolved[keys] = _aliases_present(keys)
+                yield normalize_record(record, fields)
+            except (ValueError, TypeError, AttributeError) as e:
+                raise ValueError(f"{path}:{line_number}: {e}") from e
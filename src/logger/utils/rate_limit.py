@@ -0,0 +1,57 @@
+"""Thread-safe rate limiting for outgoing API requests."""
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket rate limiter shared by worker threads.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``.
+    Each request takes one token, blocking until one is available, so
+    bursts of up to ``capacity`` requests go out at once and the long-run
+    rate never exceeds ``rate``.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """Initialize the bucket, full.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens held (burst size)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests: float, burst: float = 1.0) -> "TokenBucket":
+        """Create a bucket allowing the given number of requests per minute."""
+        return cls(requests / 60.0, burst)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available, without waiting."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self):
+        """Take a token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
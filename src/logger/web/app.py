@@ -1,19 +1,69 @@
 """FastAPI web application for the logger."""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional, List
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, List
 from pathlib import Path
+from urllib.parse import urlencode
 
-from fastapi import FastAPI, Request, Query
-from fastapi.responses import HTMLResponse
+from fastapi import Depends, FastAPI, HTTPException, Request, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
+from sqlalchemy.orm import Session
 
 from ..config import config
-from ..db.models import init_database, get_session
-from ..db.operations import LogOperations
+from ..db.events import log_events
+from ..db.generation import database_generation
+from ..db.models import Log, init_database, get_session
+from ..db.operations import AsyncLogOperations, LogOperations, encode_cursor
+from ..db.queue import AnalysisQueue
+from ..utils.export import iter_csv, iter_ndjson
+from ..utils.images import ThumbnailCache
+from .cache import FragmentCache, ResponseCache
+from .stream import DatabaseWatcher, event_stream
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run background tasks alongside the web server.
+    
+    The database watcher feeds /api/stream; the analysis queue worker
+    runs too if enabled.
+    """
+    watcher = DatabaseWatcher(
+        engine, config.DATABASE_PATH, log_events, interval=config.STREAM_WATCH_INTERVAL
+    )
+    watcher_task = asyncio.create_task(watcher.run())
+    
+    worker = None
+    if config.ANALYSIS_WORKER_IN_WEB:
+        try:
+            config.validate()
+        except ValueError as e:
+            print(f"Warning: Analysis worker not started: {e}")
+        else:
+            from ..worker import AnalysisWorker
+            
+            worker = AnalysisWorker.from_config(engine, config)
+            worker.start()
+    yield
+    if worker is not None:
+        worker.stop(timeout=5)
+    watcher_task.cancel()
+
 
 # Initialize FastAPI app
-app = FastAPI(title="Life Logger", description="Personal life logging tool with AI analysis")
+app = FastAPI(
+    title="Life Logger",
+    description="Personal life logging tool with AI analysis",
+    lifespan=lifespan,
+)
 
 # Setup templates and static files
 template_dir = Path(__file__).parent / "templates"
@@ -24,13 +74,97 @@ templates = Jinja2Templates(directory=str(template_dir))
 app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
 # Initialize database
-engine = init_database(config.get_database_url())
+engine = init_database(
+    config.get_database_url(), config.get_sqlite_pragmas(), **config.get_engine_options()
+)
+
+# Thumbnails are decoded and resized on a small dedicated pool: it keeps
+# the event loop free, and bounds how many full-size screenshots are in
+# memory when a timeline page requests dozens of new thumbnails at once
+thumbnails = ThumbnailCache.from_config(config)
+thumbnail_executor = ThreadPoolExecutor(
+    max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="thumbnail"
+)
 
+# Rendered /api/stats, /api/logs, /api/tags and /api/analytics responses, valid until the next write
+response_cache = ResponseCache(max_bytes=int(config.RESPONSE_CACHE_MAX_MB * 1024 * 1024))
 
-def get_log_operations():
-    """Get LogOperations instance."""
+# Rendered timeline cards, each valid until its own log changes
+fragment_cache = FragmentCache(max_bytes=int(config.FRAGMENT_CACHE_MAX_MB * 1024 * 1024))
+log_card_template = templates.get_template("log_card.html")
+
+# Images of a log only change when they are recompressed, which keeps
+# the picture the same, so browsers may reuse them for a day
+IMAGE_CACHE_CONTROL = "private, max-age=86400"
+
+
+def get_db():
+    """Yield a database session for one request and close it afterwards."""
     session = get_session(engine)
-    return LogOperations(session)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def get_log_operations(session: Session = Depends(get_db)) -> AsyncLogOperations:
+    """Get async log operations bound to the request's session.
+    
+    Queries run in a worker thread so a slow statistics query does not
+    block the event loop for other requests.
+    """
+    return AsyncLogOperations(LogOperations(session))
+
+
+def _render_log_cards(logs: List[Log]) -> Markup:
+    """Render timeline cards, reusing each log's cached card while it is unchanged.
+    
+    The signature holds every value the card shows, so an edit, a new
+    duration or an analysis result re-renders just that card, whichever
+    process made it.
+    """
+    cards = []
+    for log in logs:
+        signature = (
+            log.created_at, log.category, log.ai_summary, log.original_text,
+            log.image_path, log.tags, log.duration_estimate,
+        )
+        card = fragment_cache.get(log.id, signature)
+        if card is None:
+            card = log_card_template.render(log=log)
+            fragment_cache.put(log.id, signature, card)
+        cards.append(card)
+    return Markup("".join(cards))
+
+
+async def _timeline_page(
+    ops: AsyncLogOperations,
+    limit: int,
+    cursor: Optional[str],
+    filters: Dict[str, Optional[str]],
+):
+    """Fetch one cursor page of the timeline and render its cards.
+    
+    Returns:
+        Tuple of (cards, query string of the next page or None)
+    """
+    start_date, end_date = filters["start_date"], filters["end_date"]
+    try:
+        logs, next_cursor = await ops.get_logs_page(
+            limit=limit,
+            cursor=cursor,
+            category=filters["category"],
+            start_date=datetime.strptime(start_date, "%Y-%m-%d") if start_date else None,
+            end_date=datetime.strptime(end_date, "%Y-%m-%d") if end_date else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    cards = await asyncio.to_thread(_render_log_cards, logs)
+    if next_cursor is None:
+        return cards, None
+    params = {name: value for name, value in filters.items() if value}
+    return cards, urlencode({**params, "limit": limit, "cursor": next_cursor})
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -39,32 +173,29 @@ async def index(
     category: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    ops: AsyncLogOperations = Depends(get_log_operations),
 ):
-    """Home page with log timeline."""
-    ops = get_log_operations()
+    """Home page with the first page of the log timeline.
     
-    # Parse dates
-    start = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
-    end = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
-    
-    # Get logs
-    logs = ops.get_logs(
-        limit=limit,
-        category=category,
-        start_date=start,
-        end_date=end,
-    )
+    Later pages are appended by the page's script from
+    /fragments/logs as the reader scrolls; without scripts the
+    "load more" link opens the next page at cursor.
+    """
+    filters = {"category": category, "start_date": start_date, "end_date": end_date}
+    cards, next_query = await _timeline_page(ops, limit, cursor, filters)
     
     # Get unique categories for filter
-    all_logs = ops.get_logs(limit=1000)
-    categories = sorted(set(log.category for log in all_logs))
+    categories = await ops.get_categories()
     
     return templates.TemplateResponse(
         "index.html",
         {
             "request": request,
-            "logs": logs,
+            "cards": cards,
+            "next_page_url": f"/?{next_query}" if next_query else None,
+            "next_fragment_url": f"/fragments/logs?{next_query}" if next_query else None,
             "categories": categories,
             "selected_category": category,
             "start_date": start_date,
@@ -73,91 +204,397 @@ async def index(
     )
 
 
+@app.get("/fragments/logs", response_class=HTMLResponse)
+async def log_fragments(
+    category: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    ops: AsyncLogOperations = Depends(get_log_operations),
+):
+    """The timeline cards of one cursor page, as an HTML fragment.
+    
+    The URL of the following page is returned in the X-Next-Page header
+    (absent on the last page).
+    """
+    filters = {"category": category, "start_date": start_date, "end_date": end_date}
+    cards, next_query = await _timeline_page(ops, limit, cursor, filters)
+    headers = {"X-Next-Page": f"/fragments/logs?{next_query}"} if next_query else {}
+    return HTMLResponse(cards, headers=headers)
+
+
 @app.get("/stats", response_class=HTMLResponse)
 async def stats_page(
     request: Request,
     period: str = "all",
+    ops: AsyncLogOperations = Depends(get_log_operations),
 ):
     """Statistics page."""
-    ops = get_log_operations()
-    
     # Determine time range
     start_date = None
     end_date = None
     
     if period == "today":
-        start_date = datetime.now().replace(hour=0, minute=0, second=0)
+        start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         period_name = "今日"
     elif period == "week":
         start_date = datetime.now() - timedelta(days=datetime.now().weekday())
-        start_date = start_date.replace(hour=0, minute=0, second=0)
+        start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
         period_name = "本周"
     elif period == "month":
-        start_date = datetime.now().replace(day=1, hour=0, minute=0, second=0)
+        start_date = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         period_name = "本月"
     else:
         period_name = "全部"
     
     # Get statistics
-    stats = ops.get_statistics(start_date=start_date, end_date=end_date)
+    stats = await ops.get_statistics(start_date=start_date, end_date=end_date)
+    heatmap = await ops.get_heatmap(start_date=start_date, end_date=end_date)
     
     return templates.TemplateResponse(
         "stats.html",
         {
             "request": request,
             "stats": stats,
+            "heatmap": heatmap,
+            "heatmap_peak": max(max(row) for row in heatmap["counts"]) or 1,
+            "weekday_names": ["周一", "周二", "周三", "周四", "周五", "周六", "周日"],
             "period": period,
             "period_name": period_name,
+            "start_date": start_date.strftime("%Y-%m-%d") if start_date else "",
         }
     )
 
 
+def _etag_matches(request: Request, etag: str) -> Optional[bool]:
+    """Whether If-None-Match lists etag; None if the header is absent."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return None
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Check the request's conditional headers against the current version.
+    
+    If-None-Match takes precedence over If-Modified-Since, as in RFC 9110.
+    """
+    matches = _etag_matches(request, etag)
+    if matches is not None:
+        return matches
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have whole-second resolution
+        return int(mtime) <= since.timestamp()
+    return False
+
+
+async def _cached_json(
+    request: Request,
+    params: Dict[str, Any],
+    compute: Callable[[], Awaitable[Any]],
+) -> Response:
+    """Serve a JSON response from the response cache while the data is unchanged.
+    
+    The database generation is checked with a couple of stat calls, so a
+    hit never opens a connection. Clients that send back the ETag get a
+    304 instead of the body.
+    
+    Args:
+        request: The current request
+        params: Parsed query parameters, which identify the response
+        compute: Coroutine function producing the response data on a miss
+    """
+    key = request.url.path + "?" + urlencode(
+        sorted((name, str(value)) for name, value in params.items() if value is not None)
+    )
+    generation = database_generation(config.DATABASE_PATH)
+    entry = response_cache.get(key, generation)
+    if entry is None:
+        body = JSONResponse(jsonable_encoder(await compute())).body
+        entry = response_cache.put(key, generation, body)
+    
+    # no-cache: browsers may keep the body but must revalidate every time
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+
+@app.get("/images/{log_id}")
+async def get_image(
+    request: Request,
+    log_id: int,
+    size: str = Query("full", pattern="^(full|thumb)$"),
+    ops: AsyncLogOperations = Depends(get_log_operations),
+):
+    """Serve a log's image, or with size=thumb a cached thumbnail of it."""
+    log = await ops.get_log_by_id(log_id)
+    if log is None or not log.image_path:
+        raise HTTPException(status_code=404, detail="Image not found")
+    try:
+        stat = await asyncio.to_thread(os.stat, log.image_path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="Image file missing")
+    
+    # The thumbnail key already covers path, mtime, size and thumbnail
+    # settings, so it doubles as the ETag of both variants
+    version = thumbnails.key(log.image_path, stat)
+    etag = f'"{version}-{size}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": IMAGE_CACHE_CONTROL,
+    }
+    if _is_not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+    
+    path = log.image_path
+    if size == "thumb":
+        loop = asyncio.get_running_loop()
+        try:
+            path = await loop.run_in_executor(
+                thumbnail_executor, thumbnails.get, log.image_path, stat
+            )
+        except OSError as e:
+            # Unreadable or not an image (PIL raises OSError subclasses)
+            raise HTTPException(status_code=415, detail=f"Cannot create thumbnail: {e}")
+    return FileResponse(path, headers=headers)
+
+
 @app.get("/api/logs")
 async def api_get_logs(
+    request: Request,
     limit: int = Query(50, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     category: Optional[str] = None,
+    tag: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    ops: AsyncLogOperations = Depends(get_log_operations),
 ):
-    """API endpoint to get logs."""
-    ops = get_log_operations()
+    """API endpoint to get logs.
     
+    Pass the returned next_cursor as cursor to fetch the following page;
+    cursor paging stays fast at any depth, unlike offset.
+    """
     # Parse dates
     start = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
     end = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
     
-    # Get logs
-    logs = ops.get_logs(
-        limit=limit,
-        offset=offset,
-        category=category,
-        start_date=start,
-        end_date=end,
-    )
+    async def compute():
+        # Get logs
+        if offset:
+            logs = await ops.get_logs(
+                limit=limit,
+                offset=offset,
+                category=category,
+                start_date=start,
+                end_date=end,
+                tag=tag,
+            )
+            next_cursor = encode_cursor(logs[-1]) if len(logs) == limit else None
+        else:
+            try:
+                logs, next_cursor = await ops.get_logs_page(
+                    limit=limit,
+                    cursor=cursor,
+                    category=category,
+                    start_date=start,
+                    end_date=end,
+                    tag=tag,
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        return {
+            "logs": [log.to_dict() for log in logs],
+            "count": len(logs),
+            "next_cursor": next_cursor,
+        }
     
-    return {
-        "logs": [log.to_dict() for log in logs],
-        "count": len(logs),
+    params = {
+        "limit": limit,
+        "offset": offset or None,
+        "cursor": None if offset else cursor,
+        "category": category,
+        "tag": tag,
+        "start_date": start.date() if start else None,
+        "end_date": end.date() if end else None,
     }
+    return await _cached_json(request, params, compute)
+
+
+@app.get("/api/export")
+async def api_export_logs(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    category: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+):
+    """API endpoint to stream the full log history as NDJSON or CSV."""
+    # Parse dates
+    start = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+    end = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
+    
+    def stream():
+        # The stream outlives the request handler, so it owns its session
+        session = get_session(engine)
+        try:
+            logs = LogOperations(session).iter_logs(
+                category=category,
+                start_date=start,
+                end_date=end,
+            )
+            if export_format == "csv":
+                yield from iter_csv(logs)
+            else:
+                yield from iter_ndjson(logs)
+        finally:
+            session.close()
+    
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    filename = f"timeflow-export.{export_format}"
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @app.get("/api/stats")
 async def api_get_stats(
+    request: Request,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    ops: AsyncLogOperations = Depends(get_log_operations),
 ):
     """API endpoint to get statistics."""
-    ops = get_log_operations()
-    
     # Parse dates
     start = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
     end = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
     
     # Get statistics
-    stats = ops.get_statistics(start_date=start, end_date=end)
+    async def compute():
+        return await ops.get_statistics(start_date=start, end_date=end)
+    
+    params = {
+        "start_date": start.date() if start else None,
+        "end_date": end.date() if end else None,
+    }
+    return await _cached_json(request, params, compute)
+
+
+@app.get("/api/tags")
+async def api_get_tags(
+    request: Request,
+    tag: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=500),
+    ops: AsyncLogOperations = Depends(get_log_operations),
+):
+    """API endpoint to get the most used tags, or the tags co-occurring with tag."""
+    async def compute():
+        if tag:
+            rows = await ops.get_tag_cooccurrence(tag, limit=limit)
+        else:
+            rows = await ops.get_top_tags(limit=limit)
+        return {
+            "tag": tag,
+            "tags": [{"name": name, "count": count} for name, count in rows],
+        }
+
+    params = {"tag": tag, "limit": limit}
+    return await _cached_json(request, params, compute)
+
+
+@app.get("/api/analytics")
+async def api_get_analytics(
+    request: Request,
+    by: str = Query("heatmap", pattern="^(hour|weekday|week|day|heatmap)$"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category: Optional[str] = None,
+    ops: AsyncLogOperations = Depends(get_log_operations),
+):
+    """API endpoint to get time-bucketed analytics.
+    
+    by=heatmap returns a weekday x hour matrix (optionally for one
+    category); hour, weekday, week and day return per-category series,
+    day with 7- and 30-day rolling averages.
+    """
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+        end = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def compute():
+        if by == "heatmap":
+            return await ops.get_heatmap(start_date=start, end_date=end, category=category)
+        return await ops.get_time_buckets(by, start_date=start, end_date=end)
+    
+    params = {
+        "by": by,
+        "start_date": start.date() if start else None,
+        "end_date": end.date() if end else None,
+        "category": category if by == "heatmap" else None,
+    }
+    return await _cached_json(request, params, compute)
+
+
+@app.get("/api/search")
+async def api_search_logs(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(50, ge=1, le=500),
+    ops: AsyncLogOperations = Depends(get_log_operations),
+):
+    """API endpoint to full-text search logs, best match first."""
+    logs = await ops.search_logs(q, limit=limit)
+    
+    return {
+        "logs": [log.to_dict() for log in logs],
+        "count": len(logs),
+    }
+
+
+@app.get("/api/queue")
+async def api_queue_metrics(session: Session = Depends(get_db)):
+    """API endpoint for analysis queue depth and lag."""
+    return await asyncio.to_thread(AnalysisQueue(session).metrics)
+
+
+@app.get("/api/stream")
+async def api_stream():
+    """Server-sent events for live updates.
+    
+    Events:
+        log: A log was created or its analysis completed (the full log)
+        duration: A log's duration changed ({"id", "duration_estimate"})
+        changed: Data changed in another way, e.g. a delete or an import
+            by another process; refetch what is shown
     
-    return stats
+    Events carry full values keyed by log id, so applying one twice is
+    harmless.
+    """
+    return StreamingResponse(
+        event_stream(log_events, keepalive=config.STREAM_KEEPALIVE),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/cache")
+async def api_cache_stats():
+    """API endpoint for response and fragment cache hit ratio and memory use."""
+    return {**response_cache.stats(), "fragments": fragment_cache.stats()}
 
 
 @app.get("/health")
@@ -0,0 +1,159 @@
+"""In-memory caches of rendered API responses and HTML fragments."""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Tuple
+
+
+class CachedResponse(NamedTuple):
+    """A rendered response body and the database generation it reflects."""
+
+    generation: Hashable
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """LRU cache of response bodies, valid for one database generation.
+
+    Entries are looked up by a key built from the normalized request and
+    only returned while the database generation they were rendered at is
+    still current, so a write invalidates everything at once without
+    tracking which responses it affects.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Size budget for cached bodies; 0 disables caching
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, generation: Hashable) -> Optional[CachedResponse]:
+        """Return the cached response for key if it is still current."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.generation != generation:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, generation: Hashable, body: bytes) -> CachedResponse:
+        """Cache a rendered body and evict least recently used entries.
+
+        The ETag is a hash of the body, so it stays the same across
+        generations as long as the response itself does not change.
+        """
+        entry = CachedResponse(generation, body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count, cached bytes, hits, misses and hit ratio."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+class FragmentCache:
+    """LRU cache of rendered HTML fragments, one per object.
+
+    Each fragment is stored with a signature of the values it was
+    rendered from and only returned while the caller's current signature
+    is equal, so an object that changed (in this process or another) is
+    re-rendered without any invalidation bookkeeping, and the rest of a
+    page is reused across writes.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Size budget for cached fragments (counted in
+                characters); 0 disables caching
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, signature: Any) -> Optional[str]:
+        """Return the fragment for key if it was rendered from signature."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, signature: Any, fragment: str):
+        """Cache a rendered fragment and evict least recently used entries."""
+        if len(fragment) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            self._entries[key] = (signature, fragment)
+            self._bytes += len(fragment)
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count, cached size, hits, misses and hit ratio."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
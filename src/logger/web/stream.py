@@ -0,0 +1,140 @@
+"""Server-sent events for live timeline updates."""
+import asyncio
+import json
+from typing import AsyncIterator
+
+from sqlalchemy import and_, func
+
+from ..db.events import LogEvent, LogEventBroker
+from ..db.generation import database_file_signature, write_generation
+from ..db.models import Log, get_session
+
+# More new logs than this in one change (e.g. an import) are announced as
+# a single "changed" event rather than one event each
+MAX_EVENTS_PER_CHANGE = 200
+
+
+def format_event(event: LogEvent) -> str:
+    """Render an event in the text/event-stream format."""
+    event_id, name, data = event
+    return f"id: {event_id}\nevent: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def event_stream(broker: LogEventBroker, keepalive: float = 15) -> AsyncIterator[str]:
+    """Yield a subscriber's events until the client disconnects.
+
+    A comment line is sent after keepalive idle seconds so proxies do not
+    close the connection.
+    """
+    queue = broker.subscribe()
+    try:
+        # Ask EventSource clients to reconnect after 3 seconds
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(queue)
+
+
+class DatabaseWatcher:
+    """Announce logs written by other processes, such as the CLI.
+
+    Writes made in this process are published by LogOperations directly.
+    For the rest, the watcher stats the database file and its WAL every
+    interval seconds and only queries when they have changed, so an idle
+    database costs no queries at all.
+    """
+
+    def __init__(self, engine, database_path: str, broker: LogEventBroker, interval: float = 1.0):
+        """Initialize the watcher.
+
+        Args:
+            engine: SQLAlchemy engine of the logs database
+            database_path: Path of the SQLite file to watch
+            broker: Broker to publish events to
+            interval: Seconds between checks of the database files
+        """
+        self.engine = engine
+        self.database_path = database_path
+        self.broker = broker
+        self.interval = interval
+
+    async def run(self):
+        """Watch the database until cancelled."""
+        signature = database_file_signature(self.database_path)
+        generation = write_generation.value
+        await asyncio.to_thread(self._skip_existing_logs)
+        while True:
+            await asyncio.sleep(self.interval)
+            current = database_file_signature(self.database_path)
+            if current == signature:
+                continue
+            signature = current
+            # A change alongside a write of our own was most likely that write
+            own_write = write_generation.value != generation
+            generation = write_generation.value
+            try:
+                if self.broker.subscriber_count:
+                    await asyncio.to_thread(self._announce_changes, own_write)
+                else:
+                    await asyncio.to_thread(self._skip_existing_logs)
+            except Exception as e:
+                # Keep watching through e.g. a locked database
+                print(f"Warning: Database watcher error: {e}")
+
+    def _skip_existing_logs(self):
+        """Treat every log in the database as already announced."""
+        session = get_session(self.engine)
+        try:
+            max_id = session.query(func.max(Log.id)).scalar() or 0
+        finally:
+            session.close()
+        self.broker.last_log_id = max(self.broker.last_log_id, max_id)
+
+    def _announce_changes(self, own_write: bool):
+        """Publish the logs added since the last announced one.
+
+        Each new log is preceded by a "duration" event for the log before
+        it on the same day, whose duration the adding process just set. A
+        change that added no logs (an edit or a delete) is announced as
+        "changed" so clients can refetch what they show.
+        """
+        session = get_session(self.engine)
+        try:
+            new_logs = (
+                session.query(Log)
+                .filter(Log.id > self.broker.last_log_id)
+                .order_by(Log.id)
+                .limit(MAX_EVENTS_PER_CHANGE + 1)
+                .all()
+            )
+            if not new_logs:
+                if not own_write:
+                    self.broker.publish("changed", {})
+                return
+            if len(new_logs) > MAX_EVENTS_PER_CHANGE:
+                max_id = session.query(func.max(Log.id)).scalar()
+                self.broker.publish("changed", {}, log_id=max_id)
+                return
+
+            for log in new_logs:
+                start_of_day = log.created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+                previous = session.query(Log).filter(
+                    and_(
+                        Log.created_at >= start_of_day,
+                        Log.created_at < log.created_at,
+                    )
+                ).order_by(Log.created_at.desc()).first()
+                if previous is not None and previous.duration_estimate is not None:
+                    self.broker.publish(
+                        "duration",
+                        {"id": previous.id, "duration_estimate": previous.duration_estimate},
+                    )
+                self.broker.publish("log", log.to_dict(), log_id=log.id)
+        finally:
+            session.close()
@@ -0,0 +1,136 @@
+"""Background worker that drains the analysis queue."""
+import threading
+from typing import Any, Callable, Optional
+
+from .db.models import Log, get_session
+from .db.queue import AnalysisQueue
+
+
+class AnalysisWorker:
+    """Analyze queued logs one at a time, in this process.
+
+    Runs in the foreground (``timeflow worker``) or on a daemon thread
+    inside the web server. Several workers may share a database: jobs are
+    claimed atomically.
+    """
+
+    def __init__(
+        self,
+        engine,
+        analyzer_factory: Callable[[], Any],
+        poll_interval: float = 2.0,
+        max_attempts: int = 5,
+        retry_delay: float = 30,
+        lease_seconds: int = 300,
+    ):
+        """Initialize the worker.
+
+        Args:
+            engine: SQLAlchemy engine of the logs database
+            analyzer_factory: Called once, on the first job, to create the
+                GeminiAnalyzer (which is slow to import)
+            poll_interval: Seconds to wait when the queue is empty
+            max_attempts: Attempts before a job is marked failed
+            retry_delay: Seconds before the first retry, doubled after each
+            lease_seconds: How long a running job may take before another
+                worker may claim it again
+        """
+        self.engine = engine
+        self.analyzer_factory = analyzer_factory
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease_seconds = lease_seconds
+        self.processed = 0
+        self.failed = 0
+        self._analyzer = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, engine, config) -> "AnalysisWorker":
+        """Create a worker using the ANALYSIS_QUEUE_* and GEMINI_* settings."""
+        def create_analyzer():
+            from .api.gemini import GeminiAnalyzer
+
+            return GeminiAnalyzer.from_config(config)
+
+        return cls(
+            engine,
+            create_analyzer,
+            poll_interval=config.ANALYSIS_QUEUE_POLL_INTERVAL,
+            max_attempts=config.ANALYSIS_QUEUE_MAX_ATTEMPTS,
+            retry_delay=config.ANALYSIS_QUEUE_RETRY_DELAY,
+        )
+
+    def run_once(self) -> bool:
+        """Claim and process one due job.
+
+        Returns:
+            True if a job was processed (analyzed or scheduled for retry),
+            False if none was due
+        """
+        session = get_session(self.engine)
+        try:
+            queue = AnalysisQueue(session)
+            job = queue.claim(self.lease_seconds)
+            if job is None:
+                return False
+
+            log = session.get(Log, job.log_id)
+            if log is None:
+                # Deleted while queued
+                queue.complete(job, {})
+                return True
+
+            if self._analyzer is None:
+                self._analyzer = self.analyzer_factory()
+            try:
+                result = self._analyzer.analyze_content(
+                    text=log.original_text, image_path=log.image_path
+                )
+                # analyze_content falls back instead of raising on API errors
+                error = result.get("error")
+            except Exception as e:
+                error = str(e)
+
+            if error:
+                self.failed += 1
+                queue.fail(job, error, self.max_attempts, self.retry_delay)
+            else:
+                self.processed += 1
+                queue.complete(job, result)
+            return True
+        finally:
+            session.close()
+
+    def drain(self) -> int:
+        """Process due jobs until none is left. Returns the number processed."""
+        count = 0
+        while not self._stop.is_set() and self.run_once():
+            count += 1
+        return count
+
+    def run(self):
+        """Process jobs until stop() is called, polling when idle."""
+        while not self._stop.is_set():
+            try:
+                if not self.run_once():
+                    self._stop.wait(self.poll_interval)
+            except Exception as e:
+                # Keep the worker alive through e.g. a locked database
+                print(f"Warning: Analysis worker error: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def start(self) -> threading.Thread:
+        """Run the worker on a daemon thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="analysis-worker", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None):
+        """Ask the worker to stop and wait for the current job to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)